@@ -0,0 +1,80 @@
+"""
+Нагрузочный бенчмарк для /workers и /resumes: запросы в секунду до и после перехода на асинхронный слой.
+
+"До" - старые обработчики `async def`, внутри которых вызываются синхронные
+`Pydantic_DTO_relationship()` и `select_resumes_with_all_relationships()` (блокируют event loop).
+"После" - приложение из main.py с сессией на запрос и queries/repository.py.
+
+Нужен запущенный PostgreSQL из .env. Запуск из корня репозитория:
+    python data/benchmarks/bench_api.py --requests 500 --concurrency 50 --seed
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+import httpx
+from fastapi import FastAPI
+
+from database import sync_engine
+from main import create_fastapi_app
+from queries.orm import Pydantic_DTO_relationship, select_resumes_with_all_relationships, create_table_orm, insert_table_orm
+
+
+def create_legacy_app() -> FastAPI:
+    """Обработчики в том виде, в котором они были закомментированы в main.py."""
+    app = FastAPI()
+
+    @app.get("/workers")
+    async def get_workers():
+        return Pydantic_DTO_relationship()
+
+    @app.get("/resumes")
+    async def get_resumes():
+        return select_resumes_with_all_relationships()
+
+    return app
+
+
+async def run_load(app: FastAPI, path: str, total: int, concurrency: int) -> float:
+    """Отправляет `total` запросов не более чем по `concurrency` одновременно, возвращает запросов/сек."""
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return total / (time.perf_counter() - start)
+
+
+async def main(total: int, concurrency: int):
+    apps = {"before": create_legacy_app(), "after": create_fastapi_app()}
+    for path in ("/workers", "/resumes"):
+        for name, app in apps.items():
+            # Старые функции печатают каждый результат - глушим вывод, чтобы мерить запросы, а не терминал.
+            with contextlib.redirect_stdout(io.StringIO()):
+                rps = await run_load(app, path, total, concurrency)
+            print(f"{path:<10} {name:<7} {rps:10.1f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seed", action="store_true", help="пересоздать таблицы и вставить демо-данные")
+    args = parser.parse_args()
+
+    sync_engine.echo = False # Лог SQL в консоль искажает замеры; create_table_orm возвращает прежнее значение.
+    if args.seed:
+        create_table_orm()
+        insert_table_orm()
+    asyncio.run(main(args.requests, args.concurrency))
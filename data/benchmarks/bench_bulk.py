@@ -0,0 +1,82 @@
+"""
+Бенчмарк массовой загрузки резюме: `session.add_all` (как в insert_table_orm()) против
+queries/bulk.py в режимах executemany и COPY.
+
+Нужен запущенный PostgreSQL из .env, таблицы пересоздаются. Запуск из корня репозитория:
+    python data/benchmarks/bench_bulk.py --resumes 200000 --resumes-per-worker 4
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from database import Base, sync_engine, sync_session_factory
+from models import WorkerOrm, ResumesOrm, Workload
+from queries.bulk import bulk_load
+
+
+def synthetic_rows(resumes: int, resumes_per_worker: int) -> list[dict]:
+    rnd = random.Random(42)
+    return [
+        {
+            "username": f"user{i // resumes_per_worker}",
+            "lastname": "Bench",
+            "phone_number": i // resumes_per_worker,
+            "title": rnd.choice(["Python", "Go", "Rust", "Java"]) + " developer",
+            "compensation": rnd.randint(30_000, 300_000),
+            "workload": rnd.choice(["parttime", "fulltime"]),
+        }
+        for i in range(resumes)
+    ]
+
+
+def load_add_all(rows: list[dict]) -> None:
+    """Текущий путь: ORM-объекты, add_all и коммит после работников, чтобы узнать их id."""
+    with sync_session_factory() as session:
+        workers = {}
+        for row in rows:
+            key = (row["username"], row["lastname"], row["phone_number"])
+            if key not in workers:
+                workers[key] = WorkerOrm(username=key[0], lastname=key[1], phone_number=key[2])
+        session.add_all(workers.values())
+        session.commit()
+        session.add_all([
+            ResumesOrm(
+                title=row["title"],
+                compensation=row["compensation"],
+                workload=Workload(row["workload"]),
+                worker_id=workers[(row["username"], row["lastname"], row["phone_number"])].id,
+            )
+            for row in rows
+        ])
+        session.commit()
+
+
+def reset_tables() -> None:
+    Base.metadata.drop_all(sync_engine)
+    Base.metadata.create_all(sync_engine)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resumes", type=int, default=200_000)
+    parser.add_argument("--resumes-per-worker", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    sync_engine.echo = False
+    rows = synthetic_rows(args.resumes, args.resumes_per_worker)
+    runs = {
+        "add_all": lambda: load_add_all(rows),
+        "executemany": lambda: bulk_load(rows, args.batch_size),
+        "copy": lambda: bulk_load(rows, args.batch_size, use_copy=True),
+    }
+    for name, run in runs.items():
+        reset_tables()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {elapsed:8.2f} s {len(rows) / elapsed:12.0f} resumes/s")
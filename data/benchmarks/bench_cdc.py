@@ -0,0 +1,119 @@
+"""
+Поток изменений через LISTEN/NOTIFY (cdc.py):
+- задержка: --edits одиночных UPDATE резюме, каждый в своей транзакции; время от коммита
+  до получения подписчиком события с этим id (p50/p99/max);
+- объём: один UPDATE --bulk резюме; число уведомлений (ключи идут пачками по CDC_CHUNK),
+  время до получения всех id и время самого UPDATE (вместе с работой триггера).
+Печатает метрики ChangeFeed (уведомления, пачки, события после слияния).
+
+Нужен запущенный PostgreSQL из .env с резюме и триггерами миграции a9c4e1f7b352
+(alembic upgrade head или create_tables). Запуск из корня репозитория:
+    python data/benchmarks/bench_cdc.py --edits 200 --bulk 100000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from sqlalchemy import bindparam, select, update
+
+from cdc import ChangeFeed, ChangeOp
+from database import get_async_engine
+from models import ResumesOrm
+
+_touch_query = update(ResumesOrm).where(ResumesOrm.id == bindparam("resume_id")).values(compensation=ResumesOrm.compensation)
+_touch_bulk_query = update(ResumesOrm).where(ResumesOrm.id <= bindparam("max_id")).values(compensation=ResumesOrm.compensation)
+
+
+class Receiver:
+    """Подписчик: время получения каждого id резюме."""
+
+    def __init__(self):
+        self.received: dict[int, float] = {}
+        self.changed = asyncio.Event()
+
+    def __call__(self, events) -> None:
+        now = time.perf_counter()
+        for event in events:
+            if event.op is ChangeOp.update:
+                for resume_id in event.ids:
+                    self.received.setdefault(resume_id, now)
+        self.changed.set()
+
+    async def wait_for(self, resume_ids, timeout: float = 30.0) -> bool:
+        deadline = time.perf_counter() + timeout
+        while not all(resume_id in self.received for resume_id in resume_ids):
+            self.changed.clear()
+            try:
+                await asyncio.wait_for(self.changed.wait(), deadline - time.perf_counter())
+            except TimeoutError:
+                return False
+        return True
+
+
+async def latency(receiver: Receiver, ids: list[int]) -> list[float]:
+    delays = []
+    for resume_id in ids:
+        receiver.received.pop(resume_id, None)
+        async with get_async_engine().begin() as conn:
+            await conn.execute(_touch_query, {"resume_id": resume_id})
+        committed = time.perf_counter()
+        if await receiver.wait_for([resume_id]):
+            delays.append(receiver.received[resume_id] - committed)
+    return delays
+
+
+async def bulk(feed: ChangeFeed, receiver: Receiver, ids: list[int]) -> tuple[float, float, int]:
+    receiver.received.clear()
+    notifications = feed.notifications
+    start = time.perf_counter()
+    async with get_async_engine().begin() as conn:
+        await conn.execute(_touch_bulk_query, {"max_id": ids[-1]})
+    committed = time.perf_counter()
+    await receiver.wait_for(ids, timeout=120.0)
+    return committed - start, time.perf_counter() - committed, feed.notifications - notifications
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+async def main(args) -> None:
+    async with get_async_engine().connect() as conn:
+        ids = (await conn.execute(select(ResumesOrm.id).order_by(ResumesOrm.id).limit(max(args.edits, args.bulk)))).scalars().all()
+    feed = ChangeFeed(batch_seconds=args.batch)
+    receiver = Receiver()
+    feed.subscribe(receiver, tables=("resumes",))
+    feed.start()
+    while not feed.connected:
+        await asyncio.sleep(0.05)
+
+    delays = await latency(receiver, ids[:args.edits])
+    if delays:
+        print(f"задержка      p50 {percentile(delays, 50) * 1000:7.1f} ms   p99 {percentile(delays, 99) * 1000:7.1f} ms   "
+              f"max {max(delays) * 1000:7.1f} ms   ({len(delays)} из {args.edits})")
+
+    if args.bulk:
+        update_seconds, delivery_seconds, notifications = await bulk(feed, receiver, ids[:args.bulk])
+        got = sum(1 for resume_id in ids[:args.bulk] if resume_id in receiver.received)
+        print(f"UPDATE {args.bulk} резюме   {update_seconds:6.2f} s   доставка после коммита {delivery_seconds:6.2f} s   "
+              f"уведомлений {notifications}   получено id {got}")
+
+    await feed.stop()
+    stats = feed.stats()
+    print(f"    уведомлений {stats['notifications']}, пачек {stats['batches']}, событий {stats['events']}, "
+          f"переподключений {stats['reconnects']}, переполнений {stats['overflows']}")
+    await get_async_engine().dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--edits", type=int, default=200, help="одиночных UPDATE для замера задержки")
+    parser.add_argument("--bulk", type=int, default=100_000, help="резюме в одном UPDATE (0 - не замерять)")
+    parser.add_argument("--batch", type=float, default=0.05, help="окно накопления событий, с")
+    args = parser.parse_args()
+    asyncio.run(main(args))
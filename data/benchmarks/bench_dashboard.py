@@ -0,0 +1,51 @@
+"""
+Задержка сборки дашборда: три запроса queries/dashboard.py по очереди в одной сессии
+против get_dashboard() (fan_out - одновременно в отдельных сессиях).
+Ожидаемо: serial ~ сумма запросов, fan_out ~ самый долгий из них.
+
+Нужен запущенный PostgreSQL из .env с данными (например, после bench_loading.py --seed).
+Запуск из корня репозитория:
+    python data/benchmarks/bench_dashboard.py --repeat 50
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from database import async_session_factory, get_async_engine
+from queries.dashboard import get_avg_compensation, get_top_compensation_diff, get_resume_counts, get_dashboard
+
+
+async def serial():
+    async with async_session_factory() as session:
+        await get_avg_compensation(session)
+        await get_top_compensation_diff(session)
+        await get_resume_counts(session)
+
+
+async def fanned_out():
+    await get_dashboard(timeout=None)
+
+
+async def main(repeat: int):
+    for name, run in {"serial": serial, "fan_out": fanned_out}.items():
+        await run() # Прогрев пула соединений и кэша компиляции.
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await run()
+            latencies.append((time.perf_counter() - start) * 1000)
+        quantiles = statistics.quantiles(latencies, n=20) # Границы через 5%: [9] - p50, [18] - p95.
+        print(f"{name:<10} p50 {quantiles[9]:8.1f} ms   p95 {quantiles[18]:8.1f} ms")
+    await get_async_engine().dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat))
@@ -0,0 +1,124 @@
+"""
+Отзывчивость event loop под нагрузкой запросами. Пока --concurrency корутин выполняют запросы,
+отдельная задача просыпается каждые --tick-ms и замеряет, на сколько она опоздала (lag).
+Способы выполнения одних и тех же запросов (queries/orm.py и queries/core.py):
+- blocking: синхронная функция вызывается прямо в корутине - event loop стоит на всё время запроса;
+- offload: та же синхронная функция через run_in_threadpool (queries/offload.py);
+- async: асинхронный вариант функции (*_async) на asyncpg.
+Для offload и async задержка должна оставаться порядка --tick-ms, для blocking - растёт
+до длительности запроса и больше.
+
+Подходит как проверка в CI: с --max-lag-ms скрипт завершается с кодом 1, если максимальная
+задержка для offload или async выше порога. Нужен запущенный PostgreSQL из .env с данными
+(например, после bench_loading.py --seed). Запуск из корня репозитория:
+    python data/benchmarks/bench_event_loop.py --concurrency 20 --repeat 10
+    python data/benchmarks/bench_event_loop.py --max-lag-ms 50
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from database import async_session_factory, get_async_engine, get_sync_engine
+from queries.core import select_workers_core, select_workers_core_async
+from queries.offload import run_in_threadpool, shutdown_threadpool
+from queries.orm import (
+    select_resumes_avg_compensation, select_resumes_avg_compensation_async,
+    select_workers_with_selectin_relationship, select_workers_with_selectin_relationship_async,
+)
+
+
+# Отчёт пишется в настоящий stdout: печать самих синхронных функций отбрасывается (см. ниже).
+report = partial(print, file=sys.stdout)
+
+
+async def _with_session(fn):
+    async with async_session_factory() as session:
+        return await fn(session)
+
+
+# Синхронная функция и её асинхронный вариант.
+PAIRS = {
+    "select_workers_core": (select_workers_core, select_workers_core_async),
+    "select_resumes_avg_compensation": (
+        select_resumes_avg_compensation, lambda: _with_session(select_resumes_avg_compensation_async)),
+    "select_workers_with_selectin_relationship": (
+        select_workers_with_selectin_relationship, lambda: _with_session(select_workers_with_selectin_relationship_async)),
+}
+
+
+def _call(mode: str, sync_fn, async_fn):
+    if mode == "blocking":
+        async def run():
+            sync_fn()
+        return run
+    if mode == "offload":
+        return lambda: run_in_threadpool(sync_fn)
+    return async_fn
+
+
+async def _ticker(interval: float, lags: list[float], stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - expected) * 1000)
+
+
+async def measure(call, concurrency: int, repeat: int, tick: float) -> tuple[float, list[float]]:
+    """Время выполнения concurrency x repeat вызовов (с) и задержки тиков event loop (мс)."""
+    async def worker():
+        for _ in range(repeat):
+            await call()
+
+    lags, stop = [], asyncio.Event()
+    ticker = asyncio.create_task(_ticker(tick, lags, stop))
+    await asyncio.sleep(tick * 2) # Тикер успевает начать отсчёт до нагрузки.
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    return elapsed, lags
+
+
+async def main(args) -> bool:
+    ok = True
+    for name, (sync_fn, async_fn) in PAIRS.items():
+        report(name)
+        for mode in ("blocking", "offload", "async"):
+            call = _call(mode, sync_fn, async_fn)
+            await call() # Прогрев пулов соединений и кэша компиляции.
+            elapsed, lags = await measure(call, args.concurrency, args.repeat, args.tick_ms / 1000)
+            p99 = statistics.quantiles(lags, n=100, method="inclusive")[98] if len(lags) > 1 else max(lags, default=0.0)
+            worst = max(lags, default=0.0)
+            report(
+                f"    {mode:<9} {elapsed:7.2f} s   lag p99 {p99:8.1f} ms   max {worst:8.1f} ms"
+                f"   ticks {len(lags)}"
+            )
+            if mode != "blocking" and args.max_lag_ms is not None and worst > args.max_lag_ms:
+                report(f"    FAIL: {mode} max lag {worst:.1f} ms > --max-lag-ms {args.max_lag_ms}")
+                ok = False
+    await get_async_engine().dispose()
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--tick-ms", type=float, default=5.0)
+    parser.add_argument("--max-lag-ms", type=float, default=None, help="порог задержки для offload и async")
+    args = parser.parse_args()
+
+    get_sync_engine().echo = False
+    with contextlib.redirect_stdout(io.StringIO()):
+        ok = asyncio.run(main(args))
+    shutdown_threadpool()
+    sys.exit(0 if ok else 1)
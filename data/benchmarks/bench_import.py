@@ -0,0 +1,82 @@
+"""
+Время импорта модулей приложения по `python -X importtime` в отдельном чистом процессе.
+Печатает суммарное время импорта каждого модуля из --modules и самые дорогие вложенные импорты,
+а также проверяет, что импорт не создаёт движков, не загружает драйверы БД, не вызывает
+configure_mappers() и не читает настройки (всё это должно происходить лениво, см. database.py и config.py).
+
+Ленивость импорта проверяет и tests/test_import.py (pytest). Здесь с --max-ms скрипт завершается с кодом 1, если импорт
+какого-то модуля дольше порога или ленивость нарушена. БД не нужна. Запуск из корня репозитория:
+    python data/benchmarks/bench_import.py
+    python data/benchmarks/bench_import.py --modules main schemas --max-ms 800 --top 15
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parents[1] # Каталог data/ - в PYTHONPATH дочернего процесса.
+
+# Строка вывода -X importtime: "import time: self [us] | cumulative | imported package".
+_importtime_line = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# Выполняется в дочернем процессе после импорта модуля: что из тяжёлого успело загрузиться.
+_laziness_probe = """
+import sys
+import config, database
+print("engines", sum(f.cache_info().currsize for f in (
+    database.get_sync_engine, database.get_async_engine,
+    database.get_sync_replica_engines, database.get_async_replica_engines)))
+print("settings", config.get_settings.cache_info().currsize)
+print("mappers", sum(m.configured for m in database.Base.registry.mappers))
+print("drivers", sum(name in sys.modules for name in ("psycopg", "asyncpg")))
+"""
+
+
+def import_profile(module: str) -> tuple[list[tuple[int, int, str]], dict[str, int]]:
+    """(self мкс, cumulative мкс, модуль) для верхнеуровневых импортов и счётчики ленивости."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}\n{_laziness_probe}"],
+        cwd=DATA_DIR.parent, # Корень репозитория: там лежит .env.
+        env={**os.environ, "PYTHONPATH": str(DATA_DIR)},
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _importtime_line.match(line)
+        if match:
+            rows.append((int(match[1]), int(match[2]), match[4]))
+            if match[4] == module: # Дальше - импорты самой проверки ленивости.
+                break
+    probe = dict(line.split() for line in proc.stdout.splitlines() if line.count(" ") == 1)
+    return rows, {key: int(value) for key, value in probe.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", nargs="*", default=["main", "schemas", "models", "database", "config"])
+    parser.add_argument("--top", type=int, default=10, help="сколько самых дорогих импортов показать")
+    parser.add_argument("--max-ms", type=float, default=None, help="порог суммарного времени импорта модуля")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        rows, probe = import_profile(module)
+        total = next((cumulative for _, cumulative, name in rows if name == module), 0) / 1000
+        print(
+            f"{module:<12} {total:8.1f} ms   engines={probe['engines']} drivers={probe['drivers']}"
+            f" mappers={probe['mappers']} settings={probe['settings']}"
+        )
+        for self_us, cumulative, name in sorted(rows, key=lambda row: row[0], reverse=True)[:args.top]:
+            print(f"    {name:<48} self {self_us / 1000:7.1f} ms   cumulative {cumulative / 1000:7.1f} ms")
+        if probe["engines"] or probe["drivers"] or probe["mappers"] or probe["settings"]:
+            print(f"    FAIL: import {module} создаёт движки, загружает драйверы БД, настраивает мапперы или читает настройки")
+            failed = True
+        if args.max_ms is not None and total > args.max_ms:
+            print(f"    FAIL: {total:.1f} ms > --max-ms {args.max_ms}")
+            failed = True
+    sys.exit(1 if failed else 0)
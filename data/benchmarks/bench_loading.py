@@ -0,0 +1,179 @@
+"""
+Сравнение стратегий загрузки WorkerOrm.resumes из queries/orm.py:
+lazy, joinedload, selectinload, contains_eager, contains_eager с коррелированным LIMIT и resumes_parttime,
+а также загрузчик первых N резюме из queries/loaders.py (оконная функция и JOIN LATERAL).
+Каждая стратегия выполняется в синхронном и асинхронном режиме; выводятся перцентили задержки,
+число SQL-обращений к БД, число строк, полученных от БД, и пиковая память Python (tracemalloc).
+
+Данные генерируются синтетически: `--workers` работников, число резюме на работника распределено
+по Парето (много работников с 1-2 резюме и немного с десятками), что делает перекос как в реальных данных.
+Нужен запущенный PostgreSQL из .env, таблицы пересоздаются при --seed. Запуск из корня репозитория:
+    python data/benchmarks/bench_loading.py --seed --workers 10000 --repeat 5
+    python data/benchmarks/bench_loading.py --strategies selectin joined --repeat 20
+"""
+import argparse
+import asyncio
+import math
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload, contains_eager
+
+from database import Base, sync_engine, sync_session_factory, async_session_factory
+from instrumentation import track_queries
+from models import WorkerOrm, ResumesOrm
+from queries.bulk import bulk_load
+from queries.loaders import select_workers_with_top_resumes
+
+
+def synthetic_rows(workers: int, alpha: float, max_resumes: int, seed: int = 42):
+    rnd = random.Random(seed)
+    for i in range(workers):
+        for j in range(min(max_resumes, int(rnd.paretovariate(alpha)))):
+            yield {
+                "username": f"user{i}",
+                "lastname": "Bench",
+                "phone_number": i,
+                "title": rnd.choice(["Python", "Go", "Rust", "Java", "SQL"]) + f" developer {j}",
+                "compensation": rnd.randint(30_000, 300_000),
+                "workload": rnd.choice(["parttime", "fulltime"]),
+            }
+
+
+def seed_database(workers: int, alpha: float, max_resumes: int):
+    Base.metadata.drop_all(sync_engine)
+    Base.metadata.create_all(sync_engine)
+    loaded_workers, loaded_resumes = bulk_load(synthetic_rows(workers, alpha, max_resumes), use_copy=True)
+    print(f"seeded {loaded_workers} workers, {loaded_resumes} resumes")
+
+
+def _limit_subquery():
+    return (
+        select(ResumesOrm.id.label("parttime_resumes_id"))
+        .filter(ResumesOrm.worker_id == WorkerOrm.id)
+        .order_by(WorkerOrm.id.desc())
+        .limit(2)
+        .scalar_subquery()
+        .correlate(WorkerOrm)
+    )
+
+
+# Имя стратегии -> (запрос, атрибут коллекции, нужен ли .unique()).
+# Запросы повторяют соответствующие функции queries/orm.py, но без print и с обходом всех работников.
+STRATEGIES = {
+    "lazy": (lambda: select(WorkerOrm), "resumes", False),
+    "joined": (lambda: select(WorkerOrm).options(joinedload(WorkerOrm.resumes)), "resumes", True),
+    "selectin": (lambda: select(WorkerOrm).options(selectinload(WorkerOrm.resumes)), "resumes", False),
+    "contains_eager": (
+        lambda: select(WorkerOrm)
+        .join(WorkerOrm.resumes)
+        .options(contains_eager(WorkerOrm.resumes))
+        .filter(ResumesOrm.workload == "parttime"),
+        "resumes",
+        True,
+    ),
+    "contains_eager_limit": (
+        lambda: select(WorkerOrm)
+        .join(ResumesOrm, ResumesOrm.id.in_(_limit_subquery()))
+        .options(contains_eager(WorkerOrm.resumes)),
+        "resumes",
+        True,
+    ),
+    "top_n_window": (lambda: select_workers_with_top_resumes(2, method="window"), "resumes", True),
+    "top_n_lateral": (lambda: select_workers_with_top_resumes(2, method="lateral"), "resumes", True),
+    "resumes_parttime": (
+        lambda: select(WorkerOrm).options(selectinload(WorkerOrm.resumes_parttime)),
+        "resumes_parttime",
+        False,
+    ),
+}
+
+
+def _load_all(session, query, attr: str, unique: bool) -> int:
+    """Выполняет запрос и обращается к коллекции каждого работника (для lazy это и есть N+1)."""
+    res = session.execute(query)
+    workers = (res.unique() if unique else res).scalars().all()
+    return sum(len(getattr(worker, attr)) for worker in workers)
+
+
+def run_sync(name: str):
+    query, attr, unique = STRATEGIES[name]
+    with sync_session_factory() as session:
+        _load_all(session, query(), attr, unique)
+
+
+async def run_async(name: str):
+    query, attr, unique = STRATEGIES[name]
+    async with async_session_factory() as session:
+        # Ленивая загрузка в AsyncSession возможна только внутри run_sync.
+        await session.run_sync(_load_all, query(), attr, unique)
+
+
+# Один event loop на весь прогон: соединения asyncpg в пуле привязаны к циклу, в котором созданы.
+_loop = asyncio.new_event_loop()
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def measure(name: str, mode: str, repeat: int) -> dict:
+    def once():
+        if mode == "sync":
+            run_sync(name)
+        else:
+            _loop.run_until_complete(run_async(name))
+
+    once() # Прогрев пула соединений и кэша компиляции.
+    latencies = []
+    for _ in range(repeat):
+        with track_queries(f"bench {name} {mode}") as stats:
+            start = time.perf_counter()
+            once()
+            latencies.append(time.perf_counter() - start)
+    # Память меряем отдельным прогоном: tracemalloc сам замедляет выполнение.
+    tracemalloc.start()
+    once()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "p50": percentile(latencies, 50) * 1000,
+        "p95": percentile(latencies, 95) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "round_trips": stats.statements,
+        "rows": stats.rows,
+        "peak_mb": peak / 2**20,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", action="store_true", help="пересоздать таблицы и сгенерировать данные")
+    parser.add_argument("--workers", type=int, default=1_000)
+    parser.add_argument("--alpha", type=float, default=1.5, help="параметр Парето: меньше - сильнее перекос")
+    parser.add_argument("--max-resumes", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--strategies", nargs="*", choices=list(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument("--modes", nargs="*", choices=["sync", "async"], default=["sync", "async"])
+    args = parser.parse_args()
+
+    sync_engine.echo = False
+    if args.seed:
+        seed_database(args.workers, args.alpha, args.max_resumes)
+
+    print(f"{'strategy':<22}{'mode':<7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'trips':>8}{'rows':>10}{'peak MB':>9}")
+    for name in args.strategies:
+        for mode in args.modes:
+            r = measure(name, mode, args.repeat)
+            print(
+                f"{name:<22}{mode:<7}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['p99']:>10.1f}"
+                f"{r['round_trips']:>8}{r['rows']:>10}{r['peak_mb']:>9.1f}"
+            )
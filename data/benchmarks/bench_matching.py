@@ -0,0 +1,104 @@
+"""
+Подбор резюме под вакансию по индексу в памяти (matching.py) на синтетических резюме с почти
+уникальными заголовками ("Bobr.... Python", "Python developer 17"):
+время загрузки индекса, задержка ResumeIndex.match() для вакансий с частыми и редкими словами
+и, для сравнения, полный перебор всех резюме с той же оценкой (как если бы каждый подбор
+читал и оценивал всю таблицу). Плюс стоимость инкрементального обновления одного резюме.
+
+БД не нужна. Запуск из корня репозитория:
+    python data/benchmarks/bench_matching.py --resumes 1000000 --k 10
+"""
+import argparse
+import heapq
+import math
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from matching import ResumeIndex, tokenize, TITLE_WEIGHT, COMPENSATION_WEIGHT, NEUTRAL_FIT
+
+LANGUAGES = ["python", "java", "go", "rust", "kotlin", "javascript", "typescript", "php", "ruby", "scala", "elixir", "haskell"]
+SYLLABLES = ["bo", "br", "vo", "lk", "li", "sa", "mi", "ha", "ny", "ko", "ta", "re", "du", "pe", "ga", "zi", "fo", "lu", "ne", "ch"]
+
+VACANCIES = {
+    "частое слово": ("Python Developer", 150_000),
+    "редкое слово": ("Haskell engineer", 250_000),
+    "без компенсации": ("Senior Go backend", None),
+}
+
+
+def synthetic_resumes(n: int, rnd: random.Random):
+    # Заголовки почти все уникальны, как в репозитории: "Bobr.... Python" (имя работника и язык)
+    # и "Python developer 17" (как в benchmarks/bench_loading.py).
+    for resume_id in range(1, n + 1):
+        # Первые языки встречаются чаще (распределение Ципфа), как и в реальных заголовках.
+        language = LANGUAGES[min(int(rnd.paretovariate(1.2)) - 1, len(LANGUAGES) - 1)]
+        if rnd.random() < 0.7:
+            name = "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4)))
+            title = f"{name.capitalize()}.... {language.capitalize()}"
+        else:
+            title = f"{language.capitalize()} developer {resume_id}"
+        compensation = None if rnd.random() < 0.02 else rnd.randrange(30_000, 400_000, 1_000)
+        yield resume_id, title, compensation
+
+
+def full_scan(index: ResumeIndex, title: str, compensation: int | None, k: int):
+    """Та же оценка перебором всех резюме (нижняя граница стоимости подбора без индекса)."""
+    weights = {token: index._idf(token) for token in tokenize(title)}
+    query_norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    scored = []
+    for resume_id, (tokens, resume_compensation) in index._docs.items():
+        shared = sum(weights[token] ** 2 for token in tokens if token in weights)
+        if not shared:
+            continue
+        doc_norm = math.sqrt(sum(index._idf(token) ** 2 for token in tokens))
+        if compensation is None or resume_compensation is None:
+            fit = NEUTRAL_FIT
+        else:
+            fit = max(0.0, 1 - abs(resume_compensation - compensation) / compensation)
+        scored.append((TITLE_WEIGHT * shared / (query_norm * doc_norm) + COMPENSATION_WEIGHT * fit, -resume_id))
+    return heapq.nlargest(k, scored)
+
+
+def timings(run, repeat: int) -> str:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    quantiles = statistics.quantiles(latencies, n=20, method="inclusive")
+    return f"p50 {quantiles[9]:9.2f} ms   p95 {quantiles[18]:9.2f} ms"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resumes", type=int, default=1_000_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--scan-repeat", type=int, default=3, help="повторов полного перебора (он медленный)")
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    index = ResumeIndex()
+    start = time.perf_counter()
+    index.load(synthetic_resumes(args.resumes, rnd))
+    print(f"load {args.resumes} resumes: {time.perf_counter() - start:.2f} s")
+
+    for name, (title, compensation) in VACANCIES.items():
+        # Сравниваются оценки: резюме с равной оценкой могут попасть в первые k в разном порядке.
+        indexed = [round(m.score, 9) for m in index.match(title, compensation, args.k)]
+        scanned = [round(score, 9) for score, _ in full_scan(index, title, compensation, args.k)]
+        same = "ok" if indexed == scanned else "MISMATCH"
+        print(f"{name:<16} ({title!r}, {compensation}) результат совпадает с перебором: {same}")
+        print(f"    index      {timings(lambda: index.match(title, compensation, args.k), args.repeat)}")
+        print(f"    full scan  {timings(lambda: full_scan(index, title, compensation, args.k), args.scan_repeat)}")
+
+    resume_ids = rnd.sample(range(1, args.resumes + 1), 1000)
+    start = time.perf_counter()
+    for resume_id in resume_ids:
+        index.upsert(resume_id, "Senior Rust developer", rnd.randrange(30_000, 400_000, 1_000))
+    print(f"upsert: {(time.perf_counter() - start) / len(resume_ids) * 1e6:.0f} us на резюме")
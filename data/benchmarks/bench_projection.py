@@ -0,0 +1,54 @@
+"""
+Микробенчмарк сериализации резюме: ORM + model_validate(from_attributes=True) против режима проекции
+(queries/projection.py). Считает резюме в секунду для всего пути "запрос -> JSON-байты".
+
+Нужен запущенный PostgreSQL из .env с данными (например, после bench_bulk.py). Запуск из корня репозитория:
+    python data/benchmarks/bench_projection.py --repeat 5
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from pydantic import TypeAdapter
+from sqlalchemy import select, func
+from sqlalchemy.orm import joinedload, selectinload
+
+from database import sync_engine, sync_session_factory
+from models import ResumesOrm
+from schemas import ResumesRelVacanciesReokiedDTO
+from queries.projection import select_resumes_projection_json
+
+_dto_adapter = TypeAdapter(list[ResumesRelVacanciesReokiedDTO])
+
+
+def orm_json() -> bytes:
+    """Текущий путь: ORM-объекты с отношениями и валидация каждого из них в DTO."""
+    with sync_session_factory() as session:
+        query = (
+            select(ResumesOrm)
+            .options(joinedload(ResumesOrm.worker))
+            .options(selectinload(ResumesOrm.vacancies_replied))
+        )
+        rows = session.execute(query).unique().scalars().all()
+        dto = [ResumesRelVacanciesReokiedDTO.model_validate(row, from_attributes=True) for row in rows]
+        return _dto_adapter.dump_json(dto)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sync_engine.echo = False
+    with sync_session_factory() as session:
+        total = session.execute(select(func.count()).select_from(ResumesOrm)).scalar_one()
+    for name, run in {"orm": orm_json, "projection": select_resumes_projection_json}.items():
+        run() # Прогрев: соединения пула и кэш компиляции запросов.
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            run()
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{name:<11} {elapsed * 1000:9.1f} ms/call {total / elapsed:12.0f} rows/s")
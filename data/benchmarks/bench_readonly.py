@@ -0,0 +1,84 @@
+"""
+Память и время чтения --rows резюме тремя способами:
+- orm: select(ResumesOrm) - ORM-объекты с InstanceState в identity map открытой сессии;
+- rows: те же столбцы строками Core (Row);
+- records: записи только для чтения (queries/readonly.py) - именованные кортежи.
+Память - байты, удерживаемые результатом (по tracemalloc), на строку; время - отдельным прогоном
+без tracemalloc. Плюс отклики (vacancies_replice) ORM-объектами с отложенным cover_letter и с undefer.
+
+Нужен запущенный PostgreSQL из .env с данными (например, после bench_loading.py --seed
+и bench_replies.py). Запуск из корня репозитория:
+    python data/benchmarks/bench_readonly.py --rows 1000000
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from sqlalchemy import select
+from sqlalchemy.orm import undefer
+
+from database import get_sync_engine, sync_session_factory
+from models import ResumesOrm, VacanciesReplioceOrm
+from queries.readonly import get_records, select_records
+
+
+def orm(session, limit: int) -> list:
+    return session.execute(select(ResumesOrm).order_by(ResumesOrm.id).limit(limit)).scalars().all()
+
+
+def rows(session, limit: int) -> list:
+    return session.execute(select_records(ResumesOrm).order_by(ResumesOrm.id).limit(limit)).all()
+
+
+def records(session, limit: int) -> list:
+    return get_records(session, ResumesOrm, select_records(ResumesOrm).order_by(ResumesOrm.id).limit(limit))
+
+
+def replies_deferred(session, limit: int) -> list:
+    return session.execute(select(VacanciesReplioceOrm).limit(limit)).scalars().all()
+
+
+def replies_undefer(session, limit: int) -> list:
+    query = select(VacanciesReplioceOrm).options(undefer(VacanciesReplioceOrm.cover_letter)).limit(limit)
+    return session.execute(query).scalars().all()
+
+
+def measure(load, limit: int) -> tuple[int, float, float]:
+    """Число строк, байты на строку, удерживаемые результатом вместе с сессией, и время загрузки (с)."""
+    with sync_session_factory() as session:
+        load(session, 1) # Прогрев: соединение, компиляция запроса, настройка мапперов.
+    with sync_session_factory() as session:
+        start = time.perf_counter()
+        result = load(session, limit)
+        elapsed = time.perf_counter() - start
+        del result
+    gc.collect()
+    with sync_session_factory() as session:
+        tracemalloc.start()
+        result = load(session, limit)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        count = len(result)
+    return count, size / max(count, 1), elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    get_sync_engine().echo = False
+    base = None
+    for name, load in {"orm": orm, "rows": rows, "records": records}.items():
+        count, per_row, elapsed = measure(load, args.rows)
+        base = base or per_row
+        print(f"{name:<8} {count:>9} резюме   {per_row:8.1f} B/строку (x{base / per_row:.1f} к orm)   {elapsed:6.2f} s")
+    for name, load in {"replies, cover_letter deferred": replies_deferred, "replies, undefer(cover_letter)": replies_undefer}.items():
+        count, per_row, elapsed = measure(load, args.rows)
+        print(f"{name:<31} {count:>9} откликов   {per_row:8.1f} B/строку   {elapsed:6.2f} s")
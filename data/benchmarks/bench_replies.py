@@ -0,0 +1,83 @@
+"""
+Бенчмарк откликов резюме на вакансии: путь add_vacansies_and_replice() (session.get +
+vacancies_replied.append на каждое резюме) против add_replies из queries/replies.py.
+
+Нужен запущенный PostgreSQL из .env, таблицы пересоздаются. Запуск из корня репозитория:
+    python data/benchmarks/bench_replies.py --resumes 100000 --vacancies 1
+    python data/benchmarks/bench_replies.py --resumes 20000 --vacancies 5 --skip-orm
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from sqlalchemy import insert, select
+
+from database import Base, sync_engine, sync_session_factory
+from models import ResumesOrm, VacanciesOrm
+from queries.bulk import bulk_load
+from queries.replies import add_replies, remove_replies
+
+
+def reset_tables(resumes: int, vacancies: int) -> tuple[list[int], list[int]]:
+    Base.metadata.drop_all(sync_engine)
+    Base.metadata.create_all(sync_engine)
+    bulk_load(
+        (
+            {
+                "username": f"user{i}",
+                "lastname": "Bench",
+                "phone_number": i,
+                "title": "Python developer",
+                "compensation": 100_000,
+                "workload": "fulltime",
+            }
+            for i in range(resumes)
+        ),
+        use_copy=True,
+    )
+    with sync_engine.begin() as conn:
+        vacancy_ids = conn.execute(
+            insert(VacanciesOrm).returning(VacanciesOrm.id, sort_by_parameter_order=True),
+            [{"title": f"Vacancy {i}", "compensation": 150_000} for i in range(vacancies)],
+        ).scalars().all()
+        resume_ids = conn.execute(select(ResumesOrm.id).order_by(ResumesOrm.id)).scalars().all()
+    return vacancy_ids, resume_ids
+
+
+def replies_orm(vacancy_ids: list[int], resume_ids: list[int]) -> None:
+    """Текущий путь: ORM-объекты и коллекция vacancies_replied каждого резюме."""
+    with sync_session_factory() as session:
+        vacancies = [session.get(VacanciesOrm, vacancy_id) for vacancy_id in vacancy_ids]
+        for resume_id in resume_ids:
+            resume = session.get(ResumesOrm, resume_id)
+            resume.vacancies_replied.extend(vacancies)
+        session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resumes", type=int, default=100_000)
+    parser.add_argument("--vacancies", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--skip-orm", action="store_true", help="не запускать медленный ORM-путь")
+    args = parser.parse_args()
+
+    sync_engine.echo = False
+    vacancy_ids, resume_ids = reset_tables(args.resumes, args.vacancies)
+    replies = len(vacancy_ids) * len(resume_ids)
+    runs = {
+        "add_replies": lambda: add_replies(vacancy_ids, resume_ids, "Hello", args.batch_size),
+        # Повторный вызов: все пары уже есть, работает только ON CONFLICT DO NOTHING.
+        "add_replies_again": lambda: add_replies(vacancy_ids, resume_ids, "Hello", args.batch_size),
+        "remove_replies": lambda: remove_replies(vacancy_ids, resume_ids, args.batch_size),
+    }
+    if not args.skip_orm:
+        runs["orm_append"] = lambda: replies_orm(vacancy_ids, resume_ids)
+    for name, run in runs.items():
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<18} {elapsed:8.2f} s {replies / elapsed:12.0f} replies/s")
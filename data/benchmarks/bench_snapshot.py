@@ -0,0 +1,165 @@
+"""
+Колоночный снимок резюме (snapshot.py) на синтетических строках:
+- память на строку: снимок против ORM-объектов ResumesOrm + WorkerOrm (как после загрузки
+  session.execute(select(ResumesOrm).options(joinedload(...)))) и против списка кортежей;
+- время полной загрузки, догрузки изменённых строк и расчётов (средние по занятости,
+  перцентили, гистограмма, первые по превышению средней) с проверкой по прямому подсчёту.
+С NumPy расчёты векторизованы, без него - циклы Python (режим печатается).
+
+С --db дополнительно сравнивает с PostgreSQL из .env: загрузка снимка из БД против
+запроса join_cte_subquery_window_func (compensation_diff_query) на тех же данных
+(например, после bench_loading.py --seed). Запуск из корня репозитория:
+    python data/benchmarks/bench_snapshot.py --resumes 1000000
+    python data/benchmarks/bench_snapshot.py --resumes 100000 --db
+"""
+import argparse
+import asyncio
+import gc
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from enums import Workload
+from snapshot import ResumeSnapshot, resume_snapshot, _numpy
+
+LANGUAGES = ["Python", "Java", "Go", "Rust", "Kotlin", "JavaScript", "TypeScript", "PHP"]
+LEVELS = ["Junior", "Middle", "Senior", "Lead"]
+
+
+def synthetic_rows(n: int, rnd: random.Random) -> list[tuple]:
+    """Строки (id, worker_id, title, compensation, workload, username): в среднем два резюме на работника."""
+    workloads = list(Workload)
+    rows = []
+    for resume_id in range(1, n + 1):
+        worker_id = rnd.randrange(1, n // 2 + 2)
+        title = f"{rnd.choice(LEVELS)} {rnd.choice(LANGUAGES)} developer"
+        compensation = None if rnd.random() < 0.02 else rnd.randrange(30_000, 400_000, 1_000)
+        rows.append((resume_id, worker_id, title, compensation, rnd.choice(workloads), f"worker_{worker_id}"))
+    return rows
+
+
+def allocated(build) -> tuple[object, int]:
+    """Результат build() и байты, которые он удерживает (по tracemalloc)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def loaded_snapshot(rows: list[tuple]) -> ResumeSnapshot:
+    snapshot = ResumeSnapshot()
+    snapshot.load(rows)
+    return snapshot
+
+
+def orm_objects(rows: list[tuple]) -> list:
+    from models import ResumesOrm, WorkerOrm
+
+    workers = {}
+    resumes = []
+    for resume_id, worker_id, title, compensation, workload, username in rows:
+        worker = workers.get(worker_id)
+        if worker is None:
+            worker = workers[worker_id] = WorkerOrm(id=worker_id, username=username)
+        resumes.append(ResumesOrm(id=resume_id, worker_id=worker_id, title=title, compensation=compensation, workload=workload, worker=worker))
+    return resumes
+
+
+def timings(run, repeat: int) -> str:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    quantiles = statistics.quantiles(latencies, n=20, method="inclusive") if len(latencies) > 1 else latencies * 19
+    return f"p50 {quantiles[9]:9.2f} ms   p95 {quantiles[18]:9.2f} ms"
+
+
+def check(snapshot: ResumeSnapshot, rows: list[tuple]) -> bool:
+    """Средние по занятости и превышение средней совпадают с прямым подсчётом по строкам."""
+    sums, counts = {}, {}
+    for _, _, _, compensation, workload, _ in rows:
+        if compensation is not None:
+            sums[workload] = sums.get(workload, 0) + compensation
+            counts[workload] = counts.get(workload, 0) + 1
+    averages = {workload: sums[workload] / counts[workload] for workload in sums}
+    if any(abs(snapshot.avg_compensation_by_workload()[workload] - average) > 1e-6 for workload, average in averages.items()):
+        return False
+    rounded = {workload: int(average + 0.5) for workload, average in averages.items()}
+    expected = sorted((compensation - rounded[workload] for _, _, _, compensation, workload, _ in rows if compensation is not None), reverse=True)
+    return [diff.compensation_diff for diff in snapshot.compensation_diff(100)] == expected[:100]
+
+
+async def compare_with_db(repeat: int) -> None:
+    from database import async_session_factory, get_async_engine
+    from queries.statements import compensation_diff_query
+    from queries.snapshot import load_resume_snapshot
+
+    async with async_session_factory() as session:
+        start = time.perf_counter()
+        count = await load_resume_snapshot(session)
+        print(f"db: load snapshot of {count} resumes: {time.perf_counter() - start:.2f} s, {resume_snapshot.memory_bytes() / count:.1f} B/row")
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = (await session.execute(compensation_diff_query(limited=True), {"limit": 10})).all()
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"db: join_cte_subquery_window_func, limit 10   p50 {statistics.median(latencies):9.2f} ms")
+        print(f"db: snapshot compensation_diff(10)            {timings(lambda: resume_snapshot.compensation_diff(10), repeat)}")
+        # PostgreSQL ставит NULL первыми при DESC - сравниваются только строки с компенсацией.
+        from_db = [row.compensation_diff for row in rows if row.compensation_diff is not None]
+        from_snapshot = [diff.compensation_diff for diff in resume_snapshot.compensation_diff(10)][:len(from_db)]
+        print(f"db: результат совпадает: {'ok' if from_db == from_snapshot else 'MISMATCH'}")
+    await get_async_engine().dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resumes", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--orm-resumes", type=int, default=100_000, help="строк для замера памяти ORM-объектов (они тяжёлые)")
+    parser.add_argument("--db", action="store_true", help="сравнить с запросом к PostgreSQL из .env")
+    args = parser.parse_args()
+
+    print(f"расчёты: {'numpy' if _numpy() is not None else 'python (numpy не установлен)'}")
+    rnd = random.Random(42)
+    rows = synthetic_rows(args.resumes, rnd)
+
+    snapshot = ResumeSnapshot()
+    start = time.perf_counter()
+    snapshot.load(rows)
+    print(f"load {args.resumes} resumes: {time.perf_counter() - start:.2f} s")
+
+    sample = rows[:args.orm_resumes]
+    loaded, snapshot_bytes = allocated(lambda: loaded_snapshot(sample))
+    _, tuple_bytes = allocated(lambda: [tuple(row) for row in synthetic_rows(len(sample), random.Random(42))])
+    _, orm_bytes = allocated(lambda: orm_objects(sample))
+    print(f"память на строку ({len(sample)} строк):")
+    print(f"    snapshot      {snapshot_bytes / len(sample):8.1f} B   (memory_bytes(): {loaded.memory_bytes() / len(sample):.1f} B)")
+    print(f"    tuples        {tuple_bytes / len(sample):8.1f} B")
+    print(f"    ORM objects   {orm_bytes / len(sample):8.1f} B   (x{orm_bytes / snapshot_bytes:.0f} к снимку)")
+
+    print(f"совпадает с прямым подсчётом: {'ok' if check(snapshot, rows) else 'MISMATCH'}")
+    print(f"avg_compensation_by_workload  {timings(snapshot.avg_compensation_by_workload, args.repeat)}")
+    print(f"compensation_percentiles      {timings(snapshot.compensation_percentiles, args.repeat)}")
+    print(f"compensation_histogram        {timings(snapshot.compensation_histogram, args.repeat)}")
+    print(f"compensation_diff(10)         {timings(lambda: snapshot.compensation_diff(10), args.repeat)}")
+
+    changed = [
+        (resume_id, rnd.randrange(1, args.resumes // 2 + 2), "Senior Rust developer", rnd.randrange(30_000, 400_000, 1_000), Workload.fulltime, "worker_x")
+        for resume_id in rnd.sample(range(1, args.resumes + 1), 1000)
+    ]
+    start = time.perf_counter()
+    snapshot.upsert(changed)
+    print(f"upsert: {(time.perf_counter() - start) / len(changed) * 1e6:.1f} us на строку")
+
+    if args.db:
+        asyncio.run(compare_with_db(args.repeat))
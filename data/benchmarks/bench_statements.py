@@ -0,0 +1,124 @@
+"""
+Микробенчмарк накладных расходов Python на один вызов горячего запроса:
+- rebuild_literal: как было в select_resumes_avg_compensation() - select() строится заново и
+  печатается через compile(literal_binds=True), которая не кэшируется;
+- rebuild: select() строится на каждый вызов, SQLAlchemy находит SQL в кэше по ключу запроса;
+- bindparam: запрос построен один раз на уровне модуля (queries/statements.py), меняются только параметры;
+- lambda: lambda_stmt.
+SQL у всех вариантов одинаковый, поэтому разница во времени - это работа Python до отправки запроса.
+Дополнительно: страница резюме, построенная заново, через lambda_stmt и заранее построенная
+с bindparam, как в queries/repository.py. Для ORM-запросов lambda_stmt не выигрывает: при каждом
+выполнении ORM заново обходит и копирует запрос, чтобы подставить параметры.
+
+Нужен запущенный PostgreSQL из .env (хватит пустых таблиц). Запуск из корня репозитория:
+    python data/benchmarks/bench_statements.py --calls 5000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from sqlalchemy import select, func, cast, and_, lambda_stmt, Integer
+from sqlalchemy.orm import joinedload, selectinload
+
+from database import sync_engine, sync_session_factory
+from models import ResumesOrm, Workload
+from queries.statements import avg_compensation_by_language_query
+from queries.repository import _resumes_page_query
+
+PARAMS = {"like_language": "Python", "min_compensation": 40000, "min_avg_compensation": 70000}
+
+
+def _avg_query(like_language: str):
+    return (
+        select(ResumesOrm.workload, cast(func.avg(ResumesOrm.compensation), Integer).label("avg_compensation"))
+        .filter(and_(ResumesOrm.title.contains(like_language), ResumesOrm.compensation > 40000))
+        .group_by(ResumesOrm.workload)
+        .having(cast(func.avg(ResumesOrm.compensation), Integer) > 70000)
+    )
+
+
+def rebuild_literal(session):
+    query = _avg_query("Python")
+    str(query.compile(compile_kwargs={"literal_binds": True})) # Вместо print, чтобы не мерить вывод в консоль.
+    session.execute(query).all()
+
+
+def rebuild(session):
+    session.execute(_avg_query("Python")).all()
+
+
+def bindparam_stmt(session):
+    session.execute(avg_compensation_by_language_query, PARAMS).all()
+
+
+def lambda_avg(session):
+    like_language = "Python"
+    query = lambda_stmt(
+        lambda: select(ResumesOrm.workload, cast(func.avg(ResumesOrm.compensation), Integer).label("avg_compensation"))
+        .filter(and_(ResumesOrm.title.contains(like_language), ResumesOrm.compensation > 40000))
+        .group_by(ResumesOrm.workload)
+        .having(cast(func.avg(ResumesOrm.compensation), Integer) > 70000)
+    )
+    session.execute(query).all()
+
+
+def page_rebuild(session, workload=Workload.fulltime, after_id=0, limit=50):
+    query = (
+        select(ResumesOrm)
+        .options(joinedload(ResumesOrm.worker))
+        .options(selectinload(ResumesOrm.vacancies_replied))
+        .filter(ResumesOrm.workload == workload, ResumesOrm.id > after_id)
+        .order_by(ResumesOrm.id)
+        .limit(limit + 1)
+    )
+    session.execute(query).unique().scalars().all()
+
+
+def page_lambda(session, workload=Workload.fulltime, after_id=0, limit=50):
+    fetch = limit + 1
+    query = lambda_stmt(
+        lambda: select(ResumesOrm)
+        .options(joinedload(ResumesOrm.worker))
+        .options(selectinload(ResumesOrm.vacancies_replied))
+        .order_by(ResumesOrm.id)
+        .limit(fetch)
+    )
+    query += lambda s: s.filter(ResumesOrm.workload == workload)
+    query += lambda s: s.filter(ResumesOrm.id > after_id)
+    session.execute(query).unique().scalars().all()
+
+
+def page_prebuilt(session, workload=Workload.fulltime, after_id=0, limit=50):
+    params = {"fetch": limit + 1, "workload": workload, "after_id": after_id}
+    session.execute(_resumes_page_query(frozenset(params)), params).unique().scalars().all()
+
+
+VARIANTS = {
+    "rebuild_literal": rebuild_literal,
+    "rebuild": rebuild,
+    "bindparam": bindparam_stmt,
+    "lambda": lambda_avg,
+    "page_rebuild": page_rebuild,
+    "page_lambda": page_lambda,
+    "page_prebuilt": page_prebuilt,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=5_000)
+    args = parser.parse_args()
+
+    sync_engine.echo = False
+    with sync_session_factory() as session:
+        for name, run in VARIANTS.items():
+            for _ in range(100): # Прогрев: соединение, кэш компиляции, подготовленные операторы psycopg.
+                run(session)
+            start = time.perf_counter()
+            for _ in range(args.calls):
+                run(session)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<16} {elapsed / args.calls * 1e6:9.1f} us/call")
@@ -0,0 +1,91 @@
+"""
+Бенчмарк синхронизации из внешнего источника: построчное обновление, как в update_workers_core()
+(UPDATE по id, своё соединение и commit на строку), против upsert_workers/upsert_resumes и
+update_compensations из queries/upsert.py (одна транзакция, один запрос на пачку).
+
+Нужен запущенный PostgreSQL из .env, таблицы пересоздаются. Запуск из корня репозитория:
+    python data/benchmarks/bench_upsert.py --rows 50000
+    python data/benchmarks/bench_upsert.py --rows 200000 --skip-per-row
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from sqlalchemy import select, update
+
+from database import Base, sync_engine, async_engine
+from models import WorkerOrm, ResumesOrm
+from queries.bulk import bulk_load
+from queries.upsert import upsert_workers, upsert_resumes, update_compensations
+
+
+def reset_tables(rows: int) -> list[dict]:
+    Base.metadata.drop_all(sync_engine)
+    Base.metadata.create_all(sync_engine)
+    bulk_load(
+        (
+            {
+                "username": f"user{i}",
+                "lastname": "Bench",
+                "phone_number": i,
+                "title": "Python developer",
+                "compensation": 100_000,
+                "workload": "fulltime",
+            }
+            for i in range(rows)
+        ),
+        use_copy=True,
+    )
+    with sync_engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(select(ResumesOrm.id, ResumesOrm.worker_id).order_by(ResumesOrm.id))]
+
+
+def per_row_compensations(compensations: dict[int, int]) -> None:
+    """Текущий путь: отдельное соединение, UPDATE и commit на каждое резюме."""
+    for resume_id, compensation in compensations.items():
+        with sync_engine.connect() as conn:
+            conn.execute(update(ResumesOrm).values(compensation=compensation).filter_by(id=resume_id))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--chunk-size", type=int, default=1_000)
+    parser.add_argument("--skip-per-row", action="store_true", help="не запускать построчный путь")
+    args = parser.parse_args()
+
+    sync_engine.echo = False
+    resumes = reset_tables(args.rows)
+    rnd = random.Random(42)
+    compensations = {r["id"]: rnd.randint(30_000, 300_000) for r in resumes}
+    workers = [{"id": r["worker_id"], "username": f"user{i}", "lastname": "Synced", "phone_number": i} for i, r in enumerate(resumes)]
+    resume_rows = [
+        {"id": r["id"], "title": "Python developer", "compensation": compensations[r["id"]], "workload": "parttime", "worker_id": r["worker_id"]}
+        for r in resumes
+    ]
+    runs = {
+        "upsert_workers": lambda: upsert_workers(workers, args.chunk_size),
+        "upsert_resumes": lambda: upsert_resumes(resume_rows, args.chunk_size),
+        "update_compensations": lambda: update_compensations(compensations, args.chunk_size * 10),
+    }
+
+    async def run_async():
+        for name, run in runs.items():
+            start = time.perf_counter()
+            await run()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<22} {elapsed:8.2f} s {args.rows / elapsed:12.0f} rows/s")
+        await async_engine.dispose()
+
+    asyncio.run(run_async())
+    if not args.skip_per_row:
+        start = time.perf_counter()
+        per_row_compensations(compensations)
+        elapsed = time.perf_counter() - start
+        print(f"{'per_row_update':<22} {elapsed:8.2f} s {args.rows / elapsed:12.0f} rows/s")
@@ -0,0 +1,106 @@
+"""
+Поток частых правок резюме: --clients корутин присылают по --edits правок компенсации
+случайным резюме из --hot самых "горячих". Сравниваются:
+- per-edit: UPDATE по id и commit на каждую правку (как update_workers_core);
+- write-behind: resume_writes.update() из queries/writebehind.py - правки сливаются
+  и пишутся пачками одним UPDATE ... FROM unnest(...).
+Печатает правки в секунду, число транзакций и метрики очереди (слитые правки, пачки,
+ожидание при противодавлении). В конце проверяет, что в БД записано последнее принятое значение каждого резюме.
+
+Нужен запущенный PostgreSQL из .env с резюме (например, после bench_loading.py --seed).
+Запуск из корня репозитория:
+    python data/benchmarks/bench_writebehind.py --clients 50 --edits 200 --hot 1000
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # Каталог data/, как при запуске main.py.
+
+from sqlalchemy import bindparam, func, select, update
+
+from database import get_async_engine
+from models import ResumesOrm
+from queries.writebehind import ResumeWriteBehind
+
+_update_one_query = (
+    update(ResumesOrm)
+    .where(ResumesOrm.id == bindparam("resume_id"))
+    .values(compensation=bindparam("compensation"), updated_at=func.timezone("utc", func.now()))
+)
+
+
+async def per_edit(edits: list[list[tuple[int, int]]]) -> int:
+    async def client(stream):
+        for resume_id, compensation in stream:
+            async with get_async_engine().begin() as conn:
+                await conn.execute(_update_one_query, {"resume_id": resume_id, "compensation": compensation})
+
+    await asyncio.gather(*(client(stream) for stream in edits))
+    return sum(map(len, edits))
+
+
+async def write_behind(edits: list[list[tuple[int, int]]], queue: ResumeWriteBehind) -> list[tuple[int, int]]:
+    """Правки в порядке, в котором очередь их приняла."""
+    accepted = []
+
+    async def client(stream):
+        for resume_id, compensation in stream:
+            await queue.update(resume_id, compensation=compensation)
+            accepted.append((resume_id, compensation)) # update() без wait принимает правку без переключения задач.
+            await asyncio.sleep(0) # Клиенты чередуются, как запросы в приложении.
+
+    await asyncio.gather(*(client(stream) for stream in edits))
+    await queue.close()
+    return accepted
+
+
+async def check(accepted: list[tuple[int, int]]) -> bool:
+    """В БД - последнее принятое значение каждого резюме."""
+    expected = dict(accepted)
+    async with get_async_engine().connect() as conn:
+        rows = await conn.execute(select(ResumesOrm.id, ResumesOrm.compensation).where(ResumesOrm.id.in_(expected)))
+        return dict(rows.tuples().all()) == expected
+
+
+async def main(args) -> None:
+    async with get_async_engine().connect() as conn:
+        ids = (await conn.execute(select(ResumesOrm.id).order_by(ResumesOrm.id).limit(args.hot))).scalars().all()
+    rnd = random.Random(42)
+
+    def edits():
+        return [[(rnd.choice(ids), rnd.randrange(30_000, 400_000, 1_000)) for _ in range(args.edits)] for _ in range(args.clients)]
+
+    if not args.skip_per_edit:
+        start = time.perf_counter()
+        count = await per_edit(edits())
+        elapsed = time.perf_counter() - start
+        print(f"per-edit      {count / elapsed:10.0f} правок/с   транзакций {count}")
+
+    queue = ResumeWriteBehind(delay=args.delay, max_batch=args.max_batch, max_pending=args.max_pending)
+    start = time.perf_counter()
+    accepted = await write_behind(edits(), queue)
+    elapsed = time.perf_counter() - start
+    count = len(accepted)
+    stats = queue.stats()
+    print(f"write-behind  {count / elapsed:10.0f} правок/с   транзакций {stats['batches']}")
+    print(f"    слито {stats['coalesced']}, записано резюме {stats['written']}, ошибок {stats['failed']}, "
+          f"ожиданий места {stats['backpressure_waits']} ({stats['backpressure_seconds']:.2f} s)")
+    print(f"    результат совпадает с последними правками: {'ok' if await check(accepted) else 'MISMATCH'}")
+    await get_async_engine().dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--edits", type=int, default=200, help="правок на клиента")
+    parser.add_argument("--hot", type=int, default=1000, help="число резюме, которые правятся")
+    parser.add_argument("--delay", type=float, default=0.05)
+    parser.add_argument("--max-batch", type=int, default=1000)
+    parser.add_argument("--max-pending", type=int, default=10_000)
+    parser.add_argument("--skip-per-edit", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args))
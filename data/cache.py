@@ -0,0 +1,237 @@
+import asyncio
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from itertools import chain
+from typing import Awaitable, Callable, Iterable, Protocol
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from cdc import ChangeEvent, ChangeOp
+from config import settings
+from models import WorkerOrm, ResumesOrm, VacanciesOrm, VacanciesReplioceOrm
+
+# Кэш готовых JSON-ответов для DTO-эндпоинтов.
+# Ключ - имя запроса и его параметры, значение - сериализованные байты ответа, поэтому при попадании
+# не нужны ни запрос к Postgres, ни валидация Pydantic. Каждая запись помечена тегами - именами таблиц,
+# из которых собран ответ; после коммита, изменившего строки этих таблиц, записи с такими тегами удаляются.
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> bytes | None: ...
+    async def set(self, key: str, value: bytes, tags: Iterable[str]) -> None: ...
+    # Синхронный: вызывается и из событий Session, и из синхронного кода в потоках.
+    def invalidate(self, tags: Iterable[str]) -> None: ...
+
+
+class LRUCache:
+    """LRU-кэш в памяти процесса с TTL. Потокобезопасен: синхронные сессии могут жить в потоках."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, bytes, tuple[str, ...]]] = OrderedDict()
+        self._tags: dict[str, set[str]] = {} # тег -> ключи с этим тегом
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> bytes | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value, _ = item
+            if expires_at < time.monotonic():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, tags: Iterable[str]) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._pop(next(iter(self._data)))
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._pop(key)
+
+    def _pop(self, key: str) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            for tag in item[2]:
+                keys = self._tags.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+
+
+class RedisCache:
+    """
+    Кэш в Redis (или совместимом сервере), общий для нескольких процессов приложения.
+    Для каждого тега хранится множество ключей. get/set идут через асинхронный клиент (redis.asyncio)
+    и не блокируют event loop; запись значения и тегов - один pipeline, то есть один обмен с сервером.
+    invalidate синхронный (его вызывают события Session): в event loop удаление запускается задачей
+    на асинхронном клиенте, и следующий get этого процесса сначала дожидается её, а вне event loop
+    (синхронный код в потоках, скрипты) выполняется синхронным клиентом - блокируется только этот поток.
+    Клиенты передаются готовыми, поэтому в тестах вместо сервера подходят fakeredis.FakeAsyncRedis()
+    и fakeredis.FakeRedis().
+    """
+
+    def __init__(self, client, sync_client=None, ttl: float = 30.0, prefix: str = "sqlstart:cache:"):
+        self.client = client
+        self.sync_client = sync_client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._pending: set[asyncio.Task] = set() # Незавершённые удаления по тегам.
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float = 30.0) -> "RedisCache":
+        import redis # Необязательная зависимость: нужна только при CACHE_BACKEND=redis.
+        import redis.asyncio
+        # Клиенты не подключаются при создании: соединения открываются при первой команде.
+        return cls(redis.asyncio.Redis.from_url(url), redis.Redis.from_url(url), ttl)
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    async def get(self, key: str) -> bytes | None:
+        if self._pending: # Не отдавать ответ, который этот процесс уже инвалидировал.
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, tags: Iterable[str]) -> None:
+        ttl = max(1, int(self.ttl))
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(self.prefix + key, value, ex=ttl)
+            for tag in tags:
+                pipe.sadd(self._tag_key(tag), self.prefix + key)
+                pipe.expire(self._tag_key(tag), ttl)
+            await pipe.execute()
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            if self.sync_client is None:
+                raise
+            self._invalidate_sync(tag_keys)
+            return
+        task = asyncio.create_task(self._invalidate(tag_keys))
+        self._pending.add(task)
+        task.add_done_callback(self._invalidated)
+
+    def _invalidated(self, task: asyncio.Task) -> None:
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # Записи с этими тегами доживут до TTL; запрос, который записывал, уже закоммичен.
+            warnings.warn(f"Не удалось инвалидировать кэш в Redis: {task.exception()!r}", RuntimeWarning)
+
+    async def _invalidate(self, tag_keys: list[str]) -> None:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = await pipe.execute()
+        await self.client.delete(*tag_keys, *chain.from_iterable(members))
+
+    def _invalidate_sync(self, tag_keys: list[str]) -> None:
+        with self.sync_client.pipeline(transaction=False) as pipe:
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = pipe.execute()
+        self.sync_client.delete(*tag_keys, *chain.from_iterable(members))
+
+
+class ResultCache:
+    """
+    Read-through кэш поверх бэкенда. Для каждого тега ведётся номер поколения: если пока
+    считался ответ, таблица успела измениться, результат отдаётся клиенту, но не кэшируется.
+    """
+
+    def __init__(self, backend: CacheBackend | None = None):
+        self._backend = backend
+        self._generations: dict[str, int] = {}
+
+    @property
+    def backend(self) -> CacheBackend:
+        """Бэкенд; по умолчанию - из настроек CACHE_*, создаётся при первом обращении, а не при импорте."""
+        if self._backend is None:
+            self._backend = _backend_from_settings()
+        return self._backend
+
+    @staticmethod
+    def make_key(name: str, **params) -> str:
+        return name + "?" + "&".join(f"{k}={params[k]}" for k in sorted(params))
+
+    async def get_or_set(self, key: str, tags: Iterable[str], produce: Callable[[], Awaitable[BaseModel]]) -> bytes:
+        cached = await self.backend.get(key)
+        if cached is not None:
+            return cached
+        tags = tuple(tags)
+        generations = [self._generations.get(tag, 0) for tag in tags]
+        value = (await produce()).model_dump_json().encode()
+        if generations == [self._generations.get(tag, 0) for tag in tags]:
+            await self.backend.set(key, value, tags)
+        return value
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        tags = tuple(tags)
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+        self.backend.invalidate(tags)
+
+
+def _backend_from_settings() -> CacheBackend:
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCache.from_url(settings.REDIS_URL, settings.CACHE_TTL)
+    return LRUCache(settings.CACHE_MAXSIZE, settings.CACHE_TTL)
+
+
+result_cache = ResultCache()
+
+
+# Инвалидация по событиям сессии. AsyncSession работает поверх обычной Session,
+# поэтому события срабатывают и для асинхронного кода.
+# Запись через Core (например, queries/bulk.py) сессию не проходит и вызывает invalidate сама.
+CACHED_MODELS = (WorkerOrm, ResumesOrm, VacanciesOrm, VacanciesReplioceOrm)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_dirty_tables(session, flush_context):
+    tables = session.info.setdefault("cache_dirty_tables", set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, CACHED_MODELS):
+            tables.add(obj.__table__.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    tables = session.info.pop("cache_dirty_tables", None)
+    if tables:
+        result_cache.invalidate(tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop("cache_dirty_tables", None)
+
+
+def invalidate_changed_tables(events: list[ChangeEvent]) -> None:
+    """
+    Подписчик change_feed (cdc.py): сбрасывает ответы по таблицам, изменённым другими процессами
+    и в обход сессии. Для кэша в памяти процесса это единственный способ узнать о чужих записях.
+    После reset (часть событий могла быть пропущена) сбрасываются все таблицы.
+    """
+    if any(event.op is ChangeOp.reset for event in events):
+        result_cache.invalidate(model.__table__.name for model in CACHED_MODELS)
+    else:
+        result_cache.invalidate({event.table for event in events})
@@ -0,0 +1,232 @@
+import asyncio
+import enum
+import inspect
+import json
+import time
+from typing import Any, Awaitable, Callable, Iterable, NamedTuple
+from sqlalchemy import make_url
+from config import settings
+from instrumentation import Metric, render_stats
+from models import CDC_CHANNEL
+
+# Поток изменений таблиц (CDC) внутри процесса: вместо опроса таблиц потребители (кэш ответов,
+# индекс подбора, снимок для аналитики) получают изменения по мере коммитов - в том числе сделанные
+# другими процессами и в обход ORM.
+# Источник - триггеры CDC_DDL (models.py, миграция a9c4e1f7b352): NOTIFY с таблицей, операцией и ключами строк.
+# ChangeFeed держит отдельное соединение asyncpg с LISTEN (не из пула движка: оно занято всё время
+# работы), разбирает уведомления в ChangeEvent и раз в CDC_BATCH_SECONDS раздаёт накопленное
+# подписчикам пачкой, по порядку. Подряд идущие события одной таблицы и операции сливаются в одно.
+# Уведомления, пришедшие, пока соединения не было, теряются: после каждого подключения (и при
+# переполнении буфера) подписчики получают событие ChangeOp.reset и должны перечитать данные целиком.
+
+Key = int | tuple[int, ...] # id или составной ключ (resume_id, vacancy_id) для vacancies_replice.
+
+
+class ChangeOp(enum.Enum):
+    insert = "I"
+    update = "U"
+    delete = "D"
+    truncate = "T" # Таблица очищена, ключей нет.
+    reset = "R" # Часть изменений могла быть пропущена (подключение, переполнение), table = None.
+
+
+class ChangeEvent(NamedTuple):
+    table: str | None
+    op: ChangeOp
+    ids: tuple[Key, ...]
+
+
+Subscriber = Callable[[list[ChangeEvent]], Awaitable[None] | None]
+
+
+def parse_notification(payload: str) -> ChangeEvent:
+    """Событие из полезной нагрузки NOTIFY: {"t": таблица, "op": "I"/"U"/"D"/"T", "ids": [...]}."""
+    data = json.loads(payload)
+    ids = tuple(tuple(key) if isinstance(key, list) else key for key in data.get("ids") or ())
+    return ChangeEvent(data["t"], ChangeOp(data["op"]), ids)
+
+
+def _coalesce(events: list[ChangeEvent]) -> list[ChangeEvent]:
+    """Сливает подряд идущие события одной таблицы и операции (порядок событий сохраняется)."""
+    merged: list[ChangeEvent] = []
+    for event in events:
+        last = merged[-1] if merged else None
+        if last is not None and last.table == event.table and last.op == event.op and event.op in (ChangeOp.insert, ChangeOp.update, ChangeOp.delete):
+            merged[-1] = last._replace(ids=tuple(dict.fromkeys(last.ids + event.ids)))
+        elif last is None or last != event or event.ids: # Повторные truncate/reset подряд - одно событие.
+            merged.append(event)
+    return merged
+
+
+CDC_METRICS = (
+    Metric("connected", "gauge", "Соединение LISTEN установлено (1) или нет (0)."),
+    Metric("buffered", "gauge", "События, ожидающие раздачи подписчикам."),
+    Metric("notifications", "counter", "Полученные уведомления NOTIFY."),
+    Metric("bad_notifications", "counter", "Уведомления, которые не удалось разобрать."),
+    Metric("batches", "counter", "Пачки событий, разосланные подписчикам."),
+    Metric("events", "counter", "События, разосланные подписчикам (после слияния)."),
+    Metric("reconnects", "counter", "Переподключения слушателя."),
+    Metric("overflows", "counter", "Переполнения буфера событий (подписчики получили reset)."),
+    Metric("subscriber_errors", "counter", "Ошибки подписчиков."),
+    Metric("last_delivery_lag", "gauge", "Секунд от первого уведомления последней пачки до конца её раздачи.", "seconds"),
+)
+
+
+class ChangeFeed:
+    """
+    Подписка на изменения таблиц через LISTEN/NOTIFY. Работает в одном event loop:
+    start() при запуске приложения, stop() при остановке. Параметры по умолчанию - настройки CDC_*.
+    """
+
+    def __init__(self, batch_seconds: float | None = None, max_buffered: int | None = None, keepalive_seconds: float | None = None):
+        self._batch_seconds, self._max_buffered, self._keepalive_seconds = batch_seconds, max_buffered, keepalive_seconds
+        self._subscribers: list[tuple[Subscriber, frozenset[str] | None]] = []
+        self._buffer: list[ChangeEvent] = []
+        self._listen_task: asyncio.Task | None = None
+        self._dispatch_task: asyncio.Task | None = None
+        self.connected = False
+        # Метрики.
+        self.notifications = 0
+        self.bad_notifications = 0
+        self.batches = 0
+        self.events = 0 # События, разосланные подписчикам (после слияния).
+        self.reconnects = 0
+        self.overflows = 0 # Переполнения буфера (вместо событий подписчики получили reset).
+        self.subscriber_errors = 0
+        self.last_error: str | None = None
+        self.last_delivery_lag = 0.0 # Секунд от получения первого уведомления пачки до конца её раздачи.
+
+    def subscribe(self, subscriber: Subscriber, tables: Iterable[str] | None = None) -> Callable[[], None]:
+        """
+        Подписывает функцию (обычную или асинхронную) на пачки событий таблиц `tables`
+        (None - всех). События reset получают все подписчики. Возвращает функцию отписки.
+        Ошибка подписчика учитывается в метриках и не мешает остальным.
+        """
+        entry = (subscriber, None if tables is None else frozenset(tables))
+        self._subscribers.append(entry)
+        return lambda: self._subscribers.remove(entry) if entry in self._subscribers else None
+
+    def start(self) -> None:
+        if self._listen_task is None:
+            self._batch_seconds = settings.CDC_BATCH_SECONDS if self._batch_seconds is None else self._batch_seconds
+            self._max_buffered = settings.CDC_MAX_BUFFERED_EVENTS if self._max_buffered is None else self._max_buffered
+            self._keepalive_seconds = settings.CDC_KEEPALIVE_SECONDS if self._keepalive_seconds is None else self._keepalive_seconds
+            self._has_events = asyncio.Event()
+            self._first_event_at = 0.0
+            self._listen_task = asyncio.create_task(self._listen())
+            self._dispatch_task = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self) -> None:
+        """Закрывает соединение и раздаёт события, уже полученные к этому моменту."""
+        for task in (self._listen_task, self._dispatch_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listen_task = self._dispatch_task = None
+        if self._buffer:
+            await self._dispatch()
+
+    def _enqueue(self, event: ChangeEvent) -> None:
+        if not self._buffer:
+            self._first_event_at = time.monotonic()
+        if len(self._buffer) >= self._max_buffered:
+            # Подписчики не успевают: вместо накопленных событий - одно reset (перечитать целиком).
+            self.overflows += 1
+            self._buffer = [ChangeEvent(None, ChangeOp.reset, ())]
+        self._buffer.append(event)
+        self._has_events.set()
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        self.notifications += 1
+        try:
+            event = parse_notification(payload)
+        except (ValueError, KeyError, TypeError):
+            self.bad_notifications += 1
+            return
+        self._enqueue(event)
+
+    async def _listen(self) -> None:
+        import asyncpg # Драйвер нужен только слушателю: не импортируется вместе с модулем.
+
+        dsn = make_url(settings.DATABASE_URL_asyncpg).set(drivername="postgresql").render_as_string(hide_password=False)
+        delay, first = 0.5, True
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn, timeout=10)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(CDC_CHANNEL, self._on_notification)
+                self.connected = True
+                # Пока соединения не было, уведомления терялись: данные, прочитанные подписчиками до этого
+                # (в том числе до первого подключения), перечитываются.
+                self._enqueue(ChangeEvent(None, ChangeOp.reset, ()))
+                if not first:
+                    self.reconnects += 1
+                first, delay = False, 0.5
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), self._keepalive_seconds)
+                    except TimeoutError:
+                        # Обрыв сети без закрытия соединения иначе не заметить: проверочный запрос.
+                        await asyncio.wait_for(connection.fetchval("SELECT 1"), 10)
+            except Exception as e: # Слушатель не должен останавливаться: любая ошибка - переподключение.
+                self.last_error = f"{type(e).__name__}: {e}"
+            finally:
+                self.connected = False
+                if connection is not None and not connection.is_closed():
+                    connection.terminate()
+            await asyncio.sleep(delay) # Переподключение с экспоненциальной паузой до 30 с.
+            delay = min(delay * 2, 30.0)
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            await self._has_events.wait()
+            await asyncio.sleep(self._batch_seconds) # Окно накопления пачки.
+            self._has_events.clear()
+            await self._dispatch()
+
+    async def _dispatch(self) -> None:
+        events, self._buffer = _coalesce(self._buffer), []
+        if not events:
+            return
+        self.batches += 1
+        self.events += len(events)
+        for subscriber, tables in list(self._subscribers):
+            selected = events if tables is None else [e for e in events if e.table is None or e.table in tables]
+            if not selected:
+                continue
+            try:
+                result = subscriber(selected)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.subscriber_errors += 1
+                self.last_error = f"{getattr(subscriber, '__qualname__', subscriber)}: {type(e).__name__}: {e}"
+        self.last_delivery_lag = time.monotonic() - self._first_event_at
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "buffered": len(self._buffer),
+            "subscribers": len(self._subscribers),
+            "notifications": self.notifications,
+            "bad_notifications": self.bad_notifications,
+            "batches": self.batches,
+            "events": self.events,
+            "reconnects": self.reconnects,
+            "overflows": self.overflows,
+            "subscriber_errors": self.subscriber_errors,
+            "last_error": self.last_error,
+            "last_delivery_lag": self.last_delivery_lag,
+        }
+
+    def render_prometheus(self) -> str:
+        """Метрики потока изменений в текстовом формате Prometheus (дополняют instrumentation.render_prometheus)."""
+        return "\n".join(render_stats("sqlstart_cdc", CDC_METRICS, self.stats())) + "\n"
+
+
+change_feed = ChangeFeed()
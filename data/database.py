@@ -1,34 +1,258 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
-from sqlalchemy import URL, create_engine, text, String
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase, configure_mappers
+from sqlalchemy import URL, Engine, Select, create_engine, event, make_url, text, String
 from config import settings
+from instrumentation import TimedQueuePool, TimedAsyncAdaptedQueuePool, TimedNullPool
 import asyncio
-from typing import Annotated
+import itertools
+import time
+from functools import cache
+from uuid import uuid4
+from typing import Annotated, AsyncIterator
+
+# Параметры пула соединений из настроек (одинаковые для обоих движков).
+# Пулы - подклассы стандартных с замером выдачи соединений (instrumentation.py), их состояние видно в /pool и /metrics.
+def _pool_options(pool_class) -> dict:
+    if settings.DB_NULL_POOL:
+        # За pgbouncer держать свой пул бессмысленно: каждое соединение открывается к pgbouncer
+        # и закрывается сразу после использования, а реальные соединения с БД переиспользует он.
+        return {"poolclass": TimedNullPool, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    return {
+        "poolclass": pool_class,
+        "pool_size": settings.DB_POOL_SIZE, # Начальный размер пула соединений (количество одновременно активных подключений к БД).
+        "max_overflow": settings.DB_MAX_OVERFLOW, # Максимальное количество дополнительных соединений при перегрузке пула.
+        "pool_timeout": settings.DB_POOL_TIMEOUT, # Время ожидания свободного соединения.
+        "pool_recycle": settings.DB_POOL_RECYCLE, # Максимальный возраст соединения.
+        "pool_pre_ping": settings.DB_POOL_PRE_PING, # Проверка соединения перед выдачей.
+    }
+
+
+# Кэш подготовленных операторов asyncpg: повторный запрос с тем же SQL не разбирается и не планируется
+# сервером заново, а выполняется по готовому prepared statement соединения.
+# pgbouncer в режиме transaction/statement не гарантирует, что следующий запрос попадёт в то же
+# серверное соединение, поэтому за ним (DB_NULL_POOL) имена операторов делаются уникальными,
+# а кэш asyncpg выключается - иначе "prepared statement ... does not exist".
+def _asyncpg_connect_args() -> dict:
+    if settings.DB_NULL_POOL:
+        return {
+            "prepared_statement_cache_size": 0,
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE}
+
+
+# Движки создаются при первом обращении (get_sync_engine() и т.д.), а не при импорте модуля:
+# создание движка загружает драйвер (psycopg, asyncpg) и читает настройки, а коротким CLI-задачам,
+# которые до БД не доходят, это не нужно. Серверы создают всё заранее через warm_up().
+# Прежние имена модуля (sync_engine, async_engine, ...) работают через __getattr__ ниже.
 
 # Создание синхронного движка SQLAlchemy
-sync_engine = create_engine(
-    url=settings.DATABASE_URL_psyconf, # Указываем URL для подключения к синхронной базе данных (например, PostgreSQL, SQLite).
-    echo=True, # Если True, SQLAlchemy будет выводить в консоль все сгенерированные SQL-запросы (полезно для отладки).
-    pool_size=5, # Устанавливаем начальный размер пула соединений (количество одновременно активных подключений к БД).
-    max_overflow=10, # Определяем максимальное количество дополнительных соединений, которые могут быть созданы при перегрузке пула.
-)
+@cache
+def get_sync_engine() -> Engine:
+    return create_engine(
+        url=settings.DATABASE_URL_psyconf, # Указываем URL для подключения к синхронной базе данных (например, PostgreSQL, SQLite).
+        echo=settings.DB_ECHO, # Если True, SQLAlchemy будет выводить в консоль все сгенерированные SQL-запросы (полезно для отладки).
+                               # По умолчанию выключено: в работе статистику запросов собирает instrumentation.py.
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE, # Размер кэша скомпилированных SQL-операторов.
+        pool_logging_name="sync", # Имя пула в логах и метриках.
+        **_pool_options(TimedQueuePool),
+    )
 
 # Создание асинхронного движка SQLAlchemy (для асинхронной работы с базой данных)
-async_engine = create_async_engine(
-    url=settings.DATABASE_URL_asyncpg, # Указываем URL для подключения к асинхронной базе данных (например, PostgreSQL с asyncpg).
-    echo=False, # Отключаем вывод SQL-запросов для асинхронного движка.
-    pool_size=5, # Устанавливаем начальный размер пула асинхронных соединений.
-    max_overflow=10, # Определяем максимальное количество дополнительных асинхронных соединений.
-)
+@cache
+def get_async_engine() -> AsyncEngine:
+    return create_async_engine(
+        url=settings.DATABASE_URL_asyncpg, # Указываем URL для подключения к асинхронной базе данных (например, PostgreSQL с asyncpg).
+        echo=False, # Отключаем вывод SQL-запросов для асинхронного движка.
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        connect_args=_asyncpg_connect_args(),
+        pool_logging_name="async",
+        **_pool_options(TimedAsyncAdaptedQueuePool),
+    )
+
+# Реплики только для чтения из настроек: по синхронному и асинхронному движку на каждую.
+def _async_url(url: str) -> URL:
+    url = make_url(url)
+    drivers = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+    return url.set(drivername=drivers.get(url.get_backend_name(), url.drivername))
+
+
+def _replica_connect_args(url: URL) -> dict:
+    return _asyncpg_connect_args() if url.get_driver_name() == "asyncpg" else {}
+
+
+@cache
+def get_sync_replica_engines() -> list[Engine]:
+    return [
+        create_engine(
+            url,
+            query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+            pool_logging_name=f"sync_replica{i}",
+            **_pool_options(TimedQueuePool),
+        )
+        for i, url in enumerate(settings.DB_REPLICA_URLS)
+    ]
+
+
+@cache
+def get_async_replica_engines() -> list[AsyncEngine]:
+    return [
+        create_async_engine(
+            url,
+            query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+            connect_args=_replica_connect_args(url),
+            pool_logging_name=f"async_replica{i}",
+            **_pool_options(TimedAsyncAdaptedQueuePool),
+        )
+        for i, url in enumerate(map(_async_url, settings.DB_REPLICA_URLS))
+    ]
+
+
+_lazy_attributes = {
+    "sync_engine": get_sync_engine,
+    "async_engine": get_async_engine,
+    "sync_replica_engines": get_sync_replica_engines,
+    "async_replica_engines": get_async_replica_engines,
+}
+
+
+def __getattr__(name: str):
+    # `database.sync_engine` создаёт движок при первом обращении. `from database import sync_engine`
+    # тоже работает, но создаёт движок уже при импорте - в модулях приложения вместо него get_sync_engine().
+    if name in _lazy_attributes:
+        return _lazy_attributes[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_last_write_at = 0.0 # time.monotonic() последнего коммита с изменениями в этом процессе.
+_round_robin = itertools.count() # Общий счётчик для выбора реплики по кругу.
+
+
+def mark_primary_write():
+    """Отмечает запись на основной сервер в обход сессии (Core, COPY) для окна "чтения своих записей"."""
+    global _last_write_at
+    _last_write_at = time.monotonic()
+
+
+def _replicas_allowed() -> bool:
+    window = settings.DB_READ_YOUR_WRITES_SECONDS
+    return not window or time.monotonic() - _last_write_at >= window
+
+
+def _next_replica(replicas: list):
+    return replicas[next(_round_robin) % len(replicas)]
+
+
+class RoutingSession(Session):
+    """
+    Сессия с разделением чтения и записи.
+    На реплику (одну на всю жизнь сессии, выбранную по кругу) уходят только SELECT без FOR UPDATE.
+    На основной сервер идут flush, INSERT/UPDATE/DELETE, text() и всё остальное, а также любые
+    чтения после первой записи в этой сессии и, если включено окно DB_READ_YOUR_WRITES_SECONDS,
+    чтения вскоре после коммита с изменениями. Без реплик ведёт себя как обычная Session.
+    Сессия без явного bind берёт основной движок из primary_engine() при первом запросе
+    (по умолчанию - синхронный get_sync_engine()).
+    """
+
+    primary_engine = staticmethod(get_sync_engine)
+
+    @staticmethod
+    def replica_engines() -> list[Engine]:
+        return []
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replicas = self.replica_engines()
+        if replicas:
+            if clause is not None and clause.is_dml:
+                self.info["wrote"] = True
+            elif (
+                not self._flushing
+                and not self.info.get("wrote")
+                and isinstance(clause, Select)
+                and clause._for_update_arg is None
+                and _replicas_allowed()
+            ):
+                if "replica" not in self.info:
+                    self.info["replica"] = _next_replica(replicas)
+                return self.info["replica"]
+        if self.bind is None:
+            return self.primary_engine()
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _routing_after_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _routing_after_commit(session):
+    if session.info.get("wrote"):
+        mark_primary_write()
+
+
+class SyncRoutingSession(RoutingSession):
+    replica_engines = staticmethod(get_sync_replica_engines)
+
+
+class AsyncRoutingSession(RoutingSession):
+    # AsyncSession работает поверх обычной Session, которой нужны синхронные "лица" асинхронных движков.
+    @staticmethod
+    def primary_engine() -> Engine:
+        return get_async_engine().sync_engine
+
+    @staticmethod
+    @cache
+    def replica_engines() -> list[Engine]:
+        return [engine.sync_engine for engine in get_async_replica_engines()]
+
+
+def sync_read_engine() -> Engine:
+    """Движок для чтения через Core (`with sync_read_engine().connect()`): реплика по кругу или основной."""
+    replicas = get_sync_replica_engines()
+    if replicas and _replicas_allowed():
+        return _next_replica(replicas)
+    return get_sync_engine()
+
+
+def async_read_engine() -> AsyncEngine:
+    """Асинхронный вариант `sync_read_engine` (`async with async_read_engine().connect()`)."""
+    replicas = get_async_replica_engines()
+    if replicas and _replicas_allowed():
+        return _next_replica(replicas)
+    return get_async_engine()
+
 
 # Создание фабрики сессий для синхронной работы с базой данных
-sync_session_factory = sessionmaker(sync_engine) # 'sessionmaker' создает фабрику, которая при вызове генерирует объекты сессий,
-                                               # использующие указанный синхронный движок. Сессия управляет всеми операциями
-                                               # с базой данных для определенного "рабочего процесса".
+sync_session_factory = sessionmaker(
+    # 'sessionmaker' создает фабрику, которая при вызове генерирует объекты сессий,
+    # использующие синхронный движок. Сессия управляет всеми операциями
+    # с базой данных для определенного "рабочего процесса".
+    # Движок не передаётся: сессия возьмёт его из get_sync_engine() при первом запросе.
+    class_=SyncRoutingSession, # Чтения могут уходить на реплики, запись - всегда на sync_engine.
+)
 
 # Создание фабрики сессий для асинхронной работы с базой данных
-async_session_factory = async_sessionmaker(async_engine) # Аналогично 'sessionmaker', но для асинхронного движка.
-                                                     # Асинхронные сессии используются с ключевыми словами 'async with'.
+async_session_factory = async_sessionmaker(
+    # Аналогично 'sessionmaker', но для асинхронного движка (get_async_engine()).
+    # Асинхронные сессии используются с ключевыми словами 'async with'.
+    sync_session_class=AsyncRoutingSession,
+)
+
+
+def warm_up() -> None:
+    """
+    Подготовка сервера до первого запроса: создание движков (загрузка драйверов, пулы) и
+    configure_mappers() - разбор всех relationship моделей, который иначе выполнится на первом запросе.
+    Коротким CLI-задачам вызывать не нужно: всё это произойдёт лениво и только если понадобится.
+    """
+    import models # noqa: F401 - регистрирует все модели в Base.registry.
+    configure_mappers()
+    get_sync_engine()
+    get_async_engine()
+    get_sync_replica_engines()
+    get_async_replica_engines()
 
 # Ограничение на длину строкового поля (использование typing.Annotated)
 str_256 = Annotated[str, 256] # 'Annotated' используется для добавления метаданных к типам.
@@ -36,6 +260,19 @@ str_256 = Annotated[str, 256] # 'Annotated' используется для до
                                # что это строка с максимальной длиной 256 символов.
                                # SQLAlchemy будет использовать эту информацию при создании схемы базы данных.
 
+@cache
+def _repr_columns(cls) -> tuple[str, ...]:
+    """
+    Столбцы, которые показывает repr объекта класса `cls`:
+    1. имя столбца явно указано в `cls.repr_cols` ИЛИ
+    2. индекс столбца меньше `cls.repr_cols_nums` (то есть, это один из первых N столбцов).
+    """
+    return tuple(
+        col for idx, col in enumerate(cls.__table__.columns.keys())
+        if col in cls.repr_cols or idx < cls.repr_cols_nums
+    )
+
+
 # Базовый класс для определения ORM моделей (наследуются от него ваши таблицы)
 class Base(DeclarativeBase):
     """
@@ -47,6 +284,9 @@ class Base(DeclarativeBase):
         str_256: String(256) # Указываем SQLAlchemy, что когда встречается аннотация типа 'str_256',
                              # соответствующий столбец в базе данных должен быть типа String с длиной 256.
     }
+    # Столбцы для repr по умолчанию (модели переопределяют): первые repr_cols_nums и перечисленные в repr_cols.
+    repr_cols_nums = 3
+    repr_cols = ()
     # def __repr__(self):
     #     cols = [{f"{col}={getattr(self, col)}" for col in self.__table__.columns.keys()}]
     #     return f"<{self.__class__.__name__} {','.join(str(i) for i in cols)}>" 
@@ -58,20 +298,24 @@ class Base(DeclarativeBase):
         Это помогает сделать отладку и логирование более информативными,
         показывая ключевые поля объекта.
         """
-        cols = [] # Создаем пустой список для хранения строковых представлений столбцов.
-        # Итерируем по всем столбцам таблицы, к которой привязана эта ORM-модель.
-        # `self.__table__.columns.keys()` возвращает список имен столбцов.
-        for idx, col in enumerate(self.__table__.columns.keys()):
-            # Проверяем, должен ли столбец быть включен в repr:
-            # 1. Если имя столбца явно указано в `self.repr_cols` ИЛИ
-            # 2. Если индекс столбца меньше `self.repr_cols_nums` (то есть, это один из первых N столбцов).
-            if col in self.repr_cols or idx < self.repr_cols_nums:
-                # Если условие выполняется, форматируем строку в виде "имя_столбца=значение_столбца"
-                # `getattr(self, col)` динамически получает значение атрибута (столбца) по его имени.
-                cols.append(f"{col}={getattr(self, col)}")
+        # Имена столбцов для repr вычисляются один раз на класс (см. _repr_columns),
+        # а не перебором `__table__.columns` при каждом вызове.
+        # `getattr(self, col)` динамически получает значение атрибута (столбца) по его имени.
+        cols = [f"{col}={getattr(self, col)}" for col in _repr_columns(type(self))]
         # Формируем финальную строку repr.
         # - `<{self.__class__.__name__}`: Начинаем с имени класса (например, "<WorkerOrm").
         # - `{','.join(str(i) for i in cols)}`: Объединяем все отформатированные строки столбцов
         #   в одну строку, разделяя их запятыми.
         # - `>`: Закрываем угловую скобку.
-        return f"<{self.__class__.__name__} {','.join(str(i) for i in cols)}>"
\ No newline at end of file
+        return f"<{self.__class__.__name__} {','.join(str(i) for i in cols)}>"
+
+
+# Зависимость FastAPI: одна асинхронная сессия на один HTTP-запрос
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """
+    Открывает асинхронную сессию на время обработки запроса и закрывает её после ответа.
+    Используется через `Depends(get_async_session)`, поэтому каждый запрос получает
+    собственное соединение из пула `async_engine` и не ждёт остальные запросы.
+    """
+    async with async_session_factory() as session:
+        yield session
@@ -0,0 +1,12 @@
+import enum
+
+# Перечисления, общие для моделей (models.py) и DTO (schemas.py). Вынесены из models.py,
+# чтобы импорт схем и других лёгких модулей не тянул за собой SQLAlchemy и все ORM-модели.
+
+
+class Workload(enum.Enum):
+    """
+    Enum (перечисление) для представления возможных вариантов занятости.
+    """
+    parttime = "parttime" # Вариант "parttime".
+    fulltime = "fulltime" # Вариант "fulltime".
@@ -0,0 +1,353 @@
+import re
+import threading
+import time
+import warnings
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterable, Mapping, NamedTuple
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool, AsyncAdaptedQueuePool, NullPool
+from sqlalchemy.orm import Session
+from config import settings
+
+# Инструментирование SQL-запросов вместо echo=True:
+# - время выполнения каждого оператора (гистограмма по нормализованному тексту SQL);
+# - число операторов и длительность на один HTTP-запрос (или на блок `track_queries`);
+# - детектор N+1: повторные ленивые загрузки одного и того же отношения в рамках запроса;
+# - состояние пулов соединений: занятые соединения, overflow, ожидание и задержка выдачи соединения;
+# - вывод всего этого в текстовом формате Prometheus для эндпоинта /metrics.
+# События вешаются на класс Engine, поэтому покрывают и sync_engine, и async_engine.
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+MAX_STATEMENTS = 500 # Ограничение числа различных SQL в метриках, остальное идёт в "other".
+
+
+class NPlusOneError(Exception):
+    """Ленивая загрузка одного отношения повторилась слишком много раз за один запрос."""
+
+
+class NPlusOneWarning(UserWarning):
+    """То же, что NPlusOneError, но в режиме предупреждения."""
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+def render_metric(name: str, kind: str, help_text: str, samples: Mapping[str, Any]) -> list[str]:
+    """
+    Строки HELP, TYPE и значений одной метрики. Ключи `samples` - метки ('' - без меток),
+    значения - числа (bool пишется как 0/1) или Histogram для kind="histogram".
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples.items():
+        if isinstance(value, Histogram):
+            lines += value.render(name, labels)
+            continue
+        if isinstance(value, bool):
+            value = int(value)
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+    return lines
+
+
+class Metric(NamedTuple):
+    """Числовая метрика из словаря stats(): ключ, тип Prometheus, описание и единица измерения."""
+    key: str
+    kind: str
+    help_text: str
+    unit: str = ""
+
+    def name(self, prefix: str) -> str:
+        # Соглашение Prometheus: <префикс>_<ключ>[_<единица>][_total для counter].
+        return f"{prefix}_{self.key}" + (f"_{self.unit}" if self.unit else "") + ("_total" if self.kind == "counter" else "")
+
+
+def render_stats(prefix: str, metrics: Iterable[Metric], values: Mapping[str, Any]) -> list[str]:
+    """Метрики `metrics` без меток со значениями из `values` (по Metric.key)."""
+    lines = []
+    for metric in metrics:
+        lines += render_metric(metric.name(prefix), metric.kind, metric.help_text, {"": values[metric.key]})
+    return lines
+
+
+class RequestStats:
+    """Счётчики одного HTTP-запроса (или блока track_queries)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.statements = 0
+        self.rows = 0 # Строки, возвращённые или затронутые операторами (cursor.rowcount).
+        self.lazy_loads: Counter[str] = Counter()
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("sqlstart_request_stats", default=None)
+_lock = threading.Lock()
+_statement_durations: dict[str, Histogram] = {}
+_request_statements: dict[str, Histogram] = {}
+_request_durations: dict[str, Histogram] = {}
+_n_plus_one: Counter[str] = Counter()
+
+_whitespace = re.compile(r"\s+")
+# IN (...) и VALUES (...), (...) раскрываются в переменное число параметров - сворачиваем их.
+_param_list = re.compile(r"\((?:\s*(?:\$\d+|%\(\w+\)s|\?|:\w+)\s*,?)+\)")
+_values_list = re.compile(r"(VALUES \(\.\.\.\))(?:, \(\.\.\.\))+")
+
+
+def normalize_statement(statement: str) -> str:
+    statement = _whitespace.sub(" ", statement).strip()
+    statement = _param_list.sub("(...)", statement)
+    return _values_list.sub(r"\1", statement)
+
+
+def _observe(registry: dict[str, Histogram], key: str, value: float, buckets: tuple):
+    histogram = registry.get(key)
+    if histogram is None:
+        if len(registry) >= MAX_STATEMENTS:
+            key = "other"
+        histogram = registry.setdefault(key, Histogram(buckets))
+    histogram.observe(value)
+
+
+# Время начала операторов соединения по id контекста выполнения (курсора, если контекста нет).
+# Оператор, упавший с ошибкой, не доходит до after_cursor_execute - его запись убирает handle_error,
+# иначе conn.info рос бы на каждой ошибке.
+def _statement_key(cursor, context) -> int:
+    return id(context if context is not None else cursor)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", {})[_statement_key(cursor, context)] = time.perf_counter()
+
+
+@event.listens_for(Engine, "handle_error")
+def _forget_failed_statement(exception_context):
+    conn, context = exception_context.connection, exception_context.execution_context
+    if conn is not None and context is not None:
+        conn.info.get("query_start_time", {}).pop(id(context), None)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop(_statement_key(cursor, context))
+    with _lock:
+        _observe(_statement_durations, normalize_statement(statement), elapsed, DURATION_BUCKETS)
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.rows += max(cursor.rowcount, 0)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _detect_lazy_load(orm_execute_state):
+    stats = _current.get()
+    if stats is None or orm_execute_state.lazy_loaded_from is None:
+        return
+    relationship = str(orm_execute_state.loader_strategy_path.path[-1]) # например "WorkerOrm.resumes"
+    stats.lazy_loads[relationship] += 1
+    if stats.lazy_loads[relationship] == settings.N_PLUS_ONE_THRESHOLD:
+        with _lock:
+            _n_plus_one[relationship] += 1
+        message = (
+            f"{stats.name}: {relationship} загружено лениво {settings.N_PLUS_ONE_THRESHOLD} раз "
+            f"- похоже на N+1, используйте selectinload/joinedload"
+        )
+        if settings.N_PLUS_ONE_RAISE:
+            raise NPlusOneError(message)
+        warnings.warn(message, NPlusOneWarning, stacklevel=2)
+
+
+@contextmanager
+def track_queries(name: str):
+    """
+    Считает SQL-операторы и ленивые загрузки внутри блока и пишет их в метрики под именем `stats.name`
+    (изначально `name`; middleware уточняет его шаблоном маршрута, когда тот становится известен).
+    Middleware в main.py оборачивает так каждый HTTP-запрос; скрипты и бенчмарки могут использовать напрямую.
+    """
+    stats = RequestStats(name)
+    token = _current.set(stats)
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        with _lock:
+            _observe(_request_statements, stats.name, stats.statements, COUNT_BUCKETS)
+            _observe(_request_durations, stats.name, time.perf_counter() - start, DURATION_BUCKETS)
+
+
+class PoolStats:
+    """Счётчики одного пула соединений; ключ - pool_logging_name движка ("sync", "async")."""
+
+    def __init__(self):
+        self.checkout_latency = Histogram(DURATION_BUCKETS) # Время pool.connect(): ожидание, connect, pre_ping.
+        self.checked_out = 0 # Выданные и ещё не возвращённые соединения.
+        self.waits = 0 # Выдачи, когда все pool_size + max_overflow соединений были заняты.
+        self.wait_seconds = 0.0
+        self.timeouts = 0 # Ожидание дольше pool_timeout (sqlalchemy.exc.TimeoutError).
+
+
+_pools: dict[str, Pool] = {}
+_pool_stats: dict[str, PoolStats] = {}
+
+
+def _pool_name(pool: Pool) -> str:
+    return pool._orig_logging_name or "default"
+
+
+class _TimedPoolMixin:
+    """
+    Замеряет задержку выдачи соединения. У пула нет события "до checkout", поэтому
+    переопределяется connect(); recreate() создаёт экземпляр того же класса и с тем же
+    logging_name, так что статистика переживает пересоздание пула (например, после разрыва соединений).
+    """
+
+    def connect(self):
+        name = _pool_name(self)
+        with _lock:
+            _pools[name] = self
+            stats = _pool_stats.setdefault(name, PoolStats())
+        # max_overflow = -1 - переполнение не ограничено: ожидания свободного соединения не бывает.
+        exhausted = isinstance(self, QueuePool) and self._max_overflow >= 0 and self.checkedout() >= self.size() + self._max_overflow
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            with _lock:
+                stats.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with _lock:
+                stats.checkout_latency.observe(elapsed)
+                if exhausted:
+                    stats.waits += 1
+                    stats.wait_seconds += elapsed
+        with _lock:
+            stats.checked_out += 1
+            self._counted_records.add(connection._connection_record)
+        return connection
+
+    @property
+    def _counted_records(self) -> set:
+        """Записи соединений, выдачу которых учёл connect() и возврат которых ещё не учтён."""
+        records = self.__dict__.get("_timed_records")
+        if records is None:
+            records = self.__dict__["_timed_records"] = set()
+        return records
+
+    def _do_return_conn(self, record):
+        # Вызывается при возврате соединения в пул, в том числе после invalidate() и detach(),
+        # а также когда выдача не удалась (ошибка pre_ping и переподключения) - такую выдачу
+        # connect() не учитывал, поэтому и вычитать её нельзя.
+        with _lock:
+            if record in self._counted_records:
+                self._counted_records.discard(record)
+                _pool_stats[_pool_name(self)].checked_out -= 1
+        super()._do_return_conn(record)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(_TimedPoolMixin, NullPool):
+    pass
+
+
+def pool_status() -> dict[str, dict]:
+    """Текущее состояние всех инструментированных пулов (для /pool и /metrics)."""
+    status = {}
+    with _lock:
+        for name, pool in _pools.items():
+            stats = _pool_stats[name]
+            queue_pool = isinstance(pool, QueuePool)
+            status[name] = {
+                "pool_class": type(pool).__name__,
+                "size": pool.size() if queue_pool else 0,
+                "max_overflow": pool._max_overflow if queue_pool else 0, # -1 - без ограничения.
+                "checked_in": pool.checkedin() if queue_pool else 0,
+                "checked_out": stats.checked_out,
+                "overflow": max(pool.overflow(), 0) if queue_pool else 0,
+                "checkouts": stats.checkout_latency.count,
+                "checkout_seconds_sum": stats.checkout_latency.sum,
+                "waits": stats.waits,
+                "wait_seconds": stats.wait_seconds,
+                "timeouts": stats.timeouts,
+            }
+    return status
+
+
+POOL_METRICS = (
+    Metric("size", "gauge", "Постоянный размер пула (pool_size)."),
+    Metric("checked_out", "gauge", "Соединения, выданные из пула."),
+    Metric("overflow", "gauge", "Открытые соединения сверх pool_size."),
+    Metric("waits", "counter", "Выдачи соединения при полностью занятом пуле."),
+    Metric("wait_seconds", "counter", "Суммарное время ожидания свободного соединения."),
+    Metric("timeouts", "counter", "Ожидания соединения дольше pool_timeout."),
+)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus() -> str:
+    """Все метрики в текстовом формате Prometheus (text/plain; version=0.0.4)."""
+    lines = []
+    with _lock:
+        lines += render_metric(
+            "sqlstart_sql_statement_duration_seconds", "histogram", "Время выполнения SQL по нормализованному тексту.",
+            {f'statement="{_label(statement)}"': histogram for statement, histogram in _statement_durations.items()},
+        )
+        lines += render_metric(
+            "sqlstart_request_sql_statements", "histogram", "Число SQL-операторов на один запрос.",
+            {f'endpoint="{_label(endpoint)}"': histogram for endpoint, histogram in _request_statements.items()},
+        )
+        lines += render_metric(
+            "sqlstart_request_duration_seconds", "histogram", "Длительность запроса.",
+            {f'endpoint="{_label(endpoint)}"': histogram for endpoint, histogram in _request_durations.items()},
+        )
+        lines += render_metric(
+            "sqlstart_n_plus_one_total", "counter", "Запросы, в которых обнаружен N+1 по отношению.",
+            {f'relationship="{_label(relationship)}"': count for relationship, count in _n_plus_one.items()},
+        )
+        lines += render_metric(
+            "sqlstart_pool_checkout_duration_seconds", "histogram", "Время получения соединения из пула.",
+            {f'pool="{_label(name)}"': stats.checkout_latency for name, stats in _pool_stats.items()},
+        )
+    status = pool_status()
+    for metric in POOL_METRICS:
+        samples = {f'pool="{_label(name)}"': values[metric.key] for name, values in status.items()}
+        lines += render_metric(metric.name("sqlstart_pool"), metric.kind, metric.help_text, samples)
+    return "\n".join(lines) + "\n"
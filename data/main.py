@@ -1,30 +1,56 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 import uvicorn
 import asyncio
+from contextlib import asynccontextmanager
+from typing import Annotated
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Абсолютные импорты ваших модулей
-from queries.core import create_table_core, insert_data_core, select_workers_core, update_workers_core
-from queries.orm import (
-    create_table_orm,
-    insert_table_orm,
-    select_workers_orm,
-    select_resumes_avg_compensation,
-    join_cte_subquery_window_func,
-    select_workers_with_lazy_relationship,
-    select_workers_with_joined_relationship,
-    select_workers_with_selectin_relationship,
-    select_workers_with_condition_relationship,
-    select_workers_with_condition_relationship_containseager,
-    select_workers_with_condition_relationship_containseager_limit,
-    Pydantic_DTO_only_select,
-    Pydantic_DTO_relationship,
-    Pydantic_DTO_join,
-    select_resumes_with_all_relationships,
-    add_vacansies_and_replice
-)
-
-# Вызовы функций для демонстрации (если вы хотите запускать их при старте приложения)
+from queries.repository import get_workers_page, get_resumes_page, stream_resumes_ndjson
+from queries.pagination import InvalidCursorError
+from queries.aggregates import get_workload_avg_compensation
+from queries.search import search_resumes_async
+from queries.replies import add_replies_async, remove_replies_async
+from queries.dashboard import get_dashboard
+from queries.matching import match_resumes_for_vacancy, apply_resume_changes
+from queries.snapshot import get_compensation_stats, apply_snapshot_changes
+from queries.offload import shutdown_threadpool
+from queries.writebehind import resume_writes, WriteBehindClosedError, WriteBehindUnwrittenError
+from database import get_async_session, warm_up
+from cache import result_cache, invalidate_changed_tables
+from cdc import change_feed
+from config import settings
+from instrumentation import track_queries, render_prometheus, pool_status
+from enums import Workload
+from schemas import WorkersPageDTO, ResumesPageDTO, WorkloadAvgCompensationDTO, ResumeSearchDTO, ResumeMatchDTO, RepliesAddDTO, RepliesCountDTO, DashboardDTO, CompensationStatsDTO, ResumeEditDTO
+
+# Сессия на один запрос (зависимость FastAPI)
+SessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+
+# Вызовы функций для демонстрации (если вы хотите запускать их при старте приложения).
+# Демонстрационные функции не импортируются при старте: импорт queries/orm.py и queries/core.py
+# не нужен обработчикам API и только удлинял запуск. Раскомментируйте импорт вместе с вызовами.
+# from queries.core import create_table_core, insert_data_core, select_workers_core, update_workers_core
+# from queries.orm import (
+#     create_table_orm,
+#     insert_table_orm,
+#     select_workers_orm,
+#     select_resumes_avg_compensation,
+#     join_cte_subquery_window_func,
+#     select_workers_with_lazy_relationship,
+#     select_workers_with_joined_relationship,
+#     select_workers_with_selectin_relationship,
+#     select_workers_with_condition_relationship,
+#     select_workers_with_condition_relationship_containseager,
+#     select_workers_with_condition_relationship_containseager_limit,
+#     Pydantic_DTO_only_select,
+#     Pydantic_DTO_relationship,
+#     Pydantic_DTO_join,
+#     select_resumes_with_all_relationships,
+#     add_vacansies_and_replice
+# )
 # create_table_orm()
 # insert_table_orm()
 # select_workers_orm()
@@ -41,24 +67,203 @@ from queries.orm import (
 # Pydantic_DTO_join()
 # select_resumes_with_all_relationships()
 # add_vacansies_and_replice()
-# def create_fastapi_app():
-#     app = FastAPI()
-#     app.add_middleware(
-#         CORSMiddleware,
-#         allow_origins=["*"]
-#     )
-#     @app.get("/workers")
-#     async def get_workers():
-#         # Обратите внимание: Pydantic_DTO_relationship() - это, скорее всего, функция, которая возвращает данные
-#         # Если это класс DTO, то вам нужно будет передать в него данные, полученные из БД.
-#         workers = Pydantic_DTO_relationship() # Вам нужно получить реальные данные здесь
-#         return workers
-#     @app.get("/resumes")
-#     async def get_resumes():
-#         # Обратите внимание: Pydantic_DTO_relationship() - это, скорее всего, функция, которая возвращает данные
-#         # Если это класс DTO, то вам нужно будет передать в него данные, полученные из БД.
-#         resumes = select_resumes_with_all_relationships() # Вам нужно получить реальные данные здесь
-#         return resumes
-#     return app
-
-# app = create_fastapi_app()
+
+# Движки и мапперы создаются лениво (см. database.py); сервер готовит их при старте,
+# чтобы эту работу не делал первый HTTP-запрос.
+# Поток изменений (cdc.py) доносит до кэша, индекса подбора и снимка записи других процессов.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up()
+    unsubscribe = []
+    if settings.CDC_ENABLED:
+        unsubscribe = [
+            change_feed.subscribe(invalidate_changed_tables),
+            change_feed.subscribe(apply_resume_changes, tables=("resumes",)),
+            change_feed.subscribe(apply_snapshot_changes, tables=("resumes", "workers")),
+        ]
+        change_feed.start()
+    yield
+    try:
+        await resume_writes.close() # Дописать отложенные правки резюме до остановки.
+    finally: # Незаписанные правки (WriteBehindUnwrittenError) не мешают остановить остальное.
+        await change_feed.stop()
+        for cancel in unsubscribe:
+            cancel()
+        shutdown_threadpool()
+
+
+def create_fastapi_app():
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"]
+    )
+
+    # Статистика SQL на каждый запрос (число операторов, длительность, N+1) для /metrics.
+    # Для StreamingResponse учитывается только работа до начала отдачи тела.
+    @app.middleware("http")
+    async def track_request_queries(request: Request, call_next):
+        with track_queries(f"{request.method} unmatched") as stats:
+            response = await call_next(request)
+            route = request.scope.get("route")
+            if route is not None:
+                stats.name = f"{request.method} {route.path}"
+            return response
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> str:
+        return render_prometheus() + resume_writes.render_prometheus() + change_feed.render_prometheus()
+
+    # Текущее состояние пулов соединений sync_engine и async_engine (то же есть в /metrics).
+    @app.get("/pool")
+    async def pool() -> dict[str, dict]:
+        return pool_status()
+
+    # Каждый обработчик получает свою AsyncSession через зависимость,
+    # поэтому запросы к /workers и /resumes выполняются параллельно, а не по очереди.
+    # Ответы постраничные: `next_cursor` из ответа передаётся в `cursor` следующего запроса.
+    # Ответы кэшируются готовым JSON (см. cache.py) и сбрасываются после коммитов в эти таблицы.
+    @app.get("/workers", response_model=WorkersPageDTO)
+    async def get_workers(
+        session: SessionDep,
+        cursor: str | None = None,
+        limit: Annotated[int, Query(ge=1, le=500)] = 50,
+        workload: Workload | None = None,
+        min_compensation: int | None = None,
+        max_compensation: int | None = None,
+    ) -> Response:
+        key = result_cache.make_key(
+            "workers", cursor=cursor, limit=limit, workload=workload,
+            min_compensation=min_compensation, max_compensation=max_compensation,
+        )
+        try:
+            body = await result_cache.get_or_set(
+                key, ("workers", "resumes"),
+                lambda: get_workers_page(session, cursor, limit, workload, min_compensation, max_compensation),
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return Response(content=body, media_type="application/json")
+
+    @app.get("/resumes", response_model=ResumesPageDTO)
+    async def get_resumes(
+        session: SessionDep,
+        cursor: str | None = None,
+        limit: Annotated[int, Query(ge=1, le=500)] = 50,
+        workload: Workload | None = None,
+        min_compensation: int | None = None,
+        max_compensation: int | None = None,
+    ) -> Response:
+        key = result_cache.make_key(
+            "resumes", cursor=cursor, limit=limit, workload=workload,
+            min_compensation=min_compensation, max_compensation=max_compensation,
+        )
+        try:
+            body = await result_cache.get_or_set(
+                key, ("resumes", "workers", "vacancies", "vacancies_replice"),
+                lambda: get_resumes_page(session, cursor, limit, workload, min_compensation, max_compensation),
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return Response(content=body, media_type="application/json")
+
+    # Потоковая выгрузка всех резюме: по строке JSON на резюме, память не зависит от размера таблицы.
+    @app.get("/resumes/export")
+    async def export_resumes(workload: Workload | None = None) -> StreamingResponse:
+        return StreamingResponse(stream_resumes_ndjson(workload), media_type="application/x-ndjson")
+
+    # Поиск резюме по заголовку с ранжированием (полнотекстовый или триграммный).
+    @app.get("/resumes/search")
+    async def get_resumes_search(
+        session: SessionDep,
+        q: Annotated[str, Query(min_length=1)],
+        workload: Workload | None = None,
+        min_compensation: int | None = None,
+        trigram: bool = False,
+        limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    ) -> list[ResumeSearchDTO]:
+        return await search_resumes_async(session, q, workload, min_compensation, trigram, limit)
+
+    # Средняя компенсация по занятости из предрасчитанных агрегатов (без прохода по резюме).
+    @app.get("/stats/avg_compensation")
+    async def get_avg_compensation(
+        session: SessionDep,
+        keyword: str = "",
+        min_avg_compensation: int | None = None,
+    ) -> list[WorkloadAvgCompensationDTO]:
+        return await get_workload_avg_compensation(session, keyword, min_avg_compensation)
+
+    # Статистика компенсации (средние, перцентили, гистограмма, превышение средней) по снимку резюме в памяти.
+    @app.get("/stats/compensation")
+    async def get_compensation_statistics(
+        session: SessionDep,
+        workload: Workload | None = None,
+        bins: Annotated[int, Query(ge=1, le=100)] = 10,
+        limit: Annotated[int, Query(ge=1, le=100)] = 10,
+    ) -> CompensationStatsDTO:
+        return await get_compensation_stats(session, workload, bins, limit)
+
+    # Дашборд: три независимых запроса выполняются одновременно в отдельных сессиях,
+    # поэтому время ответа - самый долгий из них, а не сумма. Не уложившиеся в timeout части - null.
+    @app.get("/dashboard")
+    async def dashboard(
+        like_language: str = "Python",
+        limit: Annotated[int, Query(ge=1, le=100)] = 10,
+        timeout: Annotated[float, Query(gt=0, le=30)] = 5.0,
+    ) -> DashboardDTO:
+        return await get_dashboard(like_language, limit, timeout)
+
+    # Подбор резюме под вакансию по индексу в памяти (заголовок и компенсация), лучшие k по убыванию оценки.
+    @app.get("/vacancies/{vacancy_id}/matches")
+    async def get_vacancy_matches(
+        session: SessionDep,
+        vacancy_id: int,
+        k: Annotated[int, Query(ge=1, le=100)] = 10,
+    ) -> list[ResumeMatchDTO]:
+        matches = await match_resumes_for_vacancy(session, vacancy_id, k)
+        if matches is None:
+            raise HTTPException(status_code=404, detail="Vacancy not found")
+        return matches
+
+    # Отклики резюме на вакансию одним INSERT ... ON CONFLICT DO NOTHING на пачку.
+    # count - число новых откликов; уже существующие и несуществующие резюме пропускаются.
+    @app.post("/vacancies/{vacancy_id}/replies")
+    async def post_vacancy_replies(session: SessionDep, vacancy_id: int, body: RepliesAddDTO) -> RepliesCountDTO:
+        count = await add_replies_async(session, [vacancy_id], body.resume_ids, body.cover_letter)
+        await session.commit()
+        return RepliesCountDTO(count=count)
+
+    # Правка заголовка и/или компенсации резюме через отложенную пакетную запись.
+    # 202 - правка принята и будет записана вместе с другими; с wait=true ответ приходит
+    # после записи: 204 - резюме обновлено, 404 - резюме нет.
+    @app.patch("/resumes/{resume_id}", status_code=202)
+    async def patch_resume(resume_id: int, body: ResumeEditDTO, wait: bool = False) -> Response:
+        try:
+            updated = await resume_writes.update(resume_id, **body.model_dump(exclude_unset=True), wait=wait)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except (WriteBehindClosedError, WriteBehindUnwrittenError) as e: # Приложение останавливается.
+            raise HTTPException(status_code=503, detail=str(e))
+        if not wait:
+            return Response(status_code=202)
+        if not updated:
+            raise HTTPException(status_code=404, detail="Resume not found")
+        return Response(status_code=204)
+
+    # Удаление откликов: без resume_ids - все отклики на вакансию.
+    @app.delete("/vacancies/{vacancy_id}/replies")
+    async def delete_vacancy_replies(
+        session: SessionDep,
+        vacancy_id: int,
+        resume_ids: Annotated[list[int] | None, Query()] = None,
+    ) -> RepliesCountDTO:
+        count = await remove_replies_async(session, [vacancy_id], resume_ids)
+        await session.commit()
+        return RepliesCountDTO(count=count)
+
+    return app
+
+app = create_fastapi_app()
+
+if __name__ == "__main__":
+    uvicorn.run("main:app", reload=True)
@@ -0,0 +1,348 @@
+import heapq
+import math
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import chain, count
+from typing import Iterable, Iterator, NamedTuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models import ResumesOrm
+
+# Подбор резюме под вакансию по индексу в памяти процесса (запросы к БД - в queries/matching.py).
+# Оценка резюме: TITLE_WEIGHT * сходство заголовков + COMPENSATION_WEIGHT * соответствие компенсации.
+# - Сходство заголовков - косинус между множествами слов с весами idf: редкие слова ("rust")
+#   значат больше частых ("developer"). Кандидаты - только резюме с общим словом в заголовке.
+# - Соответствие компенсации - 1 - |компенсация резюме - компенсация вакансии| / компенсация вакансии
+#   (не меньше 0); если у вакансии или резюме компенсация не указана - NEUTRAL_FIT.
+# Веса idf и норма каждого набора слов считаются при загрузке (и для новых слов и наборов - при
+# upsert) и дальше не меняются, поэтому подбор не пересчитывает их для кандидатов. Когда с загрузки
+# изменилось больше REBUILD_FRACTION резюме, индекс помечается устаревшим и перезагружается.
+# Инвертированный индекс ведёт от слова к полосам: резюме со словом, у которых норма набора слов
+# лежит в [BAND_RATIO ** b, BAND_RATIO ** (b + 1)), отсортированные по компенсации. Сходство резюме
+# полосы ограничено сверху по наименьшей норме в ней (см. match), поэтому полоса - поток резюме
+# по невозрастанию верхней границы оценки: от компенсации вакансии в обе стороны.
+# Подбор (как MaxScore/WAND) сливает потоки полос кучей и открывает полосы по убыванию границы,
+# пока она не ниже головы кучи; резюме из головы с границей, а не оценкой, оценивается точно и
+# возвращается в кучу. Так просматриваются резюме, которые ещё могут войти в первые k, а не все
+# кандидаты, даже когда почти все заголовки уникальны ("Bobr.... Python").
+
+TITLE_WEIGHT = 0.7
+COMPENSATION_WEIGHT = 0.3
+NEUTRAL_FIT = 0.5
+BAND_RATIO = 1.01
+REBUILD_FRACTION = 0.2
+
+_word = re.compile(r"\w+")
+_log_band_ratio = math.log(BAND_RATIO)
+
+
+def tokenize(title: str) -> tuple[str, ...]:
+    """Набор слов заголовка: в нижнем регистре, без повторов и однобуквенных, по алфавиту."""
+    return tuple(sorted({sys.intern(word) for word in _word.findall(title.lower()) if len(word) > 1}))
+
+
+def _band(norm: float) -> int:
+    return math.floor(math.log(norm) / _log_band_ratio)
+
+
+class ResumeMatch(NamedTuple):
+    resume_id: int
+    score: float
+    title_score: float
+    compensation_score: float
+
+
+class _Band:
+    """
+    Резюме полосы: id, отсортированные по компенсации (массивы без объектов на элемент), id без
+    компенсации и наименьшая норма набора слов среди добавленных (после удалений может стать меньше настоящей).
+    """
+
+    __slots__ = ("compensations", "ids", "no_compensation", "floor")
+
+    def __init__(self, pairs: Iterable[tuple[int, int]] = (), no_compensation: Iterable[int] = (), floor: float = math.inf):
+        pairs = sorted(pairs)
+        self.compensations = array("q", (compensation for compensation, _ in pairs))
+        self.ids = array("q", (resume_id for _, resume_id in pairs))
+        self.no_compensation = set(no_compensation)
+        self.floor = floor
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.no_compensation)
+
+    def add(self, resume_id: int, compensation: int | None, norm: float) -> None:
+        self.floor = min(self.floor, norm)
+        if compensation is None:
+            self.no_compensation.add(resume_id)
+            return
+        position = bisect_left(self.compensations, compensation)
+        self.compensations.insert(position, compensation)
+        self.ids.insert(position, resume_id)
+
+    def remove(self, resume_id: int, compensation: int | None) -> None:
+        if compensation is None:
+            self.no_compensation.discard(resume_id)
+            return
+        position = bisect_left(self.compensations, compensation)
+        while position < len(self.ids) and self.compensations[position] == compensation:
+            if self.ids[position] == resume_id:
+                del self.compensations[position]
+                del self.ids[position]
+                return
+            position += 1
+
+    def streams(self, compensation: int | None) -> Iterator[Iterator[tuple[float, int]]]:
+        """Потоки (соответствие компенсации, id) по невозрастанию соответствия."""
+        ids, compensations = self.ids, self.compensations
+        if compensation is None:
+            yield ((NEUTRAL_FIT, resume_id) for resume_id in chain(ids, self.no_compensation))
+            return
+
+        def fit(position: int) -> float:
+            return max(0.0, 1 - abs(compensations[position] - compensation) / compensation)
+
+        start = bisect_left(compensations, compensation)
+        yield ((fit(i), ids[i]) for i in range(start - 1, -1, -1)) # Вниз от компенсации вакансии.
+        yield ((fit(i), ids[i]) for i in range(start, len(ids))) # Вверх.
+        yield ((NEUTRAL_FIT, resume_id) for resume_id in self.no_compensation)
+
+
+class ResumeIndex:
+    """
+    Индекс резюме для подбора под вакансию: по каждому резюме хранятся только набор слов заголовка
+    и компенсация. Потокобезопасен: изменения приходят и из синхронных сессий в потоках.
+    """
+
+    def __init__(self):
+        self._docs: dict[int, tuple[tuple[str, ...], int | None]] = {}
+        self._bands: dict[str, dict[int, _Band]] = {} # слово -> полоса нормы -> резюме со словом
+        self._norms: dict[tuple[str, ...], float] = {} # набор слов -> норма
+        self._sizes: dict[tuple[str, ...], int] = {} # набор слов -> число резюме с ним
+        self._weights: dict[str, float] = {} # слово -> idf
+        self._df: dict[str, int] = {} # слово -> число резюме с ним
+        self._changes = 0 # Изменённых резюме с загрузки.
+        self._lock = threading.Lock()
+        self.loaded = False # False - индекс нужно (пере)загрузить из БД целиком.
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def load(self, rows: Iterable[tuple[int, str, int | None]]) -> None:
+        """Заменяет содержимое индекса строками (id, title, compensation). Поиск работает со старым индексом до замены."""
+        docs, tokens_by_title, sizes = {}, {}, {}
+        for resume_id, title, compensation in rows:
+            tokens = tokens_by_title.get(title)
+            if tokens is None:
+                tokens = tokens_by_title[title] = tokenize(title)
+            if not tokens:
+                continue # Заголовок без слов ("C", "!") ни с чем не совпадает, а норма его набора - 0.
+            docs[resume_id] = (tokens, compensation)
+            sizes[tokens] = sizes.get(tokens, 0) + 1
+        df = {}
+        for tokens, size in sizes.items():
+            for token in tokens:
+                df[token] = df.get(token, 0) + size
+        weights = {token: math.log(1 + len(docs) / count) for token, count in df.items()}
+        norms = {tokens: math.sqrt(sum(weights[token] ** 2 for token in tokens)) for tokens in sizes}
+        pairs: dict[tuple[str, int], list[tuple[int, int]]] = {}
+        no_compensation: dict[tuple[str, int], list[int]] = {}
+        floors: dict[tuple[str, int], float] = {}
+        band_by_tokens = {tokens: _band(norm) for tokens, norm in norms.items()}
+        for tokens, band in band_by_tokens.items():
+            for token in tokens:
+                floors[token, band] = min(floors.get((token, band), math.inf), norms[tokens])
+        for resume_id, (tokens, compensation) in docs.items():
+            band = band_by_tokens[tokens]
+            for token in tokens:
+                if compensation is None:
+                    no_compensation.setdefault((token, band), []).append(resume_id)
+                else:
+                    pairs.setdefault((token, band), []).append((compensation, resume_id))
+        bands = {}
+        for token, band in floors:
+            bands.setdefault(token, {})[band] = _Band(pairs.get((token, band), ()), no_compensation.get((token, band), ()), floors[token, band])
+        with self._lock:
+            self._docs, self._bands, self._norms, self._sizes = docs, bands, norms, sizes
+            self._weights, self._df, self._changes = weights, df, 0
+            self.loaded = True
+
+    def upsert(self, resume_id: int, title: str, compensation: int | None) -> None:
+        tokens = tokenize(title)
+        with self._lock:
+            old = self._docs.get(resume_id)
+            if old == (tokens, compensation):
+                return
+            if old is not None:
+                self._remove(resume_id, *old)
+            if not tokens: # Как в load: резюме без слов в заголовке в индекс не попадает.
+                if old is not None:
+                    del self._docs[resume_id]
+                    self._count_change()
+                return
+            self._docs[resume_id] = (tokens, compensation)
+            for token in tokens:
+                self._df[token] = self._df.get(token, 0) + 1
+                if token not in self._weights: # Вес нового слова - по числу резюме сейчас, дальше не меняется.
+                    self._weights[token] = math.log(1 + len(self._docs) / self._df[token])
+            norm = self._norms.get(tokens)
+            if norm is None:
+                norm = self._norms[tokens] = math.sqrt(sum(self._weights[token] ** 2 for token in tokens))
+            self._sizes[tokens] = self._sizes.get(tokens, 0) + 1
+            band = _band(norm)
+            for token in tokens:
+                bands = self._bands.setdefault(token, {})
+                if band not in bands:
+                    bands[band] = _Band()
+                bands[band].add(resume_id, compensation, norm)
+            self._count_change()
+
+    def remove(self, resume_id: int) -> None:
+        with self._lock:
+            old = self._docs.pop(resume_id, None)
+            if old is not None:
+                self._remove(resume_id, *old)
+                self._count_change()
+
+    def invalidate(self) -> None:
+        """Помечает индекс устаревшим: при следующем подборе он перезагрузится из БД."""
+        self.loaded = False
+
+    def _count_change(self) -> None:
+        # Веса idf и нормы со временем расходятся с данными: после многих изменений - перезагрузка
+        # (в потоке, см. queries/matching.py), а не пересчёт всего индекса под блокировкой.
+        self._changes += 1
+        if self._changes > REBUILD_FRACTION * max(len(self._docs), 1000):
+            self.loaded = False
+
+    def _remove(self, resume_id: int, tokens: tuple[str, ...], compensation: int | None) -> None:
+        band = _band(self._norms[tokens])
+        for token in tokens:
+            bands = self._bands[token]
+            bands[band].remove(resume_id, compensation)
+            if not bands[band]:
+                del bands[band]
+            self._df[token] -= 1
+            if not self._df[token]:
+                del self._df[token], self._weights[token], self._bands[token]
+        self._sizes[tokens] -= 1
+        if not self._sizes[tokens]:
+            del self._sizes[tokens], self._norms[tokens]
+
+    def _idf(self, token: str) -> float:
+        return self._weights.get(token, 0.0)
+
+    def match(self, title: str, compensation: int | None, k: int = 10) -> list[ResumeMatch]:
+        """
+        Лучшие `k` резюме для вакансии с заголовком `title` и компенсацией `compensation`
+        по убыванию оценки (при равной оценке порядок не задан).
+        """
+        if compensation is not None and compensation <= 0:
+            compensation = None
+        best_fit = 1.0 if compensation is not None else NEUTRAL_FIT
+        with self._lock:
+            weights = {token: self._idf(token) for token in tokenize(title)}
+            weights = {token: weight for token, weight in weights.items() if weight > 0}
+            if not weights or k <= 0:
+                return []
+            query_norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+            # Полосы слов запроса по убыванию верхней границы сходства их резюме. Резюме с несколькими
+            # словами запроса есть в полосах каждого, поэтому граница в полосах слова учитывает только
+            # его и более частые слова (как в MaxScore): резюме с более редким словом запроса получит
+            # оценку по границе полосы того слова. Сумма квадратов весов общих слов shared <= rest,
+            # норма >= max(наименьшая норма полосы, sqrt(shared)), поэтому
+            # сходство <= min(rest / наименьшая норма, sqrt(rest)) / норма запроса.
+            # rest и shared складываются в одном порядке (по алфавиту), а граница и сходство делятся
+            # в одном порядке: резюме с наименьшей нормой полосы получает оценку, равную границе, без
+            # погрешности округления - при равных оценках подбор не перебирает всю полосу.
+            ordered = sorted(weights, key=weights.get, reverse=True)
+            bands = []
+            for position, token in enumerate(ordered):
+                rest = sum(weights[other] ** 2 for other in sorted(ordered[position:]))
+                for band, resumes in self._bands[token].items():
+                    bound = min(rest / resumes.floor / query_norm, math.sqrt(rest) / query_norm * (1 + 1e-9))
+                    bands.append((bound, token, band))
+            bands.sort(key=lambda item: item[0], reverse=True)
+            title_scores: dict[tuple[str, ...], float] = {}
+
+            def title_score(tokens: tuple[str, ...]) -> float:
+                score = title_scores.get(tokens)
+                if score is None:
+                    shared = sum(weights[token] ** 2 for token in tokens if token in weights)
+                    score = title_scores[tokens] = shared / self._norms[tokens] / query_norm
+                return score
+
+            # Куча: (-оценка, 0, id, сходство, соответствие) - оценённое резюме,
+            # (-граница, 1, n, id, соответствие, поток, граница сходства) - следующее резюме потока полосы.
+            frontier, counter = [], count()
+
+            def advance(stream, bound: float):
+                item = next(stream, None)
+                if item is not None:
+                    fit, resume_id = item
+                    upper = TITLE_WEIGHT * bound + COMPENSATION_WEIGHT * fit
+                    heapq.heappush(frontier, (-upper, 1, next(counter), resume_id, fit, stream, bound))
+
+            matches, scored, opened = [], set(), 0
+            while len(matches) < k:
+                # Следующая полоса открывается, только если её граница не ниже текущей головы кучи.
+                while opened < len(bands) and (
+                    not frontier or TITLE_WEIGHT * bands[opened][0] + COMPENSATION_WEIGHT * best_fit >= -frontier[0][0]
+                ):
+                    bound, token, band = bands[opened]
+                    for stream in self._bands[token][band].streams(compensation):
+                        advance(stream, bound)
+                    opened += 1
+                if not frontier:
+                    break
+                entry = heapq.heappop(frontier)
+                if entry[1] == 0:
+                    negative_score, _, resume_id, similarity, fit = entry
+                    matches.append(ResumeMatch(resume_id, -negative_score, similarity, fit))
+                    continue
+                _, _, _, resume_id, fit, stream, bound = entry
+                advance(stream, bound)
+                if resume_id not in scored: # Резюме с несколькими словами запроса приходит из полосы каждого.
+                    scored.add(resume_id)
+                    similarity = title_score(self._docs[resume_id][0])
+                    heapq.heappush(frontier, (-(TITLE_WEIGHT * similarity + COMPENSATION_WEIGHT * fit), 0, resume_id, similarity, fit))
+        return matches
+
+
+resume_index = ResumeIndex()
+
+
+# Изменения резюме через ORM в этом процессе применяются к индексу сразу после коммита
+# (AsyncSession работает поверх Session, поэтому и для асинхронного кода). Значения берутся
+# в after_flush: после коммита объекты истекают, а догружать их в асинхронной сессии нельзя.
+# Записи через Core (queries/bulk.py, queries/upsert.py) и из других процессов индекс получает
+# при очередном обновлении по updated_at (queries/matching.py).
+@event.listens_for(Session, "after_flush")
+def _collect_resume_changes(session, flush_context):
+    if not resume_index.loaded:
+        return
+    changes = session.info.setdefault("resume_index_changes", {})
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, ResumesOrm):
+            values = inspect(obj).dict
+            if "id" in values and "title" in values and "compensation" in values:
+                changes[values["id"]] = (values["title"], values["compensation"])
+    for obj in session.deleted:
+        if isinstance(obj, ResumesOrm) and "id" in inspect(obj).dict:
+            changes[inspect(obj).dict["id"]] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_resume_changes(session):
+    for resume_id, values in session.info.pop("resume_index_changes", {}).items():
+        if values is None:
+            resume_index.remove(resume_id)
+        else:
+            resume_index.upsert(resume_id, *values)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_resume_changes(session):
+    session.info.pop("resume_index_changes", None)
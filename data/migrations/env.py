@@ -5,9 +5,11 @@ from sqlalchemy import pool
 
 from alembic import context
 
-from data.config import settings
-from data.models import *
-from data.database import Base
+# alembic.ini добавляет data/ в sys.path (prepend_sys_path), поэтому импорты те же, что и в приложении:
+# через `data.database` получился бы второй класс Base без зарегистрированных моделей.
+from config import settings
+from models import *
+from database import Base
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,77 @@
+"""create schema
+
+Revision ID: 1e4b7c9d2f58
+Revises: 373a13cb824d
+Create Date: 2026-10-18 18:40:11.204617
+
+Первая ревизия 373a13cb824d только удаляет таблицы, а следующие ревизии их меняют. Здесь создаётся
+схема, на которую рассчитаны ревизии после неё (модели до 5b1f0c7e2a94), поэтому на пустой базе
+достаточно `alembic upgrade head`. Базу, схема которой создана не миграциями, а через
+Base.metadata.create_all() (create_table_orm, бенчмарки), миграциями не обновляют: она уже
+соответствует моделям, и её отмечают командой `alembic stamp head`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '1e4b7c9d2f58'
+down_revision: Union[str, None] = '373a13cb824d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Тип мог остаться от схемы, удалённой ревизией 373a13cb824d: она не удаляет enum.
+    # DO-блок вместо checkfirst, чтобы ревизия работала и в offline-режиме (alembic upgrade --sql).
+    op.execute("""
+    DO $$ BEGIN
+        CREATE TYPE workload AS ENUM ('parttime', 'fulltime');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """)
+    op.create_table('workers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('lastname', sa.String(), nullable=False),
+    sa.Column('phone_number', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('vacancies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=256), nullable=False),
+    sa.Column('compensation', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('resumes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=256), nullable=False),
+    sa.Column('compensation', sa.Integer(), nullable=True),
+    sa.Column('workload', postgresql.ENUM('parttime', 'fulltime', name='workload', create_type=False), nullable=False),
+    sa.Column('worker_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.CheckConstraint('compensation > 0', name='check_compens_positive'),
+    sa.ForeignKeyConstraint(['worker_id'], ['workers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('title_index', 'resumes', ['title'], unique=False)
+    op.create_table('vacancies_replice',
+    sa.Column('resume_id', sa.Integer(), nullable=False),
+    sa.Column('vacancy_id', sa.Integer(), nullable=False),
+    sa.Column('cover_letter', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['resume_id'], ['resumes.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['vacancy_id'], ['vacancies.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('resume_id', 'vacancy_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('vacancies_replice')
+    op.drop_index('title_index', table_name='resumes')
+    op.drop_table('resumes')
+    op.drop_table('vacancies')
+    op.drop_table('workers')
+    op.execute("DROP TYPE IF EXISTS workload")
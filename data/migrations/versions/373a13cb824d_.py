@@ -20,11 +20,13 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_table('vacancies')
-    op.drop_index('title_index', table_name='resumes')
-    op.drop_table('resumes')
-    op.drop_table('vacancies_replice')
-    op.drop_table('workers')
+    # if_exists: на пустой базе таблиц ещё нет, схему создаёт следующая ревизия 1e4b7c9d2f58.
+    # vacancies_replice удаляется первой: она ссылается на vacancies и resumes.
+    op.drop_table('vacancies_replice', if_exists=True)
+    op.drop_table('vacancies', if_exists=True)
+    op.drop_index('title_index', table_name='resumes', if_exists=True)
+    op.drop_table('resumes', if_exists=True)
+    op.drop_table('workers', if_exists=True)
     # ### end Alembic commands ###
 
 
@@ -0,0 +1,26 @@
+"""resumes workload id index
+
+Revision ID: 5b1f0c7e2a94
+Revises: 1e4b7c9d2f58
+Create Date: 2026-10-18 09:12:41.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f0c7e2a94'
+down_revision: Union[str, None] = '1e4b7c9d2f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('resumes_workload_id_index', 'resumes', ['workload', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('resumes_workload_id_index', table_name='resumes')
@@ -0,0 +1,92 @@
+"""workload compensation stats
+
+Revision ID: 8c2d4e6f1a37
+Revises: 5b1f0c7e2a94
+Create Date: 2026-10-18 10:02:17.540912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2d4e6f1a37'
+down_revision: Union[str, None] = '5b1f0c7e2a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('stat_keywords',
+    sa.Column('keyword', sa.String(length=256), nullable=False),
+    sa.PrimaryKeyConstraint('keyword')
+    )
+    op.create_table('workload_compensation_stats',
+    sa.Column('workload', postgresql.ENUM('parttime', 'fulltime', name='workload', create_type=False), nullable=False),
+    sa.Column('keyword', sa.String(length=256), server_default='', nullable=False),
+    sa.Column('compensation_sum', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('resumes_count', sa.BigInteger(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('workload', 'keyword')
+    )
+    op.execute("""
+    CREATE OR REPLACE FUNCTION workload_stats_apply(
+        p_workload workload[], p_title text[], p_compensation integer[], p_sign integer
+    ) RETURNS void LANGUAGE sql AS $$
+        INSERT INTO workload_compensation_stats AS s (workload, keyword, compensation_sum, resumes_count)
+        SELECT c.workload, k.keyword, sum(c.compensation) * p_sign, count(*) * p_sign
+        FROM unnest(p_workload, p_title, p_compensation) AS c(workload, title, compensation)
+        JOIN (SELECT '' AS keyword UNION ALL SELECT keyword FROM stat_keywords) AS k
+            ON k.keyword = '' OR c.title LIKE '%' || k.keyword || '%'
+        WHERE c.compensation IS NOT NULL
+        GROUP BY c.workload, k.keyword
+        ON CONFLICT (workload, keyword) DO UPDATE SET
+            compensation_sum = s.compensation_sum + EXCLUDED.compensation_sum,
+            resumes_count = s.resumes_count + EXCLUDED.resumes_count;
+    $$
+    """)
+    op.execute("""
+    CREATE OR REPLACE FUNCTION resumes_workload_stats_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM workload_stats_apply(array_agg(workload), array_agg(title::text), array_agg(compensation), -1)
+            FROM old_rows;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM workload_stats_apply(array_agg(workload), array_agg(title::text), array_agg(compensation), 1)
+            FROM new_rows;
+        END IF;
+        RETURN NULL;
+    END;
+    $$
+    """)
+    op.execute("""
+    CREATE TRIGGER resumes_workload_stats_insert AFTER INSERT ON resumes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION resumes_workload_stats_trigger()
+    """)
+    op.execute("""
+    CREATE TRIGGER resumes_workload_stats_update AFTER UPDATE ON resumes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION resumes_workload_stats_trigger()
+    """)
+    op.execute("""
+    CREATE TRIGGER resumes_workload_stats_delete AFTER DELETE ON resumes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION resumes_workload_stats_trigger()
+    """)
+    # Начальное заполнение по уже существующим резюме.
+    op.execute("""
+    INSERT INTO workload_compensation_stats (workload, keyword, compensation_sum, resumes_count)
+    SELECT workload, '', sum(compensation), count(*)
+    FROM resumes WHERE compensation IS NOT NULL
+    GROUP BY workload
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS resumes_workload_stats_trigger() CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS workload_stats_apply(workload[], text[], integer[], integer)")
+    op.drop_table('workload_compensation_stats')
+    op.drop_table('stat_keywords')
@@ -0,0 +1,81 @@
+"""cdc notify triggers
+
+Revision ID: a9c4e1f7b352
+Revises: f3b8d2a6c714
+Create Date: 2026-10-18 21:40:08.214377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c4e1f7b352'
+down_revision: Union[str, None] = 'f3b8d2a6c714'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Поток изменений через NOTIFY (как CDC_DDL в models.py, см. cdc.py): функция и по четыре
+# триггера уровня оператора на таблицу. Значение - SQL-выражение ключа строки.
+CDC_TABLES = {
+    "workers": "id",
+    "resumes": "id",
+    "vacancies": "id",
+    "vacancies_replice": "jsonb_build_array(resume_id, vacancy_id)",
+}
+
+
+def upgrade() -> None:
+    op.execute("""
+    CREATE OR REPLACE FUNCTION cdc_notify() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        rows_sql text;
+        keys jsonb;
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            PERFORM pg_notify('table_changes', json_build_object('t', TG_TABLE_NAME, 'op', 'T')::text);
+            RETURN NULL;
+        END IF;
+        rows_sql := CASE TG_OP
+            WHEN 'INSERT' THEN format('SELECT %1$s AS k FROM new_rows', TG_ARGV[0])
+            WHEN 'DELETE' THEN format('SELECT %1$s AS k FROM old_rows', TG_ARGV[0])
+            ELSE format('SELECT %1$s AS k FROM new_rows UNION SELECT %1$s FROM old_rows', TG_ARGV[0])
+        END;
+        FOR keys IN EXECUTE format(
+            'SELECT jsonb_agg(k ORDER BY k) FROM (SELECT k, (row_number() OVER (ORDER BY k) - 1) / 200 AS chunk'
+            ' FROM (SELECT DISTINCT k FROM (%s) r) d) c GROUP BY chunk',
+            rows_sql
+        ) LOOP
+            PERFORM pg_notify('table_changes', json_build_object('t', TG_TABLE_NAME, 'op', left(TG_OP, 1), 'ids', keys)::text);
+        END LOOP;
+        RETURN NULL;
+    END;
+    $$
+    """)
+    for table, key in CDC_TABLES.items():
+        op.execute(f"""
+        CREATE TRIGGER {table}_cdc_insert AFTER INSERT ON {table}
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION cdc_notify('{key}')
+        """)
+        op.execute(f"""
+        CREATE TRIGGER {table}_cdc_update AFTER UPDATE ON {table}
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION cdc_notify('{key}')
+        """)
+        op.execute(f"""
+        CREATE TRIGGER {table}_cdc_delete AFTER DELETE ON {table}
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION cdc_notify('{key}')
+        """)
+        op.execute(f"""
+        CREATE TRIGGER {table}_cdc_truncate AFTER TRUNCATE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION cdc_notify('{key}')
+        """)
+
+
+def downgrade() -> None:
+    # CASCADE удаляет вместе с функцией и все триггеры, которые её вызывают.
+    op.execute("DROP FUNCTION IF EXISTS cdc_notify() CASCADE")
@@ -0,0 +1,31 @@
+"""resumes title search
+
+Revision ID: b7e3a91d4c05
+Revises: 8c2d4e6f1a37
+Create Date: 2026-10-18 10:47:03.226154
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3a91d4c05'
+down_revision: Union[str, None] = '8c2d4e6f1a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('resumes', sa.Column('title_tsv', postgresql.TSVECTOR(), sa.Computed("to_tsvector('simple', title)", persisted=True), nullable=False))
+    op.create_index('resumes_title_tsv_index', 'resumes', ['title_tsv'], unique=False, postgresql_using='gin')
+    op.create_index('resumes_title_trgm_index', 'resumes', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('resumes_title_trgm_index', table_name='resumes', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.drop_index('resumes_title_tsv_index', table_name='resumes', postgresql_using='gin')
+    op.drop_column('resumes', 'title_tsv')
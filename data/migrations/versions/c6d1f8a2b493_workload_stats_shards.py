@@ -0,0 +1,99 @@
+"""workload stats shards
+
+Revision ID: c6d1f8a2b493
+Revises: a9c4e1f7b352
+Create Date: 2026-10-19 09:15:52.630184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6d1f8a2b493'
+down_revision: Union[str, None] = 'a9c4e1f7b352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Строки-счётчики workload_compensation_stats (как WORKLOAD_STATS_DDL в models.py): каждое соединение
+# пишет в строку shard = pg_backend_pid() по модулю 16, а не в общую (workload, keyword), на которой
+# ждали друг друга все пишущие транзакции. Ключевое слово ищется через strpos, а не LIKE: в LIKE
+# символы '%' и '_' из ключевого слова работали как шаблон.
+APPLY_SHARDED = """
+CREATE OR REPLACE FUNCTION workload_stats_apply(
+    p_workload workload[], p_title text[], p_compensation integer[], p_sign integer
+) RETURNS void LANGUAGE sql AS $$
+    INSERT INTO workload_compensation_stats AS s (workload, keyword, shard, compensation_sum, resumes_count)
+    SELECT c.workload, k.keyword, mod(pg_backend_pid(), 16), sum(c.compensation) * p_sign, count(*) * p_sign
+    FROM unnest(p_workload, p_title, p_compensation) AS c(workload, title, compensation)
+    JOIN (SELECT '' AS keyword UNION ALL SELECT keyword FROM stat_keywords) AS k
+        ON k.keyword = '' OR strpos(c.title, k.keyword) > 0
+    WHERE c.compensation IS NOT NULL
+    GROUP BY c.workload, k.keyword
+    ON CONFLICT (workload, keyword, shard) DO UPDATE SET
+        compensation_sum = s.compensation_sum + EXCLUDED.compensation_sum,
+        resumes_count = s.resumes_count + EXCLUDED.resumes_count;
+$$
+"""
+
+# Функция из 8c2d4e6f1a37.
+APPLY_SINGLE_ROW = """
+CREATE OR REPLACE FUNCTION workload_stats_apply(
+    p_workload workload[], p_title text[], p_compensation integer[], p_sign integer
+) RETURNS void LANGUAGE sql AS $$
+    INSERT INTO workload_compensation_stats AS s (workload, keyword, compensation_sum, resumes_count)
+    SELECT c.workload, k.keyword, sum(c.compensation) * p_sign, count(*) * p_sign
+    FROM unnest(p_workload, p_title, p_compensation) AS c(workload, title, compensation)
+    JOIN (SELECT '' AS keyword UNION ALL SELECT keyword FROM stat_keywords) AS k
+        ON k.keyword = '' OR c.title LIKE '%' || k.keyword || '%'
+    WHERE c.compensation IS NOT NULL
+    GROUP BY c.workload, k.keyword
+    ON CONFLICT (workload, keyword) DO UPDATE SET
+        compensation_sum = s.compensation_sum + EXCLUDED.compensation_sum,
+        resumes_count = s.resumes_count + EXCLUDED.resumes_count;
+$$
+"""
+
+
+def upgrade() -> None:
+    # Запись в resumes (и триггеры статистики) ждёт до конца миграции - блокировка берётся первой,
+    # как в queries.aggregates.add_stat_keyword, чтобы не встать во взаимную блокировку с триггерами.
+    op.execute("LOCK TABLE resumes IN SHARE MODE")
+    op.add_column('workload_compensation_stats', sa.Column('shard', sa.SmallInteger(), server_default='0', nullable=False))
+    op.drop_constraint('workload_compensation_stats_pkey', 'workload_compensation_stats', type_='primary')
+    op.create_primary_key('workload_compensation_stats_pkey', 'workload_compensation_stats', ['workload', 'keyword', 'shard'])
+    op.execute(APPLY_SHARDED)
+    # Агрегаты ключевых слов с '%' или '_' могли быть посчитаны по шаблону - пересчитываем их.
+    op.execute("""
+    DELETE FROM workload_compensation_stats WHERE keyword ~ '[%_]'
+    """)
+    op.execute("""
+    INSERT INTO workload_compensation_stats (workload, keyword, compensation_sum, resumes_count)
+    SELECT r.workload, k.keyword, sum(r.compensation), count(*)
+    FROM resumes r JOIN stat_keywords k ON strpos(r.title, k.keyword) > 0
+    WHERE r.compensation IS NOT NULL AND k.keyword ~ '[%_]'
+    GROUP BY r.workload, k.keyword
+    """)
+
+
+def downgrade() -> None:
+    op.execute("LOCK TABLE resumes IN SHARE MODE")
+    # Складываем строки-счётчики в shard 0, чтобы вернуть прежний ключ (workload, keyword).
+    op.execute("""
+    WITH moved AS (
+        DELETE FROM workload_compensation_stats WHERE shard <> 0
+        RETURNING workload, keyword, compensation_sum, resumes_count
+    )
+    INSERT INTO workload_compensation_stats AS s (workload, keyword, shard, compensation_sum, resumes_count)
+    SELECT workload, keyword, 0, sum(compensation_sum), sum(resumes_count)
+    FROM moved GROUP BY workload, keyword
+    ON CONFLICT (workload, keyword, shard) DO UPDATE SET
+        compensation_sum = s.compensation_sum + EXCLUDED.compensation_sum,
+        resumes_count = s.resumes_count + EXCLUDED.resumes_count
+    """)
+    op.execute(APPLY_SINGLE_ROW)
+    op.drop_constraint('workload_compensation_stats_pkey', 'workload_compensation_stats', type_='primary')
+    op.drop_column('workload_compensation_stats', 'shard')
+    op.create_primary_key('workload_compensation_stats_pkey', 'workload_compensation_stats', ['workload', 'keyword'])
@@ -0,0 +1,26 @@
+"""resumes worker id index
+
+Revision ID: d41a5c8e9f20
+Revises: b7e3a91d4c05
+Create Date: 2026-10-18 12:18:55.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a5c8e9f20'
+down_revision: Union[str, None] = 'b7e3a91d4c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('resumes_worker_id_index', 'resumes', ['worker_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('resumes_worker_id_index', table_name='resumes')
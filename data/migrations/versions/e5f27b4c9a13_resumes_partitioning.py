@@ -0,0 +1,161 @@
+"""resumes partitioning
+
+Revision ID: e5f27b4c9a13
+Revises: d41a5c8e9f20
+Create Date: 2026-10-18 14:21:36.804417
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from models import parse_resumes_partition_by
+from queries.partitions import create_partitions
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f27b4c9a13'
+down_revision: Union[str, None] = 'd41a5c8e9f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Перестраивает resumes в секционированную таблицу. Схема секционирования передаётся явно
+# аргументом alembic, в том же формате и с тем же значением, что RESUMES_PARTITION_BY приложения:
+#     alembic -x resumes_partition_by=workload,created_at upgrade head
+# Без аргумента таблица остаётся обычной. Окружение миграция не читает: схема, с которой прошла
+# ревизия, записана в самой БД (ключ секционирования в pg_partitioned_table), и downgrade берёт её оттуда.
+# Данные копируются в новую таблицу под эксклюзивной блокировкой, поэтому на большой таблице
+# миграцию запускают в окно обслуживания.
+# Столбцы без title_tsv: он вычисляемый и в INSERT не передаётся.
+COLUMNS = "id, title, compensation, workload, worker_id, created_at, updated_at"
+
+INDEXES = [
+    "CREATE INDEX title_index ON resumes (title)",
+    "CREATE INDEX resumes_title_tsv_index ON resumes USING gin (title_tsv)",
+    "CREATE INDEX resumes_title_trgm_index ON resumes USING gin (title gin_trgm_ops)",
+    "CREATE INDEX resumes_worker_id_index ON resumes (worker_id)",
+    "CREATE INDEX resumes_workload_id_index ON resumes (workload, id)",
+]
+
+WORKLOAD_STATS_TRIGGERS = [
+    """
+    CREATE TRIGGER resumes_workload_stats_insert AFTER INSERT ON resumes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION resumes_workload_stats_trigger()
+    """,
+    """
+    CREATE TRIGGER resumes_workload_stats_update AFTER UPDATE ON resumes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION resumes_workload_stats_trigger()
+    """,
+    """
+    CREATE TRIGGER resumes_workload_stats_delete AFTER DELETE ON resumes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION resumes_workload_stats_trigger()
+    """,
+]
+
+# Замена внешнего ключа vacancies_replice.resume_id (как RESUMES_FK_DDL в models.py).
+RESUMES_FK_TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION vacancies_replice_resume_fk() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        PERFORM 1 FROM resumes WHERE id = NEW.resume_id FOR KEY SHARE;
+        IF NOT FOUND THEN
+            RAISE foreign_key_violation USING MESSAGE = format('resume %s does not exist', NEW.resume_id);
+        END IF;
+        RETURN NEW;
+    END;
+    $$
+    """,
+    """
+    CREATE TRIGGER vacancies_replice_resume_fk BEFORE INSERT OR UPDATE OF resume_id ON vacancies_replice
+    FOR EACH ROW EXECUTE FUNCTION vacancies_replice_resume_fk()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION resumes_delete_replies() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        DELETE FROM vacancies_replice r USING old_rows o WHERE r.resume_id = o.id;
+        RETURN NULL;
+    END;
+    $$
+    """,
+    """
+    CREATE TRIGGER resumes_delete_replies AFTER DELETE ON resumes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION resumes_delete_replies()
+    """,
+]
+
+
+def _rename_old_table() -> None:
+    # Имена индексов и ограничения PK уникальны в схеме - освобождаем их для новой таблицы.
+    op.execute("LOCK TABLE resumes IN ACCESS EXCLUSIVE MODE")
+    op.execute("ALTER TABLE resumes RENAME TO resumes_old")
+    op.execute("ALTER TABLE resumes_old RENAME CONSTRAINT resumes_pkey TO resumes_old_pkey")
+    for statement in INDEXES:
+        index = statement.split()[2]
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_old")
+
+
+def _finish_new_table() -> None:
+    op.execute(f"INSERT INTO resumes ({COLUMNS}) SELECT {COLUMNS} FROM resumes_old")
+    # Последовательность id принадлежит старой таблице и удалилась бы вместе с ней.
+    op.execute("ALTER SEQUENCE resumes_id_seq OWNED BY resumes.id")
+    op.execute("DROP TABLE resumes_old")
+    for statement in INDEXES:
+        op.execute(statement)
+    # Триггеры статистики создаются после копирования: агрегаты уже посчитаны по старой таблице.
+    for statement in WORKLOAD_STATS_TRIGGERS:
+        op.execute(statement)
+    op.execute("ANALYZE resumes")
+
+
+def _partition_by_argument() -> tuple[str, ...]:
+    return parse_resumes_partition_by(context.get_x_argument(as_dictionary=True).get("resumes_partition_by", ""))
+
+
+def _resumes_partitioned() -> bool:
+    return op.get_bind().execute(sa.text("SELECT pg_get_partkeydef('resumes'::regclass)")).scalar() is not None
+
+
+def upgrade() -> None:
+    partition_by = _partition_by_argument()
+    if not partition_by:
+        return
+    method = "LIST (workload)" if partition_by[0] == "workload" else "RANGE (created_at)"
+    _rename_old_table()
+    op.execute("ALTER TABLE vacancies_replice DROP CONSTRAINT vacancies_replice_resume_id_fkey")
+    op.execute(f"""
+    CREATE TABLE resumes (
+        LIKE resumes_old INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED,
+        CONSTRAINT resumes_pkey PRIMARY KEY (id, {", ".join(partition_by)}),
+        FOREIGN KEY (worker_id) REFERENCES workers (id) ON DELETE CASCADE
+    ) PARTITION BY {method}
+    """)
+    # Помесячные секции - с месяца самого старого резюме, остальное попадёт в default.
+    oldest = op.get_bind().execute(sa.text("SELECT min(created_at) FROM resumes_old")).scalar()
+    create_partitions(op.get_bind(), start=oldest.date() if oldest else None, partition_by=partition_by)
+    _finish_new_table()
+    for statement in RESUMES_FK_TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    if not _resumes_partitioned():
+        return
+    op.execute("DROP FUNCTION IF EXISTS vacancies_replice_resume_fk() CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS resumes_delete_replies() CASCADE")
+    _rename_old_table()
+    op.execute("""
+    CREATE TABLE resumes (
+        LIKE resumes_old INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED,
+        CONSTRAINT resumes_pkey PRIMARY KEY (id),
+        FOREIGN KEY (worker_id) REFERENCES workers (id) ON DELETE CASCADE
+    )
+    """)
+    _finish_new_table()
+    op.execute("""
+    ALTER TABLE vacancies_replice ADD CONSTRAINT vacancies_replice_resume_id_fkey
+    FOREIGN KEY (resume_id) REFERENCES resumes (id) ON DELETE CASCADE
+    """)
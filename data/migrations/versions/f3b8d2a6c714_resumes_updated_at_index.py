@@ -0,0 +1,26 @@
+"""resumes updated_at index
+
+Revision ID: f3b8d2a6c714
+Revises: e5f27b4c9a13
+Create Date: 2026-10-18 16:05:12.381946
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d2a6c714'
+down_revision: Union[str, None] = 'e5f27b4c9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('resumes_updated_at_index', 'resumes', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('resumes_updated_at_index', table_name='resumes')
@@ -1,8 +1,11 @@
-from sqlalchemy import Table, Column, Integer, String, MetaData, ForeignKey, func, text, CheckConstraint, Index, PrimaryKeyConstraint
+from sqlalchemy import Table, Column, Integer, String, MetaData, ForeignKey, func, text, CheckConstraint, Index, PrimaryKeyConstraint, BigInteger, SmallInteger, DDL, event, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from database import Base, str_256
-import enum
+from config import settings
+from enums import Workload # Реэкспорт: `from models import Workload` работает как раньше.
 from datetime import datetime
+from functools import cache
 from typing import Annotated
 
 # Кастомные типы с предустановленными настройками для столбцов
@@ -72,26 +75,58 @@ class WorkerOrm(Base):
     repr_cols_nums = 3
     repr_cols = ("create_at",)
 
-class Workload(enum.Enum):
-    """
-    Enum (перечисление) для представления возможных вариантов занятости.
-    """
-    parttime = "parttime" # Вариант "parttime".
-    fulltime = "fulltime" # Вариант "fulltime".
+# Секционирование 'resumes' (настройка RESUMES_PARTITION_BY, см. queries/partitions.py):
+# - "workload": LIST по занятости, по секции на значение Workload;
+# - "created_at": RANGE по месяцам created_at;
+# - "workload,created_at": LIST по занятости, каждая секция дополнительно делится по месяцам.
+# Первичный ключ секционированной таблицы обязан включать ключ секционирования, поэтому в БД он
+# становится (id, workload/created_at), а в метаданных и в ORM резюме по-прежнему идентифицируется по id.
+# Настройка читается при первом обращении (создание таблиц, обслуживание секций, upsert), а не при
+# импорте: PARTITION BY и составной ключ добавляются к DDL в событиях создания таблицы (ниже).
+def parse_resumes_partition_by(value: str) -> tuple[str, ...]:
+    """Столбцы секционирования resumes из строки вида RESUMES_PARTITION_BY; () - таблица не секционирована."""
+    columns = tuple(column.strip() for column in value.split(",") if column.strip())
+    if not set(columns) <= {"workload", "created_at"} or columns == ("created_at", "workload"):
+        raise ValueError(f"RESUMES_PARTITION_BY: ожидается 'workload', 'created_at' или 'workload,created_at', получено {value!r}")
+    return columns
+
+
+@cache
+def resumes_partition_by() -> tuple[str, ...]:
+    """Столбцы секционирования resumes из настройки RESUMES_PARTITION_BY."""
+    return parse_resumes_partition_by(settings.RESUMES_PARTITION_BY)
+
+
+def _resumes_partitioned(*args, **kw) -> bool:
+    """Условие для ddl_if/execute_if: DDL, которое зависит от секционирования resumes."""
+    return bool(resumes_partition_by())
+
+
+def _resumes_not_partitioned(*args, **kw) -> bool:
+    return not resumes_partition_by()
+
 
 class ResumesOrm(Base):
     """
     ORM модель для таблицы 'resumes'. Представляет строку в таблице как объект Python.
     """
     __tablename__ = "resumes" # Название таблицы в базе данных.
-    id: Mapped[intpk] # Объявляем столбец 'id' с типом 'intpk' (целое число, первичный ключ).
+    id: Mapped[intpk] = mapped_column(autoincrement=True) # Объявляем столбец 'id' с типом 'intpk' (целое число, первичный ключ); autoincrement явно - чтобы id оставался SERIAL и в составном ключе секционированной таблицы.
     title: Mapped[str_256] # Объявляем столбец 'title' с типом 'str_256' (строка с ограничением длины 256).
     compensation: Mapped[int | None] # Объявляем столбец 'compensation' с типом 'int' или None (может быть NULL в базе).
-    workload: Mapped[Workload] # Объявляем столбец 'workload' с типом 'Workload' (наш enum).
+    workload: Mapped[Workload] # Объявляем столбец 'workload' с типом 'Workload' (наш enum); при секционировании по нему входит в первичный ключ в БД.
     worker_id: Mapped[int] = mapped_column(ForeignKey("workers.id", ondelete="CASCADE")) # Объявляем столбец 'worker_id' как внешний ключ, ссылающийся на столбец 'id' таблицы 'workers'.
                                                                                      # 'ondelete="CASCADE"' означает, что при удалении записи из 'workers', все связанные записи в 'resumes' также будут удалены.
     created_at: Mapped[creared_at] # Объявляем столбец 'create_at' с типом 'creare_at' (datetime с дефолтным значением - текущее UTC время на сервере БД).
     updated_at: Mapped[updated_at] # Объявляем столбец 'update_at' с типом 'update_at' (datetime с дефолтным значением - текущее UTC время на сервере БД, обновляется на текущее UTC время при изменении записи ORM).
+    title_tsv: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', title)", persisted=True),
+        deferred=True,
+    )
+    # Поисковый вектор заголовка для полнотекстового поиска (см. queries/search.py).
+    # Столбец генерируется самой БД (GENERATED ALWAYS AS ... STORED), поэтому при вставке и
+    # обновлении его не нужно заполнять. deferred=True - не тянуть его в обычных select(ResumesOrm).
 
     worker: Mapped["WorkerOrm"] = relationship(back_populates="resumes")
     # Это определение отношения "многие к одному" (Many-to-One).
@@ -123,10 +158,14 @@ class ResumesOrm(Base):
     vacancies_replied: Mapped[list["VacanciesOrm"]] = relationship(
         back_populates="resumes_replied",
         secondary="vacancies_replice",
+        # Условия соединения заданы явно: у секционированной 'resumes' внешнего ключа
+        # из vacancies_replice нет (см. VacanciesReplioceOrm), и вывести их было бы не из чего.
+        primaryjoin="ResumesOrm.id == foreign(VacanciesReplioceOrm.resume_id)",
+        secondaryjoin="VacanciesOrm.id == foreign(VacanciesReplioceOrm.vacancy_id)",
     )
 
 
-    repr_cols_nums = 9
+    repr_cols_nums = 7 # Все столбцы, кроме отложенного title_tsv: иначе repr догружал бы его запросом.
     repr_cols = ("create_at")
 
     __table_args__ = (
@@ -154,6 +193,25 @@ class ResumesOrm(Base):
         # по индексированным столбцам, поскольку база данных может быстрее находить нужные данные,
         # не просматривая всю таблицу. Это как алфавитный указатель в книге.
 
+        Index("resumes_title_tsv_index", "title_tsv", postgresql_using="gin"),
+        # GIN-индекс по tsvector: `title_tsv @@ websearch_to_tsquery(...)` ищет по индексу, а не перебором.
+
+        Index("resumes_title_trgm_index", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        # Триграммный индекс (расширение pg_trgm): им пользуются LIKE/ILIKE '%...%',
+        # то есть в том числе все `ResumesOrm.title.contains(...)` из queries/orm.py.
+
+        Index("resumes_worker_id_index", "worker_id"),
+        # PostgreSQL не индексирует внешние ключи сам. Индекс нужен для загрузки резюме работника
+        # (lazy/selectinload: `WHERE worker_id IN (...)`) и для JOIN LATERAL в queries/loaders.py.
+
+        Index("resumes_workload_id_index", "workload", "id"),
+        # Составной индекс для keyset-пагинации с фильтром по занятости:
+        # `WHERE workload = :w AND id > :last_id ORDER BY id LIMIT n` читает ровно n записей индекса.
+
+        Index("resumes_updated_at_index", "updated_at"),
+        # Догрузка изменённых резюме в индекс подбора (queries/matching.py): `WHERE updated_at >= :since`
+        # читает только свежие записи, а не всю таблицу.
+
         CheckConstraint("compensation > 0", name="check_compens_positive"),
         # `CheckConstraint("compensation > 0", name="check_compens_positive")` создает ограничение проверки.
         # - "compensation > 0": Это SQL-выражение, которое должно быть истинным для каждой строки в таблице.
@@ -167,6 +225,9 @@ class ResumesOrm(Base):
         # Они обеспечивают целостность данных на уровне базы данных, гарантируя, что данные
         # соответствуют определенным правилам до их сохранения. Это помогает предотвратить
         # вставку недействительных или некорректных данных в таблицу.
+
+        # При RESUMES_PARTITION_BY: PARTITION BY в CREATE TABLE, первичный ключ со столбцами
+        # секционирования и сами секции - см. _partition_resumes_table ниже.
     )
 
 class VacanciesOrm(Base):
@@ -179,12 +240,16 @@ class VacanciesOrm(Base):
     resumes_replied: Mapped[list["ResumesOrm"]] = relationship(
         back_populates="vacancies_replied",
         secondary="vacancies_replice",
+        primaryjoin="VacanciesOrm.id == foreign(VacanciesReplioceOrm.vacancy_id)",
+        secondaryjoin="ResumesOrm.id == foreign(VacanciesReplioceOrm.resume_id)",
     )
 
 class VacanciesReplioceOrm(Base):
     __tablename__ = "vacancies_replice"
 
     resume_id: Mapped[int] = mapped_column(
+        # Внешний ключ может ссылаться только на уникальный ключ, а у секционированной 'resumes'
+        # он включает столбцы секционирования. Тогда FK в БД не создаётся (ddl_if ниже), его заменяют триггеры RESUMES_FK_DDL.
         ForeignKey("resumes.id", ondelete="CASCADE"),
         primary_key=True,
     )
@@ -193,8 +258,266 @@ class VacanciesReplioceOrm(Base):
         primary_key=True,
     )
 
-    cover_letter: Mapped[str | None]
+    cover_letter: Mapped[str | None] = mapped_column(deferred=True)
+    # Сопроводительное письмо может быть длинным, а отклики загружаются в основном ради пар
+    # (resume_id, vacancy_id). deferred=True - не тянуть его в обычных select(VacanciesReplioceOrm);
+    # где оно нужно - .options(undefer(VacanciesReplioceOrm.cover_letter)). В асинхронной сессии
+    # обращение к незагруженному отложенному столбцу - ошибка, а не неявный запрос.
+
+
+class WorkloadCompensationStatsOrm(Base):
+    """
+    Предрасчитанные агрегаты компенсации: сумма и количество резюме (с непустой компенсацией)
+    по типу занятости и ключевому слову в заголовке. keyword = '' - все резюме данной занятости.
+    Таблица поддерживается триггерами на 'resumes' (см. WORKLOAD_STATS_DDL), поэтому среднее
+    читается за O(число занятостей), а не пересчитывается по всей таблице резюме.
+    Каждая пара (workload, keyword) разбита на WORKLOAD_STATS_SHARDS строк-счётчиков (shard):
+    при чтении они суммируются.
+    """
+    __tablename__ = "workload_compensation_stats"
+
+    workload: Mapped[Workload] = mapped_column(primary_key=True)
+    keyword: Mapped[str_256] = mapped_column(primary_key=True, server_default="")
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True, server_default="0")
+    compensation_sum: Mapped[int] = mapped_column(BigInteger, server_default="0")
+    resumes_count: Mapped[int] = mapped_column(BigInteger, server_default="0")
+
+    repr_cols_nums = 5
+    repr_cols = ()
+
+class StatKeywordsOrm(Base):
+    """Ключевые слова заголовка (например, 'Python'), для которых ведутся отдельные агрегаты."""
+    __tablename__ = "stat_keywords"
+
+    keyword: Mapped[str_256] = mapped_column(primary_key=True)
+
+    repr_cols_nums = 1
+    repr_cols = ()
+
+
+# Инкрементальное обновление workload_compensation_stats.
+# Триггеры уровня оператора (FOR EACH STATEMENT) с transition-таблицами: одна пачка
+# INSERT/UPDATE/DELETE/COPY даёт один UPSERT по затронутым (workload, keyword), а не по строке.
+# Та же SQL лежит в миграциях 8c2d4e6f1a37 и c6d1f8a2b493; здесь она нужна для create_all() (create_table_orm).
+# Без разбиения каждая вставка резюме обновляла бы строку (workload, '') - все пишущие транзакции
+# ждали бы друг друга на её блокировке до коммита. Поэтому соединение пишет в свою строку-счётчик:
+# shard = pid серверного процесса по модулю WORKLOAD_STATS_SHARDS, и одновременные транзакции
+# сталкиваются, только если pid их соединений совпадают по модулю.
+# Ключевое слово ищется через strpos, а не LIKE: '%' и '_' в нём - обычные символы.
+# DDL() форматирует строку через %, поэтому в SQL нет знака процента (mod() вместо %).
+WORKLOAD_STATS_SHARDS = 16
+
+WORKLOAD_STATS_DDL = [
+    f"""
+    CREATE OR REPLACE FUNCTION workload_stats_apply(
+        p_workload workload[], p_title text[], p_compensation integer[], p_sign integer
+    ) RETURNS void LANGUAGE sql AS $$
+        INSERT INTO workload_compensation_stats AS s (workload, keyword, shard, compensation_sum, resumes_count)
+        SELECT c.workload, k.keyword, mod(pg_backend_pid(), {WORKLOAD_STATS_SHARDS}), sum(c.compensation) * p_sign, count(*) * p_sign
+        FROM unnest(p_workload, p_title, p_compensation) AS c(workload, title, compensation)
+        JOIN (SELECT '' AS keyword UNION ALL SELECT keyword FROM stat_keywords) AS k
+            ON k.keyword = '' OR strpos(c.title, k.keyword) > 0
+        WHERE c.compensation IS NOT NULL
+        GROUP BY c.workload, k.keyword
+        ON CONFLICT (workload, keyword, shard) DO UPDATE SET
+            compensation_sum = s.compensation_sum + EXCLUDED.compensation_sum,
+            resumes_count = s.resumes_count + EXCLUDED.resumes_count;
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION resumes_workload_stats_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM workload_stats_apply(array_agg(workload), array_agg(title::text), array_agg(compensation), -1)
+            FROM old_rows;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM workload_stats_apply(array_agg(workload), array_agg(title::text), array_agg(compensation), 1)
+            FROM new_rows;
+        END IF;
+        RETURN NULL;
+    END;
+    $$
+    """,
+    """
+    CREATE TRIGGER resumes_workload_stats_insert AFTER INSERT ON resumes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION resumes_workload_stats_trigger()
+    """,
+    """
+    CREATE TRIGGER resumes_workload_stats_update AFTER UPDATE ON resumes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION resumes_workload_stats_trigger()
+    """,
+    """
+    CREATE TRIGGER resumes_workload_stats_delete AFTER DELETE ON resumes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION resumes_workload_stats_trigger()
+    """,
+]
+
+WORKLOAD_STATS_DROP_DDL = [
+    "DROP FUNCTION IF EXISTS resumes_workload_stats_trigger() CASCADE",
+    "DROP FUNCTION IF EXISTS workload_stats_apply(workload[], text[], integer[], integer)",
+]
+
+# Операторный класс gin_trgm_ops для resumes_title_trgm_index даёт расширение pg_trgm.
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+
+# Функции ссылаются на все три таблицы, поэтому ставим их после создания всей схемы.
+for statement in WORKLOAD_STATS_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in WORKLOAD_STATS_DROP_DDL:
+    event.listen(Base.metadata, "before_drop", DDL(statement).execute_if(dialect="postgresql"))
+
+# Замена внешнего ключа vacancies_replice.resume_id -> resumes.id при секционировании:
+# проверка существования резюме (FOR KEY SHARE блокирует его удаление до конца транзакции, как FK)
+# и каскадное удаление откликов одним оператором на пачку удалённых резюме.
+# Та же SQL лежит в миграции e5f27b4c9a13.
+RESUMES_FK_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION vacancies_replice_resume_fk() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        PERFORM 1 FROM resumes WHERE id = NEW.resume_id FOR KEY SHARE;
+        IF NOT FOUND THEN
+            RAISE foreign_key_violation USING MESSAGE = format('resume %%s does not exist', NEW.resume_id);
+        END IF;
+        RETURN NEW;
+    END;
+    $$
+    """,
+    """
+    CREATE TRIGGER vacancies_replice_resume_fk BEFORE INSERT OR UPDATE OF resume_id ON vacancies_replice
+    FOR EACH ROW EXECUTE FUNCTION vacancies_replice_resume_fk()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION resumes_delete_replies() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        DELETE FROM vacancies_replice r USING old_rows o WHERE r.resume_id = o.id;
+        RETURN NULL;
+    END;
+    $$
+    """,
+    """
+    CREATE TRIGGER resumes_delete_replies AFTER DELETE ON resumes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION resumes_delete_replies()
+    """,
+]
+
+RESUMES_FK_DROP_DDL = [
+    "DROP FUNCTION IF EXISTS vacancies_replice_resume_fk() CASCADE",
+    "DROP FUNCTION IF EXISTS resumes_delete_replies() CASCADE",
+]
+
+
+# При секционировании CREATE TABLE resumes получает PARTITION BY, а первичный ключ по одному id
+# и внешний ключ откликов не создаются - ключ (id, столбцы секционирования) добавляется сразу после таблицы.
+ResumesOrm.__table__.primary_key.ddl_if(callable_=_resumes_not_partitioned)
+for _constraint in VacanciesReplioceOrm.__table__.foreign_key_constraints:
+    if _constraint.referred_table is ResumesOrm.__table__:
+        _constraint.ddl_if(callable_=_resumes_not_partitioned)
+
+
+@event.listens_for(ResumesOrm.__table__, "before_create")
+def _set_resumes_partition_by(target, connection, **kw):
+    partition_by = resumes_partition_by()
+    method = None
+    if partition_by:
+        method = "LIST (workload)" if partition_by[0] == "workload" else "RANGE (created_at)"
+    target.dialect_options["postgresql"]["partition_by"] = method
+
+
+@event.listens_for(ResumesOrm.__table__, "after_create")
+def _partition_resumes_table(target, connection, **kw):
+    partition_by = resumes_partition_by()
+    if not partition_by or connection.dialect.name != "postgresql":
+        return
+    connection.execute(DDL(f"ALTER TABLE resumes ADD CONSTRAINT resumes_pkey PRIMARY KEY (id, {', '.join(partition_by)})"))
+    # Импорт внутри: queries/partitions.py сам импортирует модели.
+    from queries.partitions import create_partitions
+    create_partitions(connection)
+
+
+for statement in RESUMES_FK_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="postgresql", callable_=_resumes_partitioned))
+for statement in RESUMES_FK_DROP_DDL:
+    event.listen(Base.metadata, "before_drop", DDL(statement).execute_if(dialect="postgresql", callable_=_resumes_partitioned))
+
+# Поток изменений (CDC, см. cdc.py): после каждого INSERT/UPDATE/DELETE в workers, resumes,
+# vacancies и vacancies_replice триггер уровня оператора шлёт NOTIFY в канал CDC_CHANNEL с компактным
+# JSON {"t": таблица, "op": "I"/"U"/"D", "ids": [ключи]} - только ключи, без данных строк:
+# полезная нагрузка NOTIFY ограничена 8000 байт, поэтому ключи идут пачками по CDC_CHUNK.
+# Для UPDATE - ключи и старых, и новых версий строк (ключ мог измениться); TRUNCATE - {"op": "T"} без ключей.
+# Уведомления доставляются только после коммита, одинаковые в одной транзакции сливаются.
+# Аргумент функции - SQL-выражение ключа: 'id' или пара (resume_id, vacancy_id) для откликов.
+# Та же SQL лежит в миграции a9c4e1f7b352.
+CDC_CHANNEL = "table_changes"
+CDC_CHUNK = 200
+CDC_TABLES = {
+    "workers": "id",
+    "resumes": "id",
+    "vacancies": "id",
+    "vacancies_replice": "jsonb_build_array(resume_id, vacancy_id)",
+}
+
+CDC_DDL = [
+    f"""
+    CREATE OR REPLACE FUNCTION cdc_notify() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        rows_sql text;
+        keys jsonb;
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            PERFORM pg_notify('{CDC_CHANNEL}', json_build_object('t', TG_TABLE_NAME, 'op', 'T')::text);
+            RETURN NULL;
+        END IF;
+        rows_sql := CASE TG_OP
+            WHEN 'INSERT' THEN format('SELECT %%1$s AS k FROM new_rows', TG_ARGV[0])
+            WHEN 'DELETE' THEN format('SELECT %%1$s AS k FROM old_rows', TG_ARGV[0])
+            ELSE format('SELECT %%1$s AS k FROM new_rows UNION SELECT %%1$s FROM old_rows', TG_ARGV[0])
+        END;
+        FOR keys IN EXECUTE format(
+            'SELECT jsonb_agg(k ORDER BY k) FROM (SELECT k, (row_number() OVER (ORDER BY k) - 1) / {CDC_CHUNK} AS chunk'
+            ' FROM (SELECT DISTINCT k FROM (%%s) r) d) c GROUP BY chunk',
+            rows_sql
+        ) LOOP
+            PERFORM pg_notify('{CDC_CHANNEL}', json_build_object('t', TG_TABLE_NAME, 'op', left(TG_OP, 1), 'ids', keys)::text);
+        END LOOP;
+        RETURN NULL;
+    END;
+    $$
+    """,
+]
+for _table, _key in CDC_TABLES.items():
+    CDC_DDL += [
+        f"""
+        CREATE TRIGGER {_table}_cdc_insert AFTER INSERT ON {_table}
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION cdc_notify('{_key}')
+        """,
+        f"""
+        CREATE TRIGGER {_table}_cdc_update AFTER UPDATE ON {_table}
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION cdc_notify('{_key}')
+        """,
+        f"""
+        CREATE TRIGGER {_table}_cdc_delete AFTER DELETE ON {_table}
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION cdc_notify('{_key}')
+        """,
+        f"""
+        CREATE TRIGGER {_table}_cdc_truncate AFTER TRUNCATE ON {_table}
+        FOR EACH STATEMENT EXECUTE FUNCTION cdc_notify('{_key}')
+        """,
+    ]
+
+CDC_DROP_DDL = ["DROP FUNCTION IF EXISTS cdc_notify() CASCADE"]
 
+for statement in CDC_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in CDC_DROP_DDL:
+    event.listen(Base.metadata, "before_drop", DDL(statement).execute_if(dialect="postgresql"))
 
 # Хранение всех данных в императивном стиле (Core API)
 metadata_obj = MetaData() # Создаем объект MetaData для хранения информации о схеме базы данных.
@@ -0,0 +1,86 @@
+from sqlalchemy import select, cast, delete, func, insert, text, Integer, Numeric
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import sync_session_factory
+from models import WorkloadCompensationStatsOrm, StatKeywordsOrm
+from schemas import WorkloadAvgCompensationDTO
+
+# Чтение средней компенсации по типу занятости из предрасчитанной таблицы
+# workload_compensation_stats вместо avg(compensation) по всем резюме.
+# Таблицу обновляют триггеры на 'resumes' (см. models.WORKLOAD_STATS_DDL).
+# В отличие от select_resumes_avg_compensation(), здесь нет фильтра compensation > 40000:
+# агрегаты ведутся по всем резюме с непустой компенсацией.
+
+
+def _avg_compensation_query(keyword: str, min_avg_compensation: int | None):
+    stats = WorkloadCompensationStatsOrm
+    # Строки-счётчики одной занятости (shard) суммируются - не больше WORKLOAD_STATS_SHARDS на занятость.
+    resumes_count = func.sum(stats.resumes_count)
+    # numeric -> integer в PostgreSQL округляет так же, как cast(avg(...), Integer) в исходных запросах.
+    # nullif: PostgreSQL не гарантирует, что resumes_count > 0 в HAVING проверится раньше деления.
+    avg_compensation = cast(cast(func.sum(stats.compensation_sum), Numeric) / func.nullif(resumes_count, 0), Integer)
+    query = (
+        select(stats.workload, avg_compensation.label("avg_compensation"))
+        .filter(stats.keyword == keyword)
+        .group_by(stats.workload)
+        .having(resumes_count > 0)
+        .order_by(stats.workload)
+    )
+    if min_avg_compensation is not None:
+        query = query.having(avg_compensation > min_avg_compensation)
+    return query
+
+
+def select_workload_avg_compensation(keyword: str = "", min_avg_compensation: int | None = None) -> list[WorkloadAvgCompensationDTO]:
+    """
+    Средняя компенсация по занятости для резюме, в заголовке которых есть `keyword`
+    ('' - все резюме). Ключевое слово должно быть заранее добавлено через `add_stat_keyword`.
+    """
+    with sync_session_factory() as session:
+        res = session.execute(_avg_compensation_query(keyword, min_avg_compensation))
+        return [WorkloadAvgCompensationDTO.model_validate(row, from_attributes=True) for row in res.all()]
+
+
+async def get_workload_avg_compensation(
+    session: AsyncSession, keyword: str = "", min_avg_compensation: int | None = None
+) -> list[WorkloadAvgCompensationDTO]:
+    """Асинхронный вариант `select_workload_avg_compensation` для FastAPI."""
+    res = await session.execute(_avg_compensation_query(keyword, min_avg_compensation))
+    return [WorkloadAvgCompensationDTO.model_validate(row, from_attributes=True) for row in res.all()]
+
+
+# Пересчёт строк keyword по текущему содержимому 'resumes' (один полный проход) в строку-счётчик shard 0.
+# strpos, как в workload_stats_apply: '%' и '_' в ключевом слове - обычные символы.
+_recompute_keyword = text("""
+    INSERT INTO workload_compensation_stats (workload, keyword, compensation_sum, resumes_count)
+    SELECT workload, :keyword, sum(compensation), count(*)
+    FROM resumes
+    WHERE compensation IS NOT NULL AND (:keyword = '' OR strpos(title, :keyword) > 0)
+    GROUP BY workload
+""")
+
+
+def add_stat_keyword(keyword: str):
+    """
+    Начинает вести агрегаты для нового ключевого слова (например, 'Python').
+    Таблица резюме блокируется на запись на время пересчёта, чтобы триггеры
+    не успели учесть строки, которые ещё раз посчитает пересчёт.
+    """
+    with sync_session_factory() as session:
+        session.execute(text("LOCK TABLE resumes IN SHARE MODE"))
+        session.execute(insert(StatKeywordsOrm).values(keyword=keyword))
+        session.execute(_recompute_keyword, {"keyword": keyword})
+        session.commit()
+
+
+def rebuild_workload_stats():
+    """
+    Полностью пересчитывает workload_compensation_stats для всех ключевых слов.
+    Нужен после TRUNCATE resumes (на него триггеры не срабатывают) или для проверки расхождений.
+    """
+    with sync_session_factory() as session:
+        session.execute(text("LOCK TABLE resumes IN SHARE MODE"))
+        session.execute(delete(WorkloadCompensationStatsOrm))
+        keywords = [""] + list(session.execute(select(StatKeywordsOrm.keyword)).scalars())
+        for keyword in keywords:
+            session.execute(_recompute_keyword, {"keyword": keyword})
+        session.commit()
@@ -0,0 +1,130 @@
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+from sqlalchemy import insert
+from database import get_sync_engine, mark_primary_write
+from cache import result_cache
+from models import WorkerOrm, ResumesOrm, Workload
+
+# Массовая загрузка работников и их резюме из CSV/NDJSON.
+# Каждая строка входного файла - одно резюме вместе с полями его работника:
+#     username, lastname, phone_number, title, compensation, workload
+# Работник определяется тройкой (username, lastname, phone_number); id работников
+# запоминаются в словаре, поэтому worker_id для резюме подставляется в памяти,
+# без отдельного SELECT на каждого работника (как было в insert_table_orm()).
+
+WorkerKey = tuple[str, str, int]
+
+
+def read_rows(path: str | Path) -> Iterator[dict]:
+    """Читает строки из .csv (с заголовком) или .ndjson/.jsonl (один JSON-объект на строку)."""
+    path = Path(path)
+    with path.open(encoding="utf-8", newline="") as f:
+        if path.suffix == ".csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _batched(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def _worker_key(row: dict) -> WorkerKey:
+    return row["username"], row["lastname"], int(row["phone_number"])
+
+
+def _compensation(row: dict) -> int | None:
+    value = row.get("compensation")
+    return int(value) if value not in (None, "") else None
+
+
+def _load_batch_executemany(conn, batch: list[dict], worker_ids: dict[WorkerKey, int]) -> tuple[int, int]:
+    """Пачка через INSERT ... RETURNING для новых работников и executemany для резюме."""
+    new_keys = list(dict.fromkeys(key for key in map(_worker_key, batch) if key not in worker_ids))
+    if new_keys:
+        # sort_by_parameter_order=True гарантирует, что id вернутся в порядке переданных строк.
+        res = conn.execute(
+            insert(WorkerOrm).returning(WorkerOrm.id, sort_by_parameter_order=True),
+            [{"username": u, "lastname": l, "phone_number": p} for u, l, p in new_keys],
+        )
+        worker_ids.update(zip(new_keys, res.scalars().all()))
+    conn.execute(
+        insert(ResumesOrm), # created_at/updated_at заполняет server_default.
+        [
+            {
+                "title": row["title"],
+                "compensation": _compensation(row),
+                "workload": Workload(row["workload"]),
+                "worker_id": worker_ids[_worker_key(row)],
+            }
+            for row in batch
+        ],
+    )
+    return len(new_keys), len(batch)
+
+
+def _load_batch_copy(conn, batch: list[dict], worker_ids: dict[WorkerKey, int]) -> tuple[int, int]:
+    """
+    Быстрый путь через PostgreSQL COPY (psycopg).
+    COPY не умеет RETURNING, поэтому id новых работников заранее резервируются из их
+    последовательности (nextval), а затем работники и резюме пишутся COPY с готовыми id.
+    """
+    new_keys = list(dict.fromkeys(key for key in map(_worker_key, batch) if key not in worker_ids))
+    cursor = conn.connection.driver_connection.cursor() # psycopg.Connection внутри транзакции SQLAlchemy.
+    with cursor:
+        if new_keys:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence('workers', 'id')) FROM generate_series(1, %s)",
+                (len(new_keys),),
+            )
+            worker_ids.update(zip(new_keys, (row[0] for row in cursor.fetchall())))
+            with cursor.copy("COPY workers (id, username, lastname, phone_number) FROM STDIN") as copy:
+                for key in new_keys:
+                    copy.write_row((worker_ids[key], *key))
+        with cursor.copy("COPY resumes (title, compensation, workload, worker_id) FROM STDIN") as copy:
+            for row in batch:
+                copy.write_row((
+                    row["title"],
+                    _compensation(row),
+                    Workload(row["workload"]).value,
+                    worker_ids[_worker_key(row)],
+                ))
+    return len(new_keys), len(batch)
+
+
+def bulk_load(rows: Iterable[dict], batch_size: int = 10_000, use_copy: bool = False) -> tuple[int, int]:
+    """
+    Загружает работников и резюме пачками по `batch_size` строк в одной транзакции.
+    `use_copy=True` включает путь через COPY, иначе используется INSERT ... RETURNING + executemany.
+    Возвращает (число вставленных работников, число вставленных резюме).
+    """
+    load_batch = _load_batch_copy if use_copy else _load_batch_executemany
+    worker_ids: dict[WorkerKey, int] = {}
+    workers_total = resumes_total = 0
+    engine = get_sync_engine()
+    echo = engine.echo
+    engine.echo = False # Лог каждого параметра в консоль замедлил бы загрузку на порядки.
+    try:
+        with engine.begin() as conn:
+            for batch in _batched(rows, batch_size):
+                workers, resumes = load_batch(conn, batch, worker_ids)
+                workers_total += workers
+                resumes_total += resumes
+    finally:
+        engine.echo = echo
+    # Core-вставка не проходит через события Session: кэш и окно "чтения своих записей" обновляем сами.
+    result_cache.invalidate(("workers", "resumes"))
+    mark_primary_write()
+    return workers_total, resumes_total
+
+
+def bulk_load_file(path: str | Path, batch_size: int = 10_000, use_copy: bool = False) -> tuple[int, int]:
+    """`bulk_load` для файла .csv или .ndjson."""
+    return bulk_load(read_rows(path), batch_size, use_copy)
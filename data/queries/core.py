@@ -1,16 +1,22 @@
-from sqlalchemy import text, insert, select, update
-from database import async_engine, sync_engine
+from sqlalchemy import text, insert, select, update, bindparam
+from database import get_async_engine, get_sync_engine, sync_read_engine, async_read_engine, mark_primary_write
+from cache import result_cache
 from models import metadata_obj, workers_table
 from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, insert, select, update, text
+
+# Запросы модуля строятся один раз при импорте и общие для синхронных функций и их
+# асинхронных вариантов в конце файла: SQL описан в одном месте, меняются только движок и await.
+_version_query = text("SELECT VERSION()") # text необходим для выполнения произвольного SQL.
+_select_workers_query = select(workers_table) # Эквивалентно SELECT * FROM workers;.
 # Запрос (синхронный)
 def get_sync_vers():
     """
     Эта функция выполняет синхронный SQL-запрос для получения версии базы данных
     и выводит результат.
     """
-    with sync_engine.connect() as conn: # Устанавливаем синхронное соединение с базой данных.
+    with get_sync_engine().connect() as conn: # Устанавливаем синхронное соединение с базой данных.
         # Получаем версию базы данных, используя сырой SQL-запрос (text необходим для выполнения произвольного SQL).
-        res = conn.execute(text("SELECT VERSION()"))
+        res = conn.execute(_version_query)
         print(f"{res.first()=}") # Выводим первую строку результата (обычно версия).
 
 # Автокоммит (пример закомментирован)
@@ -31,7 +37,7 @@ async def get_async_123():
     Эта асинхронная функция выполняет асинхронный SQL-запрос для получения набора чисел
     и выводит результат.
     """
-    async with async_engine.connect() as conn: # Устанавливаем асинхронное соединение с базой данных.
+    async with get_async_engine().connect() as conn: # Устанавливаем асинхронное соединение с базой данных.
         # Выполняем сырой SQL-запрос для получения двух наборов чисел с помощью UNION.
         res = await conn.execute(text("SELECT 1,2,3 union select 4,5,6"))
         print(f"{res.all()=}") # Выводим все строки результата.
@@ -42,20 +48,38 @@ def create_table_core():
     Эта функция удаляет существующую таблицу 'workers' (если она есть)
     и затем создает таблицу 'workers' на основе определения в metadata_obj.
     """
-    sync_engine.echo = False # Отключаем вывод SQL-запросов перед операциями создания/удаления.
-    metadata_obj.drop_all(sync_engine) # Удаляем все таблицы, связанные с metadata_obj, из базы данных.
-    print("Таблица удалена")
-    metadata_obj.create_all(sync_engine) # Создаем все таблицы, определенные в metadata_obj, в базе данных.
-    print("Таблица создана")
-    sync_engine.echo = True # Включаем вывод SQL-запросов обратно.
+    engine = get_sync_engine()
+    echo = engine.echo
+    engine.echo = False # Отключаем вывод SQL-запросов перед операциями создания/удаления.
+    try:
+        metadata_obj.drop_all(engine) # Удаляем все таблицы, связанные с metadata_obj, из базы данных.
+        print("Таблица удалена")
+        metadata_obj.create_all(engine) # Создаем все таблицы, определенные в metadata_obj, в базе данных.
+        print("Таблица создана")
+    finally:
+        engine.echo = echo # Возвращаем прежнюю настройку (DB_ECHO), а не включаем вывод принудительно.
 
 # Запрос на вставку данных (INSERT)
+# Правильный способ вставки данных с использованием Core API:
+_insert_workers_query = insert(workers_table).values([ # Создаем объект запроса INSERT для таблицы 'workers' и указываем значения для вставки.
+    {"username": "Bobr"}, # Первая строка данных для вставки (словарь: столбец -> значение).
+    {"username": "Volk"}  # Вторая строка данных для вставки.
+])
+
+
+def _workers_written():
+    # Core-запись не проходит через события Session: кэш и окно "чтения своих записей" обновляем сами,
+    # как в queries/upsert.py.
+    result_cache.invalidate((workers_table.name,))
+    mark_primary_write()
+
+
 def insert_data_core():
     """
     Эта функция выполняет SQL-запрос для вставки данных в таблицу 'workers'
     с использованием Core API SQLAlchemy.
     """
-    with sync_engine.connect() as conn: # Устанавливаем синхронное соединение с базой данных.
+    with get_sync_engine().connect() as conn: # Устанавливаем синхронное соединение с базой данных.
         # stmt = """INSERT INTO workers (username)  VALUES # ТАК НЕ НАДА
         # ('Bobr'),
         # ('Volk');"""
@@ -63,13 +87,9 @@ def insert_data_core():
         # Использование f-строк или конкатенации строк для создания SQL-запросов
         # может привести к SQL-инъекциям и является небезопасной практикой.
 
-        # Правильный способ вставки данных с использованием Core API:
-        stmt = insert(workers_table).values([ # Создаем объект запроса INSERT для таблицы 'workers' и указываем значения для вставки.
-            {"username": "Bobr"}, # Первая строка данных для вставки (словарь: столбец -> значение).
-            {"username": "Volk"}  # Вторая строка данных для вставки.
-        ])
-        conn.execute(stmt) # Выполняем SQL-запрос на вставку.
+        conn.execute(_insert_workers_query) # Выполняем SQL-запрос на вставку (см. _insert_workers_query).
         conn.commit() # Фиксируем транзакцию, сохраняя изменения в базе данных.
+    _workers_written()
 
 # Запрос на выборку данных (SELECT)
 def select_workers_core():
@@ -77,19 +97,28 @@ def select_workers_core():
     Эта функция выполняет SQL-запрос для выборки всех данных из таблицы 'workers'
     с использованием Core API SQLAlchemy и выводит результат.
     """
-    with sync_engine.connect() as conn: # Устанавливаем синхронное соединение с базой данных.
-        query = select(workers_table) # Создаем объект запроса SELECT для таблицы 'workers' (эквивалентно SELECT * FROM workers;).
-        res = conn.execute(query) # Выполняем SQL-запрос на выборку.
+    with sync_read_engine().connect() as conn: # Соединение с репликой для чтения (или с основной БД, если реплик нет).
+        res = conn.execute(_select_workers_query) # Выполняем SQL-запрос на выборку.
         workers = res.all() # Получаем все строки результата. Каждая строка представляет собой кортеж со значениями столбцов.
         print(workers) # Выводим полученные строки.
 
 # Запрос на обновление данных (UPDATE)
+# Создаем объект запроса UPDATE, указываем новые значения и условие WHERE (filter_by эквивалентен WHERE id=:id).
+# Значения - именованные bindparam, которые передаются при выполнении (имена не совпадают со столбцами:
+# bindparam("username") в values() конфликтовал бы с параметром самого столбца).
+_update_worker_username_query = (
+    update(workers_table)
+    .values(username=bindparam("new_username"))
+    .filter_by(id=bindparam("worker_id"))
+)
+
+
 def update_workers_core(worker_id: int = 2, new_username: str = "Misha"):
     """
     Эта функция выполняет SQL-запрос для обновления имени пользователя в таблице 'workers'
     для записи с указанным ID, используя Core API SQLAlchemy.
     """
-    with sync_engine.connect() as conn: # Устанавливаем синхронное соединение с базой данных.
+    with get_sync_engine().connect() as conn: # Устанавливаем синхронное соединение с базой данных.
         # stmt = text("UPDATE workers SET username={new_username}") # SQL иньекция так нельза!!!!
         # Комментарий к небезопасному способу:
         # Нельзя напрямую подставлять значения в SQL-запросы с помощью f-строк,
@@ -101,11 +130,48 @@ def update_workers_core(worker_id: int = 2, new_username: str = "Misha"):
         # Использование плейсхолдеров (:) и bindparams() является безопасным способом
         # передачи параметров в сырые SQL-запросы.
 
-        # Более удобный способ обновления с использованием Core API:
-        stmt = update(workers_table).values(username=new_username).filter_by(id=worker_id) # Создаем объект запроса UPDATE, указываем новые значения и условие WHERE (filter_by эквивалентен WHERE id=:id).
+        # Более удобный способ обновления с использованием Core API - _update_worker_username_query выше.
         # where/filter(workers_table.c.id==workers_id) не оч
         # Комментарий к альтернативному способу условия WHERE:
         # Можно использовать метод where() или filter() с условием, обращающимся к столбцу таблицы (workers_table.c.id).
         # filter_by() является более лаконичным способом для простых условий равенства по первичному ключу или другим столбцам.
-        conn.execute(stmt) # Выполняем SQL-запрос на обновление.
-        conn.commit() # Фиксируем транзакцию, сохраняя изменения в базе данных.
\ No newline at end of file
+        conn.execute(_update_worker_username_query, {"worker_id": worker_id, "new_username": new_username}) # Выполняем SQL-запрос на обновление.
+        conn.commit() # Фиксируем транзакцию, сохраняя изменения в базе данных.
+    _workers_written()
+
+
+# Асинхронные варианты (asyncpg). Выполняют те же запросы, что и синхронные функции выше,
+# и возвращают результат, а не только печатают его.
+async def get_vers_async():
+    """Асинхронный вариант `get_sync_vers`: версия сервера БД."""
+    async with get_async_engine().connect() as conn:
+        res = await conn.execute(_version_query)
+        return res.scalar_one()
+
+
+async def create_table_core_async():
+    """Асинхронный вариант `create_table_core`: DDL metadata_obj выполняется через run_sync."""
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(metadata_obj.drop_all)
+        await conn.run_sync(metadata_obj.create_all)
+
+
+async def insert_data_core_async():
+    """Асинхронный вариант `insert_data_core`."""
+    async with get_async_engine().begin() as conn:
+        await conn.execute(_insert_workers_query)
+    _workers_written()
+
+
+async def select_workers_core_async():
+    """Асинхронный вариант `select_workers_core`: чтение с реплики, если она есть."""
+    async with async_read_engine().connect() as conn:
+        res = await conn.execute(_select_workers_query)
+        return res.all()
+
+
+async def update_workers_core_async(worker_id: int = 2, new_username: str = "Misha"):
+    """Асинхронный вариант `update_workers_core`."""
+    async with get_async_engine().begin() as conn:
+        await conn.execute(_update_worker_username_query, {"worker_id": worker_id, "new_username": new_username})
+    _workers_written()
@@ -0,0 +1,70 @@
+from functools import partial
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import ResumesOrm
+from enums import Workload
+from queries.fanout import fan_out, QueryTimeoutError
+from queries.statements import avg_compensation_query_params, compensation_diff_query
+from schemas import CompensationDiffDTO, DashboardDTO, WorkloadAvgCompensationDTO
+
+# Дашборд: средняя компенсация по занятости (как select_resumes_avg_compensation), работники
+# с наибольшим превышением средней компенсации своей занятости (как join_cte_subquery_window_func)
+# и число резюме по занятости. Раньше эти запросы выполнялись по очереди, а первый - синхронно;
+# здесь они идут одновременно через fan_out, на тех же заранее построенных запросах, что и
+# демонстрация в queries/orm.py (queries/statements.py).
+
+_resume_counts_query = select(ResumesOrm.workload, func.count()).group_by(ResumesOrm.workload)
+
+
+async def get_avg_compensation(session: AsyncSession, like_language: str = "Python") -> list[WorkloadAvgCompensationDTO]:
+    """Асинхронный вариант `select_resumes_avg_compensation` с теми же порогами компенсации."""
+    rows = (await session.execute(*avg_compensation_query_params(like_language, None))).all()
+    return [WorkloadAvgCompensationDTO.model_validate(row, from_attributes=True) for row in rows]
+
+
+async def get_top_compensation_diff(session: AsyncSession, limit: int = 10) -> list[CompensationDiffDTO]:
+    """Первые `limit` строк запроса из `join_cte_subquery_window_func` по убыванию разницы."""
+    res = await session.execute(compensation_diff_query(limited=True), {"limit": limit})
+    return [
+        CompensationDiffDTO(
+            worker_id=row.worler_id,
+            username=row.username,
+            compensation=row.compensation,
+            workload=row.workload,
+            avg_workload_compensation=row.avg_workload_compensation,
+            compensation_diff=row.compensation_diff,
+        )
+        for row in res
+    ]
+
+
+async def get_resume_counts(session: AsyncSession) -> dict[Workload, int]:
+    """Число резюме по занятости (занятости без резюме - с нулём)."""
+    counts = dict.fromkeys(Workload, 0)
+    counts.update((await session.execute(_resume_counts_query)).tuples().all())
+    return counts
+
+
+async def get_dashboard(like_language: str = "Python", limit: int = 10, timeout: float | None = 5.0) -> DashboardDTO:
+    """
+    Собирает дашборд тремя одновременными запросами в отдельных сессиях.
+    Часть, не уложившаяся в `timeout` секунд, остаётся None с причиной в `errors`;
+    любая другая ошибка пробрасывается (после завершения остальных запросов).
+    """
+    results = await fan_out(
+        {
+            "avg_compensation": partial(get_avg_compensation, like_language=like_language),
+            "top_compensation_diff": partial(get_top_compensation_diff, limit=limit),
+            "resume_counts": get_resume_counts,
+        },
+        timeout=timeout,
+        return_exceptions=True,
+    )
+    errors = {}
+    for name, result in results.items():
+        if isinstance(result, QueryTimeoutError):
+            errors[name] = str(result)
+            results[name] = None
+        elif isinstance(result, BaseException):
+            raise result
+    return DashboardDTO(**results, errors=errors)
@@ -0,0 +1,75 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Mapping
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import async_session_factory
+
+# Параллельное выполнение независимых запросов на чтение (например, для дашборда).
+# Каждый запрос получает свою AsyncSession и своё соединение из пула, поэтому время ответа -
+# максимум по запросам, а не их сумма. Одновременно занимается столько соединений, сколько
+# запросов, - их число должно укладываться в DB_POOL_SIZE + DB_MAX_OVERFLOW.
+# Тайм-аут каждого запроса соблюдается дважды:
+# - на сервере через statement_timeout (SET LOCAL): PostgreSQL сам прерывает запрос, и соединение
+#   возвращается в пул исправным, а не остаётся занятым брошенным запросом;
+# - в Python через asyncio.wait_for с небольшим запасом - на случай, если не отвечает сеть.
+
+QueryFn = Callable[[AsyncSession], Awaitable[Any]]
+
+_TIMEOUT_GRACE = 0.5 # Запас wait_for сверх statement_timeout, секунды.
+_QUERY_CANCELED = "57014" # SQLSTATE query_canceled - сработал statement_timeout.
+
+
+class QueryTimeoutError(TimeoutError):
+    """Запрос `name` не уложился в `timeout` секунд и был отменён."""
+
+    def __init__(self, name: str, timeout: float):
+        super().__init__(f"{name}: запрос не уложился в {timeout} с")
+        self.name = name
+        self.timeout = timeout
+
+
+async def _run_query(name: str, query: QueryFn, timeout: float | None) -> Any:
+    async with async_session_factory() as session:
+        if timeout is None:
+            return await query(session)
+        # set_config(..., true) действует до конца транзакции сессии, как SET LOCAL,
+        # но в отличие от SET принимает параметры.
+        await session.execute(select(func.set_config("statement_timeout", str(int(timeout * 1000)), True)))
+        try:
+            return await asyncio.wait_for(query(session), timeout + _TIMEOUT_GRACE)
+        except TimeoutError as e:
+            raise QueryTimeoutError(name, timeout) from e
+        except DBAPIError as e:
+            if getattr(e.orig, "sqlstate", None) == _QUERY_CANCELED:
+                raise QueryTimeoutError(name, timeout) from e
+            raise
+
+
+async def fan_out(
+    queries: Mapping[str, QueryFn],
+    timeout: float | None = 5.0,
+    timeouts: Mapping[str, float | None] | None = None,
+    return_exceptions: bool = False,
+) -> dict[str, Any]:
+    """
+    Выполняет `queries` (имя -> async-функция от AsyncSession) одновременно, каждую в своей сессии,
+    и возвращает словарь имя -> результат. Тайм-аут запроса - `timeouts[имя]` или общий `timeout`
+    (None - без ограничения); превышение - QueryTimeoutError.
+    `return_exceptions=False`: первая ошибка отменяет остальные запросы и пробрасывается дальше.
+    `return_exceptions=True`: как в asyncio.gather - исключение становится результатом своего запроса.
+    Отмена самого fan_out (например, клиент закрыл соединение) отменяет все запросы.
+    """
+    timeouts = timeouts or {}
+    tasks = {
+        name: asyncio.create_task(_run_query(name, query, timeouts.get(name, timeout)), name=f"fan_out:{name}")
+        for name, query in queries.items()
+    }
+    try:
+        results = await asyncio.gather(*tasks.values(), return_exceptions=return_exceptions)
+    finally:
+        # Незавершённые запросы отменяются и дожидаются, пока их сессии вернут соединения в пул.
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+    return dict(zip(tasks, results))
@@ -0,0 +1,68 @@
+from typing import Literal
+from sqlalchemy import Select, select, func, and_, true
+from sqlalchemy.orm import aliased, contains_eager
+from models import WorkerOrm, ResumesOrm
+
+# Загрузка "первых N резюме каждого работника" в WorkerOrm.resumes.
+# Вместо коррелированного подзапроса в условии JOIN (он выполняется на каждую соединяемую строку,
+# см. старую версию select_workers_with_condition_relationship_containseager_limit) используется один из
+# двух способов, оба линейные по числу резюме:
+# - "window": ROW_NUMBER() OVER (PARTITION BY worker_id ORDER BY ...) за один проход по resumes,
+#   затем JOIN по rn <= N. Хорош, когда нужны почти все работники.
+# - "lateral": JOIN LATERAL (SELECT ... WHERE worker_id = w.id ORDER BY ... LIMIT N) - по индексу
+#   resumes_worker_id_index на каждого выбранного работника. Хорош для страниц и выборок работников.
+
+
+# Столбцы резюме без отложенного title_tsv: поисковый вектор в подзапросе не нужен.
+_resume_columns = [column for column in ResumesOrm.__table__.c if column.key != "title_tsv"]
+
+
+def select_workers_with_top_resumes(
+    n: int,
+    order_by=None,
+    method: Literal["window", "lateral"] = "window",
+    workers_query: Select | None = None,
+) -> Select:
+    """
+    Строит select(WorkerOrm), у которого коллекция `resumes` содержит не больше `n` резюме,
+    отсортированных по `order_by` (по умолчанию - новые первыми, `ResumesOrm.id.desc()`).
+    Например, самые высокооплачиваемые: `order_by=ResumesOrm.compensation.desc().nulls_last()`.
+
+    `workers_query` - необязательный select(WorkerOrm) с фильтрами/сортировкой/LIMIT по работникам.
+    Он оборачивается в подзапрос, поэтому LIMIT считает работников, а не строки JOIN с резюме.
+    Результат нужно читать через `.unique().scalars()`.
+    """
+    if order_by is None:
+        order_by = ResumesOrm.id.desc()
+    worker = WorkerOrm
+    if workers_query is not None:
+        worker = aliased(WorkerOrm, workers_query.subquery())
+
+    if method == "window":
+        ranked = (
+            select(
+                *_resume_columns,
+                func.row_number().over(partition_by=ResumesOrm.worker_id, order_by=order_by).label("rn"),
+            )
+            .subquery("ranked_resumes")
+        )
+        top = aliased(ResumesOrm, ranked)
+        query = select(worker).outerjoin(top, and_(top.worker_id == worker.id, ranked.c.rn <= n))
+    else:
+        ranked = (
+            select(*_resume_columns, func.row_number().over(order_by=order_by).label("rn"))
+            .filter(ResumesOrm.worker_id == worker.id)
+            .order_by(order_by)
+            .limit(n)
+            .lateral("top_resumes")
+        )
+        top = aliased(ResumesOrm, ranked)
+        query = select(worker).outerjoin(top, true())
+
+    return (
+        query
+        .options(contains_eager(worker.resumes.of_type(top)))
+        .order_by(worker.id, ranked.c.rn)
+        # Если работники уже есть в сессии с полной коллекцией, заменяем её урезанной.
+        .execution_options(populate_existing=True)
+    )
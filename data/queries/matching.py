@@ -0,0 +1,103 @@
+from functools import cache
+from sqlalchemy import select, bindparam, any_, DateTime, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from cdc import ChangeEvent
+from database import get_async_engine
+from matching import resume_index
+from models import ResumesOrm, VacanciesOrm
+from schemas import ResumesDTO, ResumeMatchDTO
+from queries.readonly import get_records_async, select_records
+from queries.watermark import WatermarkRefresher, event_ids
+
+# Подбор резюме под вакансию: ранжирование идёт по индексу в памяти (matching.py), а к БД
+# уходят только чтение вакансии и k найденных резюме по первичному ключу (записями только для чтения).
+# Индекс загружается целиком при первом подборе (или после resume_index.invalidate()), а затем
+# не чаще раза в MATCH_REFRESH_SECONDS догружает резюме по updated_at (queries/watermark.py).
+# Изменения через ORM этого процесса попадают в индекс сразу после коммита (события сессии в matching.py).
+# Удаление не меняет updated_at: резюме, удалённые в обход ORM этого процесса, убираются из индекса,
+# когда подбор их находит, а в БД их уже нет.
+# При включённом потоке изменений (cdc.py) apply_resume_changes применяет к индексу изменения
+# из других процессов и в обход ORM, включая удаления, через доли секунды после коммита.
+
+_resume_columns = (ResumesOrm.id, ResumesOrm.title, ResumesOrm.compensation, ResumesOrm.updated_at)
+_all_resumes_query = select(*_resume_columns).execution_options(yield_per=10_000)
+_changed_resumes_query = select(*_resume_columns).filter(ResumesOrm.updated_at >= bindparam("since", type_=DateTime))
+_index_rows_by_ids_query = select(ResumesOrm.id, ResumesOrm.title, ResumesOrm.compensation).filter(
+    ResumesOrm.id == any_(bindparam("resume_ids", type_=ARRAY(Integer)))
+)
+_vacancy_query = select(VacanciesOrm.title, VacanciesOrm.compensation).filter(VacanciesOrm.id == bindparam("vacancy_id"))
+
+
+@cache # Строится при первом подборе: select_records настраивает мапперы.
+def _resumes_by_ids_query():
+    return select_records(ResumesOrm).filter(ResumesOrm.id == any_(bindparam("resume_ids", type_=ARRAY(Integer))))
+
+
+def _upsert_rows(rows: list[tuple]) -> None:
+    for resume_id, title, compensation in rows:
+        resume_index.upsert(resume_id, title, compensation)
+
+
+_refresher = WatermarkRefresher(
+    resume_index, _all_resumes_query, _changed_resumes_query, _upsert_rows, refresh_setting="MATCH_REFRESH_SECONDS"
+)
+
+
+async def load_resume_index(session: AsyncSession) -> int:
+    """Загружает индекс подбора заново по всем резюме. Возвращает их число."""
+    return await _refresher.load(session)
+
+
+async def refresh_resume_index(session: AsyncSession) -> int:
+    """Догружает в индекс резюме, изменённые с прошлой загрузки. Возвращает число прочитанных строк."""
+    return await _refresher.refresh(session)
+
+
+async def _reread_resumes(events: list[ChangeEvent]) -> None:
+    resume_ids = event_ids(events, "resumes")
+    async with get_async_engine().connect() as conn:
+        rows = (await conn.execute(_index_rows_by_ids_query, {"resume_ids": resume_ids})).all()
+    _upsert_rows(rows)
+    for resume_id in set(resume_ids).difference(row.id for row in rows):
+        resume_index.remove(resume_id)
+
+
+async def apply_resume_changes(events: list[ChangeEvent]) -> None:
+    """
+    Подписчик change_feed на таблицу resumes: резюме из событий перечитываются по id с основного
+    сервера (реплика может отставать) - найденные обновляются в индексе, остальные из него убираются.
+    Перечитывание, а не значения из события, даёт верный итог при любом порядке событий пачки.
+    truncate и reset помечают индекс устаревшим.
+    """
+    await _refresher.apply_changes(events, _reread_resumes)
+
+
+async def match_resumes_for_vacancy(session: AsyncSession, vacancy_id: int, k: int = 10) -> list[ResumeMatchDTO] | None:
+    """
+    `k` резюме, лучше всего подходящих вакансии `vacancy_id` по заголовку и компенсации
+    (оценка - см. matching.py), по убыванию оценки. None - вакансии нет.
+    """
+    vacancy = (await session.execute(_vacancy_query, {"vacancy_id": vacancy_id})).first()
+    if vacancy is None:
+        return None
+    await _refresher.ensure_fresh(session)
+    for _ in range(3): # Повтор, если часть найденных резюме уже удалена из БД.
+        matches = resume_index.match(vacancy.title, vacancy.compensation, k)
+        records = await get_records_async(session, ResumesOrm, _resumes_by_ids_query(), {"resume_ids": [match.resume_id for match in matches]})
+        resumes = {resume.id: resume for resume in records}
+        missing = [match.resume_id for match in matches if match.resume_id not in resumes]
+        for resume_id in missing:
+            resume_index.remove(resume_id)
+        if not missing:
+            break
+    return [
+        ResumeMatchDTO(
+            **ResumesDTO.model_validate(resumes[match.resume_id], from_attributes=True).model_dump(),
+            score=match.score,
+            title_score=match.title_score,
+            compensation_score=match.compensation_score,
+        )
+        for match in matches
+        if match.resume_id in resumes
+    ]
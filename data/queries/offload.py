@@ -0,0 +1,65 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, partial, wraps
+from typing import Awaitable, Callable, ParamSpec, TypeVar
+from config import settings
+
+# Мост для кода, который пока может вызывать только синхронные функции (sync_engine, psycopg):
+# например, демонстрации queries/orm.py и queries/core.py без асинхронного варианта или чужие
+# библиотеки. Такой вызов прямо в корутине блокирует event loop на всё время запроса - остальные
+# запросы, тайм-ауты и heartbeat'ы стоят. Здесь функция выполняется в отдельном пуле потоков,
+# а корутина ждёт её результат, не занимая event loop.
+# Размер пула - DB_POOL_SIZE + DB_MAX_OVERFLOW, сколько соединений может выдать синхронный движок:
+# лишние потоки всё равно ждали бы соединения в QueuePool (до DB_POOL_TIMEOUT), а общий пул
+# asyncio.to_thread занят ещё и чужими задачами. Если число соединений приложением не ограничено
+# (DB_MAX_OVERFLOW = -1 или DB_NULL_POOL), берётся размер по умолчанию ThreadPoolExecutor,
+# но не меньше DB_POOL_SIZE; в любом случае - от 1 до _MAX_THREADS потоков. Контекст (contextvars) копируется в поток, как
+# в asyncio.to_thread, поэтому статистика запросов instrumentation.track_queries не теряется.
+# Отмена ожидающей корутины не прерывает уже начатый в потоке запрос: он доработает и вернёт
+# соединение в пул. Для нового кода лучше асинхронные варианты функций (*_async).
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+_MAX_THREADS = 64
+
+
+def _threadpool_size() -> int:
+    if settings.DB_NULL_POOL or settings.DB_MAX_OVERFLOW < 0:
+        size = max(min(32, (os.cpu_count() or 1) + 4), settings.DB_POOL_SIZE)
+    else:
+        size = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    return max(1, min(size, _MAX_THREADS))
+
+
+@cache
+def _executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=_threadpool_size(), thread_name_prefix="db-offload")
+
+
+async def run_in_threadpool(fn: Callable[P, R], /, *args: P.args, **kwargs: P.kwargs) -> R:
+    """Выполняет синхронную `fn(*args, **kwargs)` в пуле потоков и возвращает её результат."""
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(), partial(context.run, fn, *args, **kwargs))
+
+
+def offload(fn: Callable[P, R]) -> Callable[P, Awaitable[R]]:
+    """
+    Декоратор: awaitable-обёртка синхронной функции через `run_in_threadpool`, например
+    `select_workers_core_offloaded = offload(select_workers_core)`.
+    """
+    @wraps(fn)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        return await run_in_threadpool(fn, *args, **kwargs)
+    return wrapper
+
+
+def shutdown_threadpool(wait: bool = True) -> None:
+    """Останавливает пул потоков, если он создавался (при остановке приложения)."""
+    if _executor.cache_info().currsize:
+        _executor().shutdown(wait=wait)
+        _executor.cache_clear()
@@ -1,21 +1,65 @@
-from sqlalchemy import text, insert, select, func, cast, Integer, and_
+from sqlalchemy import text, insert, select, func, cast, bindparam, Integer, String, and_
 from sqlalchemy.orm import aliased, joinedload, selectinload, contains_eager
-from database import sync_engine, async_engine, sync_session_factory, async_session_factory, Base
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_engine, get_sync_engine, sync_session_factory, async_session_factory, Base
 from models import metadata_obj, WorkerOrm, ResumesOrm, Workload, VacanciesOrm, VacanciesReplioceOrm
 from datetime import datetime
+from functools import lru_cache
 from schemas import *
+from queries.loaders import select_workers_with_top_resumes
+from queries.replies import add_replies_in_session, add_replies_async
+from queries.repository import get_resumes_with_all_relationships, _resumes_with_all_relationships_query
+from queries.statements import avg_compensation_query_params, compensation_diff_query
 # Функция для создания таблиц в базе данных
 def create_table_orm():
     """
     Эта функция удаляет все существующие таблицы, включает вывод SQL-запросов
     и создает все таблицы, определенные в метаданных Base.
     """
-    Base.metadata.drop_all(sync_engine) # Удаляет все таблицы, определенные в Base.metadata из базы данных.
-    sync_engine.echo = True # Включает вывод сгенерированных SQL-запросов в консоль.
-    Base.metadata.create_all(sync_engine) # Создает все таблицы, определенные в Base.metadata в базе данных.
-    sync_engine.echo = True # Включает вывод сгенерированных SQL-запросов в консоль (повторно).
+    engine = get_sync_engine()
+    Base.metadata.drop_all(engine) # Удаляет все таблицы, определенные в Base.metadata из базы данных.
+    echo = engine.echo
+    engine.echo = True # Включает вывод сгенерированного DDL в консоль.
+    try:
+        Base.metadata.create_all(engine) # Создает все таблицы, определенные в Base.metadata в базе данных.
+    finally:
+        engine.echo = echo # Возвращает прежнюю настройку (DB_ECHO) для остальной работы процесса.
     print("ready") # Выводит сообщение об успешном завершении создания таблиц.
 
+# Данные для вставки: общие для insert_table_orm и insert_table_orm_async.
+def _demo_workers() -> list[WorkerOrm]:
+    # Создаем экземпляры модели WorkerOrm для добавления работников.
+    return [
+        WorkerOrm(username="Bobr", lastname="Kurwa", phone_number=790),
+        WorkerOrm(username="Volk", lastname="Makaka", phone_number=890),
+        WorkerOrm(username="Lisa", lastname="Joinova", phone_number=659),
+        WorkerOrm(username="Misa", lastname="Light", phone_number=795),
+        WorkerOrm(username="Light", lastname="Misa", phone_number=790),
+        WorkerOrm(username="Sany", lastname="Lala", phone_number=123),
+    ]
+
+
+def _demo_resumes(workers: list[WorkerOrm]) -> list[ResumesOrm]:
+    # Создаем экземпляры модели ResumesOrm для добавления резюме.
+    # Связываем каждое резюме с соответствующим работником по его ID (worker_id),
+    # поэтому работники должны быть уже записаны в базу (commit или flush).
+    worker_bobr, worker_volk, worker_lisa, worker_misa, worker_light, worker_sany = workers
+    return [
+        ResumesOrm(title="Bobr.... Python", compensation=100000,
+            workload=Workload.fulltime, worker_id=worker_bobr.id, created_at=datetime.utcnow(), updated_at=datetime.utcnow()),
+        ResumesOrm(title="Volk.... Python", compensation=150000,
+            workload=Workload.parttime, worker_id=worker_volk.id, created_at=datetime.utcnow(), updated_at=datetime.utcnow()),
+        ResumesOrm(title="lisa.... python", compensation=200000,
+            workload=Workload.parttime, worker_id=worker_lisa.id, created_at=datetime.utcnow(), updated_at=datetime.utcnow()),
+        ResumesOrm(title="Misa.... Python", compensation=225000,
+            workload=Workload.fulltime, worker_id=worker_misa.id, created_at=datetime.utcnow(), updated_at=datetime.utcnow()),
+        ResumesOrm(title="Lihht.... Python", compensation=50000,
+            workload=Workload.fulltime, worker_id=worker_light.id, created_at=datetime.utcnow(), updated_at=datetime.utcnow()),
+        ResumesOrm(title="Sany.... python", compensation=230000,
+            workload=Workload.parttime, worker_id=worker_sany.id, created_at=datetime.utcnow(), updated_at=datetime.utcnow()),
+    ]
+
+
 # Запрос на вставку данных в таблицы (синхронная сессия)
 def insert_table_orm():
     """
@@ -23,34 +67,14 @@ def insert_table_orm():
     с использованием синхронной сессии SQLAlchemy. Затем она фиксирует изменения в базе данных.
     """
     with sync_session_factory() as session: # Создаем контекстный менеджер для синхронной сессии. Сессия автоматически закроется после выполнения блока.
-        # Создаем экземпляры модели WorkerOrm для добавления работников.
-        worker_bobr = WorkerOrm(username="Bobr", lastname="Kurwa", phone_number=790)
-        worker_volk = WorkerOrm(username="Volk", lastname="Makaka", phone_number=890)
-        worker_lisa = WorkerOrm(username="Lisa", lastname="Joinova", phone_number=659)
-        worker_misa = WorkerOrm(username="Misa", lastname="Light", phone_number=795)
-        worker_light = WorkerOrm(username="Light", lastname="Misa", phone_number=790)
-        worker_sany = WorkerOrm(username="Sany", lastname="Lala", phone_number=123)
+        workers = _demo_workers() # Создаем экземпляры модели WorkerOrm (см. _demo_workers).
         # Добавляем все созданные экземпляры работников в сессию.
-        session.add_all([worker_bobr, worker_volk, worker_lisa, worker_misa, worker_light, worker_sany])
+        session.add_all(workers)
         session.commit() # Фиксируем транзакцию, отправляя данные в базу данных.
-        # Создаем экземпляры модели ResumesOrm для добавления резюме.
-        # Связываем каждое резюме с соответствующим работником по его ID (worker_id).
-        resumes_bobr = ResumesOrm(title="Bobr.... Python", compensation=100000,
-            workload=Workload.fulltime, worker_id=worker_bobr.id, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
-        resumes_volk = ResumesOrm(title="Volk.... Python", compensation=150000,
-            workload=Workload.parttime, worker_id=worker_volk.id, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
-        resumes_lisa = ResumesOrm(title="lisa.... python", compensation=200000,
-            workload=Workload.parttime, worker_id=worker_lisa.id, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
-        resumes_misa = ResumesOrm(title="Misa.... Python", compensation=225000,
-            workload=Workload.fulltime, worker_id=worker_misa.id, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
-        resumes_light = ResumesOrm(title="Lihht.... Python", compensation=50000,
-            workload=Workload.fulltime, worker_id=worker_light.id, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
-        resumes_sany = ResumesOrm(title="Sany.... python", compensation=230000,
-            workload=Workload.parttime, worker_id=worker_sany.id, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
         # session.add(worker_bobr) # Отправка отдельного объекта в сессию (уже сделано через add_all выше).
         # session.add(worker_volk) или... (уже сделано через add_all выше).
-        # Добавляем все созданные экземпляры резюме в сессию.
-        session.add_all([resumes_bobr,resumes_volk, resumes_lisa, resumes_misa, resumes_light, resumes_sany])
+        # Добавляем все созданные экземпляры резюме в сессию (резюме связаны с работниками по worker_id).
+        session.add_all(_demo_resumes(workers))
         # session.flush() # Отправляет изменения в базу данных, но не завершает транзакцию (не делает commit).
         session.commit() # Фиксируем транзакцию, сохраняя все изменения в базе данных.
 
@@ -71,6 +95,14 @@ async def insert_table():
         await session.commit() # Асинхронно фиксируем транзакцию, отправляя данные в базу данных.
 
 # Запрос на выборку данных из таблицы 'workers'
+# Запросы демонстраций ниже строятся один раз при первом вызове (опции загрузки отношений
+# настраивают мапперы, а это должно оставаться ленивым, см. database.warm_up) и выполняются
+# как синхронными функциями, так и их асинхронными вариантами в конце модуля.
+@lru_cache(maxsize=None)
+def _workers_query():
+    return select(WorkerOrm) # Создаем SQL-запрос SELECT * FROM workers;.
+
+
 def select_workers_orm():
     """
     Эта функция выполняет запрос на выборку всех записей из таблицы 'workers'
@@ -79,8 +111,7 @@ def select_workers_orm():
     with sync_session_factory() as session: # Создаем контекстный менеджер для синхронной сессии.
         # worker_id = 1
         # worker_bobr = session.get(WorkerOrm, worker_id) # Получает запись работника по его ID (если существует).
-        query = select(WorkerOrm) # Создаем SQL-запрос SELECT * FROM workers;.
-        res = session.execute(query) # Выполняем SQL-запрос и получаем результат.
+        res = session.execute(_workers_query()) # Выполняем SQL-запрос SELECT * FROM workers; и получаем результат.
         workers = res.scalars().all() # Извлекаем все объекты WorkerOrm из результата запроса.
         print(f"{workers=}") # Выводим список полученных объектов работников.
 
@@ -93,30 +124,21 @@ def select_workers_orm():
 #         session.refresh(worker_volk) # Получает самые свежие данные из базы данных для данного объекта.
 #         session.commit() # Фиксируем изменения в базе данных.
 
-# Запрос на выборку средней зарплаты из таблицы 'resumes' с фильтрацией и группировкой
-def select_resumes_avg_compensation(like_language: str = "Python"):
+# Запрос средней компенсации (select_resumes_avg_compensation и Pydantic_DTO_join) - в queries/statements.py.
+def select_resumes_avg_compensation(like_language: str = "Python", created_since: datetime | None = None):
     """
     Эта функция выполняет запрос на выборку средней компенсации из таблицы 'resumes',
     фильтруя по языку в заголовке и минимальной компенсации, группируя по типу занятости
     и фильтруя группы по минимальной средней компенсации.
+    `created_since` ограничивает выборку резюме, созданными не раньше этого момента
+    (на секционированной по created_at таблице отбрасываются секции старых месяцев).
+
+    Раньше здесь печатался `query.compile(compile_kwargs={"literal_binds": True})`: такая компиляция
+    не кэшируется и стоила дороже самого запроса. Сгенерированный SQL виден при DB_ECHO=True.
     """
     with sync_session_factory() as session: # Создаем контекстный менеджер для синхронной сессии.
-        query = (
-            select(
-                ResumesOrm.workload, # Получаем столбец 'workload' (тип занятости: fulltime/parttime).
-                cast(func.avg(ResumesOrm.compensation), Integer).label("avg_compensation"), # Вычисляем среднюю компенсацию и приводим к целому числу, даем псевдоним 'avg_compensation'.
-            )
-            .filter(
-                and_(
-                    ResumesOrm.title.contains(like_language), # Фильтруем резюме, где в заголовке встречается указанный язык (like_language). Оператор 'contains' эквивалентен SQL LIKE %value%.
-                    ResumesOrm.compensation > 40000 # Дополнительно фильтруем резюме с компенсацией больше 40000.
-                ) # 'and_' используется для объединения нескольких условий фильтрации с логическим "И".
-            ) # 'filter' применяет условия отбора к запросу.
-            .group_by(ResumesOrm.workload) # Группируем результаты по столбцу 'workload', чтобы вычислить среднюю зарплату для каждой группы (fulltime и parttime).
-            .having(cast(func.avg(ResumesOrm.compensation), Integer) > 70000) # Применяем фильтр к сгруппированным результатам. Оставляем только те группы, где средняя зарплата больше 70000.
-        )
-        print(query.compile(compile_kwargs={"literal_binds": True})) # Печатаем скомпилированный SQL-запрос с подставленными значениями для лучшего понимания.
-        res = session.execute(query) # Выполняем SQL-запрос и получаем результат.
+        query, params = avg_compensation_query_params(like_language, created_since)
+        res = session.execute(query, params) # Выполняем заранее построенный запрос, передавая значения параметров.
         result = res.all() # Извлекаем все строки результата. Каждая строка будет содержать 'workload' и 'avg_compensation'.
         print(result) # Выводим полученный результат.
 def select_workers_with_lazy_relationship():
@@ -141,9 +163,7 @@ def select_workers_with_lazy_relationship():
       нужно получить связанные данные для большого количества основных сущностей.
     """
     with sync_session_factory() as session: # Создаем сессию для взаимодействия с базой данных.
-        query = (
-            select(WorkerOrm) # Создаем запрос на выборку всех работников из таблицы 'workers'.
-        )
+        query = _workers_query() # Запрос на выборку всех работников из таблицы 'workers'.
 
         res = session.execute(query) # Выполняем запрос на выборку работников и получаем объект Result.
         result = res.scalars().all() # Извлекаем все объекты WorkerOrm из объекта Result в виде списка.
@@ -163,6 +183,25 @@ def select_workers_with_lazy_relationship():
 
         print(f"{worker_2_resumes}") # Выводим список объектов ResumesOrm, связанных со вторым работником.
 
+@lru_cache(maxsize=None)
+def _workers_resumes_parttime_query():
+    return (
+        select(WorkerOrm) # Создаем запрос на выборку всех работников из таблицы 'workers'.
+        .options(selectinload(WorkerOrm.resumes_parttime)) # Указываем SQLAlchemy загрузить связанную коллекцию
+                                                           # `resumes_parttime` для каждого `WorkerOrm`.
+                                                           # `selectinload` выполнит это двумя запросами:
+                                                           # 1. Выборка всех WorkerOrm.
+                                                           # 2. Выборка всех ResumesOrm, связанных с этими WorkerOrm
+                                                           #    и соответствующих условию workload == 'parttime'
+                                                           #    (как определено в primaryjoin отношения).
+        #.options(selectinload(WorkerOrm.resumes)) # Много relationship много options все логично
+        # Эта закомментированная строка показывает, что вы можете использовать несколько `.options()`
+        # для загрузки различных связанных коллекций или объектов в одном запросе.
+        # Каждая `.options()` будет применять свою стратегию загрузки (например, joinedload, selectinload)
+        # к указанному отношению.
+    )
+
+
 def select_workers_with_condition_relationship():
     """
     Эта функция демонстрирует жадную (eager) загрузку связанных данных
@@ -181,23 +220,7 @@ def select_workers_with_condition_relationship():
     - Ситуаций, где вам нужна специфическая подмножество связанных объектов для каждого основного объекта.
     """
     with sync_session_factory() as session: # Создаем сессию для взаимодействия с базой данных.
-        query = (
-            select(WorkerOrm) # Создаем запрос на выборку всех работников из таблицы 'workers'.
-            .options(selectinload(WorkerOrm.resumes_parttime)) # Указываем SQLAlchemy загрузить связанную коллекцию
-                                                               # `resumes_parttime` для каждого `WorkerOrm`.
-                                                               # `selectinload` выполнит это двумя запросами:
-                                                               # 1. Выборка всех WorkerOrm.
-                                                               # 2. Выборка всех ResumesOrm, связанных с этими WorkerOrm
-                                                               #    и соответствующих условию workload == 'parttime'
-                                                               #    (как определено в primaryjoin отношения).
-            #.options(selectinload(WorkerOrm.resumes)) # Много relationship много options все логично
-            # Эта закомментированная строка показывает, что вы можете использовать несколько `.options()`
-            # для загрузки различных связанных коллекций или объектов в одном запросе.
-            # Каждая `.options()` будет применять свою стратегию загрузки (например, joinedload, selectinload)
-            # к указанному отношению.
-        )
-
-        res = session.execute(query) # Выполняем запрос(ы) и получаем объект Result.
+        res = session.execute(_workers_resumes_parttime_query()) # Выполняем запрос(ы) и получаем объект Result.
         result = res.scalars().all() # Извлекаем все объекты WorkerOrm из объекта Result в виде списка.
                                      # Поскольку `selectinload` загружает коллекции, `scalars().all()`
                                      # вернет только объекты WorkerOrm, и их коллекции `resumes_parttime`
@@ -206,6 +229,22 @@ def select_workers_with_condition_relationship():
         print(result) # Выводим список объектов WorkerOrm. При обращении к `worker.resumes_parttime`
                       # для каждого объекта, соответствующие отфильтрованные резюме будут доступны.
 
+@lru_cache(maxsize=None)
+def _workers_parttime_contains_eager_query():
+    return (
+        select(WorkerOrm) # Создаем запрос на выборку всех работников.
+        .join(WorkerOrm.resumes) # Явно присоединяем таблицу `resumes` к `workers`.
+                                 # Это создает SQL JOIN между WorkerOrm и ResumesOrm.
+        .options(contains_eager(WorkerOrm.resumes)) # Сообщаем SQLAlchemy, что атрибут `resumes`
+                                                    # на объекте `WorkerOrm` должен быть заполнен
+                                                    # данными, которые уже получены в результате `JOIN`.
+                                                    # SQLAlchemy не будет выполнять дополнительный запрос для резюме.
+        .filter(ResumesOrm.workload == 'parttime') # Применяем фильтр к **связанной таблице ResumesOrm**.
+                                                    # Это означает, что будут выбраны только те работники,
+                                                    # у которых есть хотя бы одно резюме с `workload == 'parttime'`.
+    )
+
+
 def select_workers_with_condition_relationship_containseager():
     """
     Эта функция демонстрирует жадную загрузку `contains_eager` для фильтрации
@@ -224,20 +263,7 @@ def select_workers_with_condition_relationship_containseager():
       могут быть недостаточно гибкими для фильтрации основной коллекции.
     """
     with sync_session_factory() as session: # Создаем сессию для взаимодействия с базой данных.
-        query = (
-            select(WorkerOrm) # Создаем запрос на выборку всех работников.
-            .join(WorkerOrm.resumes) # Явно присоединяем таблицу `resumes` к `workers`.
-                                     # Это создает SQL JOIN между WorkerOrm и ResumesOrm.
-            .options(contains_eager(WorkerOrm.resumes)) # Сообщаем SQLAlchemy, что атрибут `resumes`
-                                                        # на объекте `WorkerOrm` должен быть заполнен
-                                                        # данными, которые уже получены в результате `JOIN`.
-                                                        # SQLAlchemy не будет выполнять дополнительный запрос для резюме.
-            .filter(ResumesOrm.workload == 'parttime') # Применяем фильтр к **связанной таблице ResumesOrm**.
-                                                        # Это означает, что будут выбраны только те работники,
-                                                        # у которых есть хотя бы одно резюме с `workload == 'parttime'`.
-        )
-
-        res = session.execute(query) # Выполняем запрос.
+        res = session.execute(_workers_parttime_contains_eager_query()) # Выполняем запрос (JOIN + contains_eager).
         result = res.unique().scalars().all() # Извлекаем уникальные объекты WorkerOrm.
                                              # `.unique()` важен здесь, потому что `JOIN` может привести к
                                              # дублированию объектов WorkerOrm, если у работника несколько резюме,
@@ -247,17 +273,25 @@ def select_workers_with_condition_relationship_containseager():
                       # будет содержать только те резюме, которые соответствовали условию фильтрации
                       # (т.е., 'parttime'), так как `contains_eager` их "перехватил" из JOIN.
 
+@lru_cache(maxsize=None)
+def _workers_top_resumes_query():
+    return select_workers_with_top_resumes(
+        2, # Не больше 2 резюме на работника.
+        order_by=ResumesOrm.id.desc(), # Самые новые резюме первыми.
+    ) # Внутри используется contains_eager: коллекция `resumes` заполняется строками из JOIN.
+
+
 def select_workers_with_condition_relationship_containseager_limit():
     """
     Эта функция демонстрирует продвинутое использование `contains_eager`
-    в сочетании с подзапросом для ограниченной загрузки связанных коллекций.
+    для ограниченной загрузки связанных коллекций: первые 2 резюме каждого работника.
 
-    Здесь мы хотим выбрать работников, у которых есть резюме с определенным условием,
-    и одновременно ограничить количество связанных резюме, которые будут загружены
-    для каждого работника (например, только первые 2 "parttime" резюме).
-    Это достигается путем создания коррелированного подзапроса для получения ID
-    нужных связанных объектов, а затем использования их в основном запросе с `JOIN`
-    и `contains_eager`.
+    Раньше здесь был коррелированный подзапрос внутри условия JOIN
+    (`ResumesOrm.id.in_(subq)`), к тому же отсортированный по `WorkerOrm.id`, а не по резюме.
+    Такой подзапрос выполняется для каждой соединяемой строки, и время растёт квадратично
+    с числом резюме. Теперь запрос строит `select_workers_with_top_resumes` из queries/loaders.py:
+    резюме нумеруются оконной функцией `ROW_NUMBER() OVER (PARTITION BY worker_id ORDER BY id DESC)`
+    за один проход, и к работнику присоединяются только строки с номером <= 2.
 
     **Подходит для:**
     - Сложных сценариев, где необходимо выборочно загружать ограниченное количество
@@ -266,38 +300,21 @@ def select_workers_with_condition_relationship_containseager_limit():
       лишь часть данных.
     """
     with sync_session_factory() as session: # Создаем сессию для взаимодействия с базой данных.
-        subq = (
-            select(ResumesOrm.id.label("parttime_resumes_id")) # Выбираем только ID резюме.
-            .filter(ResumesOrm.worker_id == WorkerOrm.id) # **Корреляция:** Этот фильтр связывает подзапрос с внешним запросом.
-                                                         # Он означает "для каждого работника во внешнем запросе,
-                                                         # выбери резюме, где `worker_id` равен `id` этого работника".
-            .order_by(WorkerOrm.id.desc()) # Сортируем резюме (по ID работника в данном случае).
-            .limit(2) # Ограничиваем количество выбранных резюме до 2 для каждого работника.
-            .scalar_subquery() # Преобразует этот запрос в скалярный подзапрос, который возвращает одно значение.
-                               # В данном случае, это будет использоваться в IN-условии,
-                               # поэтому он возвращает набор ID.
-            .correlate(WorkerOrm) # Явно указывает SQLAlchemy, что этот подзапрос коррелирует с WorkerOrm.
-                                 # Это означает, что подзапрос будет выполняться для каждой строки
-                                 # из основного запроса WorkerOrm.
-        )
-        query = (
-            select(WorkerOrm) # Выбираем работников.
-            .join(ResumesOrm, ResumesOrm.id.in_(subq)) # Соединяем WorkerOrm с ResumesOrm,
-                                                       # но условие соединения использует наш подзапрос:
-                                                       # присоединяются только те резюме, ID которых
-                                                       # были выбраны в `subq` (т.е., первые 2 parttime резюме).
-            .options(contains_eager(WorkerOrm.resumes)) # Говорим SQLAlchemy, что `resumes`
-                                                        # уже загружены этим `JOIN`'ом
-                                                        # и должны быть заполнены.
-        )
-
-        res = session.execute(query) # Выполняем запрос.
+        res = session.execute(_workers_top_resumes_query()) # Выполняем запрос (см. _workers_top_resumes_query).
         result = res.unique().scalars().all() # Извлекаем уникальные объекты WorkerOrm,
                                              # их коллекции `resumes` будут содержать
-                                             # только те 2 ограниченных резюме,
-                                             # которые были получены через `JOIN`.
+                                             # не больше 2 резюме.
         print(result) # Выводим список WorkerOrm с их ограниченными связанными резюме.
 
+@lru_cache(maxsize=None)
+def _workers_joined_resumes_query():
+    return (
+        select(WorkerOrm) # Создаем запрос на выборку всех работников из таблицы 'workers'.
+        .options(joinedload(WorkerOrm.resumes)) # Указываем SQLAlchemy, что отношение 'resumes' должно быть загружено
+                                               # "жадно" (eagerly) с использованием `JOIN`.
+    )
+
+
 def select_workers_with_joined_relationship():
     """
     Эта функция демонстрирует жадную (eager) загрузку связанных данных с помощью joinedload.
@@ -320,13 +337,7 @@ def select_workers_with_joined_relationship():
       Подходит для one to one(o2o(один к одному)) и many to one(m2o(многие к одному))
     """
     with sync_session_factory() as session: # Создаем сессию для взаимодействия с базой данных.
-        query = (
-            select(WorkerOrm) # Создаем запрос на выборку всех работников из таблицы 'workers'.
-            .options(joinedload(WorkerOrm.resumes)) # Указываем SQLAlchemy, что отношение 'resumes' должно быть загружено
-                                                   # "жадно" (eagerly) с использованием `JOIN`.
-        )
-
-        res = session.execute(query) # Выполняем запрос. SQLAlchemy уже загрузил связанные резюме.
+        res = session.execute(_workers_joined_resumes_query()) # Выполняем запрос. SQLAlchemy уже загрузил связанные резюме.
         result = res.unique().scalars().all() # Извлекаем уникальные объекты WorkerOrm из результата запроса.
                                              # `.unique()` используется здесь, чтобы избежать дублирования объектов WorkerOrm
                                              # в случае, если у одного работника несколько резюме (из-за JOIN).
@@ -344,6 +355,17 @@ def select_workers_with_joined_relationship():
 
         print(f"{worker_2_resumes}") # Выводим список объектов ResumesOrm, связанных со вторым работником.
 
+@lru_cache(maxsize=None)
+def _workers_selectin_resumes_query(limit: int | None = None):
+    # `limit` - вариант с LIMIT для Pydantic_DTO_relationship (по одному запросу на значение).
+    return (
+        select(WorkerOrm) # Создаем запрос на выборку всех работников из таблицы 'workers'.
+        .options(selectinload(WorkerOrm.resumes)) # Указываем SQLAlchemy, что отношение 'resumes' должно быть загружено
+                                                 # "жадно" (eagerly) с использованием `SELECT IN`.
+        .limit(limit)
+    )
+
+
 def select_workers_with_selectin_relationship():
     """
     Эта функция демонстрирует жадную (eager) загрузку связанных данных с помощью selectinload.
@@ -373,13 +395,7 @@ def select_workers_with_selectin_relationship():
     Подходит для one to many(o2m(один ко многим)) и many to many(m2m(многие ко многим))
     """
     with sync_session_factory() as session: # Создаем сессию для взаимодействия с базой данных.
-        query = (
-            select(WorkerOrm) # Создаем запрос на выборку всех работников из таблицы 'workers'.
-            .options(selectinload(WorkerOrm.resumes)) # Указываем SQLAlchemy, что отношение 'resumes' должно быть загружено
-                                                     # "жадно" (eagerly) с использованием `SELECT IN`.
-        )
-
-        res = session.execute(query) # Выполняем запрос на выборку работников.
+        res = session.execute(_workers_selectin_resumes_query()) # Выполняем запрос на выборку работников.
         result = res.unique().scalars().all() # Извлекаем уникальные объекты WorkerOrm из результата запроса.
 
         # На данный момент связанные резюме (отношение 'resumes') для всех работников
@@ -406,54 +422,7 @@ async def join_cte_subquery_window_func(like_language: str = "Python"):
 
     # Используем асинхронный контекстный менеджер для создания асинхронной сессии.
     async with async_session_factory() as session:
-        # Создаем псевдонимы (временные другие имена) для наших таблиц "ResumesOrm" и "WorkerOrm".
-        # Это полезно, когда мы соединяем таблицу саму с собой или когда имена таблиц длинные.
-        r = aliased(ResumesOrm)
-        w = aliased(WorkerOrm)
-
-        # Создаем подзапрос с именем "helper1".
-        # Этот подзапрос выбирает данные из таблиц "ResumesOrm" (через псевдоним 'r') и "WorkerOrm" (через псевдоним 'w').
-        subq = (
-            select(
-                r,  # Выбираем все столбцы из таблицы "ResumesOrm" (под псевдонимом 'r').
-                w,  # Выбираем все столбцы из таблицы "WorkerOrm" (под псевдонимом 'w').
-                w.id.label("worler_id"), # Явно присваиваем псевдоним "worler_id" столбцу 'id' из таблицы 'WorkerOrm'.
-                # Используем оконную функцию AVG для вычисления средней компенсации.
-                # OVER (PARTITION BY r.workload) означает, что средняя компенсация вычисляется
-                # отдельно для каждого уникального значения в столбце "workload" таблицы "ResumesOrm".
-                func.avg(r.compensation)
-                .over(partition_by=r.workload)
-                .cast(Integer)  # Приводим результат средней компенсации к целому числу.
-                .label("avg_workload_compensation"),  # Даем этому вычисленному столбцу имя "avg_workload_compensation".
-            )
-            # Соединяем таблицы "ResumesOrm" ('r') и "WorkerOrm" ('w') по условию,
-            # что столбец "worker_id" в "ResumesOrm" равен столбцу "id" в "WorkerOrm".
-            .join(r, r.worker_id == w.id)
-            .subquery("helper1")  # Превращаем этот запрос в подзапрос и даем ему имя "helper1".
-        )
-
-        # Создаем CTE (Common Table Expression) с именем "helper2".
-        # CTE - это временный именованный результирующий набор, который можно использовать
-        # в одном запросе SELECT, INSERT, UPDATE или DELETE.
-        cte = (
-            select(
-                subq.c.worler_id,  # Выбираем столбец "worler_id" (псевдоним 'id' из 'WorkerOrm') из подзапроса "helper1" (доступ через атрибут 'c').
-                subq.c.username,  # Выбираем столбец "username" из подзапроса "helper1".
-                subq.c.compensation,  # Выбираем столбец "compensation" из подзапроса "helper1".
-                subq.c.workload,  # Выбираем столбец "workload" из подзапроса "helper1".
-                subq.c.avg_workload_compensation,  # Выбираем вычисленный столбец "avg_workload_compensation" из подзапроса "helper1".
-                # Вычисляем разницу между фактической компенсацией и средней компенсацией для данного уровня загрузки.
-                (subq.c.compensation - subq.c.avg_workload_compensation)
-                .label("compensation_diff")  # Даем этому вычисленному столбцу имя "compensation_diff".
-            )
-            .cte("helper2")  # Определяем этот SELECT как CTE с именем "helper2".
-        )
-
-        # Создаем основной запрос, который выбирает данные из нашего CTE "helper2".
-        query = (
-            select(cte)  # Выбираем все столбцы из CTE "helper2".
-            .order_by(cte.c.compensation_diff.desc())  # Сортируем результаты по столбцу "compensation_diff" в убывающем порядке (от большего к меньшему).
-        )
+        query = compensation_diff_query() # CTE, подзапрос и оконная функция - см. queries/statements.py.
         res = await session.execute(query) # Асинхронно выполняем SQL-запрос, созданный с помощью SQLAlchemy, и получаем асинхронный объект Result.
         result = res.all() # Асинхронно извлекаем все строки из асинхронного объекта Result. Каждая строка представляет собой кортеж со значениями выбранных столбцов.
         print(result) # Выводим список полученных кортежей.
@@ -466,10 +435,7 @@ async def join_cte_subquery_window_func(like_language: str = "Python"):
 
 def Pydantic_DTO_only_select():
     with sync_session_factory() as session:
-        query = (
-            select(WorkerOrm)
-        )
-        res = session.execute(query)
+        res = session.execute(_workers_query())
         result_orm = res.scalars().all()
         print(f"{result_orm=}")
         result_dto = [WorkersDTO.model_validate(row, from_attributes=True) for row in result_orm]
@@ -477,12 +443,7 @@ def Pydantic_DTO_only_select():
 
 def Pydantic_DTO_relationship():
      with sync_session_factory() as session:
-        query = (
-            select(WorkerOrm)
-            .options(selectinload(WorkerOrm.resumes))
-            .limit(2)
-        )
-        res = session.execute(query)
+        res = session.execute(_workers_selectin_resumes_query(2))
         result_orm = res.scalars().all()
         print(f"{result_orm=}")
         result_dto = [WorkersRelDTO.model_validate(row, from_attributes=True) for row in result_orm]
@@ -491,58 +452,35 @@ def Pydantic_DTO_relationship():
 
 def Pydantic_DTO_join():
       with sync_session_factory() as session: # Создаем контекстный менеджер для синхронной сессии.
-        query = (
-            select(
-                ResumesOrm.workload, # Получаем столбец 'workload' (тип занятости: fulltime/parttime).
-                cast(func.avg(ResumesOrm.compensation), Integer).label("avg_compensation"), # Вычисляем среднюю компенсацию и приводим к целому числу, даем псевдоним 'avg_compensation'.
-            )
-            .filter(
-                and_(
-                    ResumesOrm.title.contains("Python"), # Фильтруем резюме, где в заголовке встречается указанный язык (like_language). Оператор 'contains' эквивалентен SQL LIKE %value%.
-                    ResumesOrm.compensation > 40000 # Дополнительно фильтруем резюме с компенсацией больше 40000.
-                ) # 'and_' используется для объединения нескольких условий фильтрации с логическим "И".
-            ) # 'filter' применяет условия отбора к запросу.
-            .group_by(ResumesOrm.workload) # Группируем результаты по столбцу 'workload', чтобы вычислить среднюю зарплату для каждой группы (fulltime и parttime).
-            .having(cast(func.avg(ResumesOrm.compensation), Integer) > 70000) # Применяем фильтр к сгруппированным результатам. Оставляем только те группы, где средняя зарплата больше 70000.
-        )
-        print(query.compile(compile_kwargs={"literal_binds": True})) # Печатаем скомпилированный SQL-запрос с подставленными значениями для лучшего понимания.
-        res = session.execute(query) # Выполняем SQL-запрос и получаем результат.
+        # Тот же запрос, что в select_resumes_avg_compensation(), для языка "Python".
+        res = session.execute(*avg_compensation_query_params("Python", None))
         result_orm = res.all() # Извлекаем все строки результата. Каждая строка будет содержать 'workload' и 'avg_compensation'.
         print(f"{result_orm=}")
         result_dto = [WorkloadAvgCompensationDTO.model_validate(row, from_attributes=True) for row in result_orm]
         print(f"{result_dto=}")
         return result_dto
-      
+
 def add_vacansies_and_replice():
     """
     Эта функция демонстрирует создание новой вакансии и связывание её с
     существующими резюме через отношение "многие ко многим".
     Она имитирует ситуацию, когда резюме "откликаются" на вакансию.
+
+    Раньше каждое резюме загружалось через `session.get`, а вакансия добавлялась в его коллекцию
+    `vacancies_replied` (ещё один SELECT на резюме). Теперь отклики пишутся через `add_replies_in_session`
+    из queries/replies.py одним INSERT ... ON CONFLICT DO NOTHING без загрузки ORM-объектов,
+    поэтому так же можно связать вакансию и с тысячами резюме.
+    Вакансия и отклики сохраняются одним commit: при ошибке не остаётся вакансии без откликов.
     """
     with sync_session_factory() as session: # Открываем синхронную сессию для взаимодействия с БД.
         # Создаем новый объект вакансии.
         new_vacany = VacanciesOrm(title="Python Developer", compensation=100000)
-
-        # Получаем существующие резюме по их ID.
-        # Это необходимо, чтобы установить связь с уже имеющимися объектами в БД.
-        resume_1 = session.get(ResumesOrm, 1) # Получаем резюме с ID = 1.
-        resume_2 = session.get(ResumesOrm, 2) # Получаем резюме с ID = 2.
-
-        # Если резюме были найдены, добавляем новую вакансию в их коллекцию 'vacancies_replied'.
-        # SQLAlchemy автоматически управляет связыванием через промежуточную таблицу для отношения "многие ко многим".
-        if resume_1: # Проверяем, что резюме с ID 1 существует.
-            resume_1.vacancies_replied.append(new_vacany) # Добавляем новую вакансию к резюме 1.
-        else:
-            print("Резюме с ID 1 не найдено.")
-
-        if resume_2: # Проверяем, что резюме с ID 2 существует.
-            resume_2.vacancies_replied.append(new_vacany) # Добавляем новую вакансию к резюме 2.
-        else:
-            print("Резюме с ID 2 не найдено.")
-
-        session.commit() # Фиксируем изменения в базе данных.
-                         # Это сохранит новую вакансию и обновит связи "многие ко многим".
-        print("Новая вакансия добавлена и связана с резюме.")
+        session.add(new_vacany)
+        session.flush() # id вакансии нужен для откликов.
+        # Связываем вакансию с резюме 1 и 2. Несуществующие резюме просто пропускаются.
+        replied = add_replies_in_session(session, [new_vacany.id], [1, 2])
+        session.commit()
+    print(f"Новая вакансия добавлена и связана с {replied} резюме.")
 
 
 def select_resumes_with_all_relationships():
@@ -550,32 +488,18 @@ def select_resumes_with_all_relationships():
     Эта функция демонстрирует продвинутую жадную загрузку связанных данных
     для объекта 'ResumesOrm', включая:
     - `joinedload` для отношения "многие к одному" (Many-to-One) с 'WorkerOrm'.
-    - `selectinload` для отношения "многие ко многим" (Many-to-Many) с 'VacanciesOrm',
-      с использованием `load_only` для частичной загрузки столбцов из 'VacanciesOrm'.
+    - `selectinload` для отношения "многие ко многим" (Many-to-Many) с 'VacanciesOrm'.
+
+    Запрос общий с асинхронным вариантом - `_resumes_with_all_relationships_query` из
+    queries/repository.py. `load_only(VacanciesOrm.title)` в нём нет: недозагруженные поля
+    вакансии подгружались бы ленивыми запросами по одному на объект, а в AsyncSession они запрещены.
 
     Подходит для ситуаций, когда вам нужны все связанные данные сразу,
     и вы хотите оптимизировать количество SQL-запросов.
     """
     with sync_session_factory() as session: # Открываем синхронную сессию для взаимодействия с БД.
-        query = (
-            select(ResumesOrm) # Создаем запрос на выборку всех резюме.
-            # 1. Жадная загрузка Worker (отношение Many-to-One):
-            # `joinedload(ResumesOrm.worker)` выполнит JOIN с таблицей 'workers'
-            # в основном SQL-запросе, чтобы загрузить данные работника вместе с резюме.
-            # Это позволяет избежать "N+1" проблемы для 'worker', так как данные уже есть.
-            .options(joinedload(ResumesOrm.worker))
-
-            # 2. Жадная загрузка связанных Vacancies (отношение Many-to-Many) с частичной загрузкой:
-            # `selectinload(ResumesOrm.vacancies_replied)` выполнит второй SQL-запрос
-            # (после основного запроса на резюме) с использованием оператора `IN` для
-            # загрузки всех связанных вакансий.
-            # `.load_only(VacanciesOrm.title)` - это важная оптимизация:
-            # она указывает SQLAlchemy загружать ТОЛЬКО столбец 'title' из таблицы 'vacancies'
-            # для связанных объектов 'VacanciesOrm'. Это уменьшает объем данных,
-            # передаваемых по сети, если вам не нужны все столбцы вакансии.
-            .options(selectinload(ResumesOrm.vacancies_replied).load_only(VacanciesOrm.title))
-        )
-        res = session.execute(query) # Выполняем SQL-запрос(ы).
+        # JOIN с работником и selectinload вакансий - см. _resumes_with_all_relationships_query.
+        res = session.execute(_resumes_with_all_relationships_query()) # Выполняем SQL-запрос(ы).
         # `unique()` используется, чтобы избежать дублирования объектов ResumesOrm,
         # если JOIN с VacanciesOrm приводит к повторениям (например, если у резюме много откликов).
         # `scalars().all()` извлекает все уникальные объекты ResumesOrm.
@@ -589,3 +513,120 @@ def select_resumes_with_all_relationships():
         print(f"{result_dto}") # Выводим список DTO.
 
         return result_dto # Возвращаем список DTO для дальнейшего использования.
+
+
+# Асинхронные варианты функций модуля (asyncpg) для обработчиков FastAPI и прочего асинхронного кода.
+# Они выполняют те же заранее построенные запросы, что и синхронные функции выше, и возвращают
+# результат вместо печати. Как и в queries/repository.py, сессию (и транзакцию) открывает вызывающий
+# код: функции, которые пишут, не делают commit. Ленивая загрузка отношений в AsyncSession
+# недоступна (неявный запрос при обращении к атрибуту приводит к MissingGreenlet).
+# Код, который пока может работать только с синхронными функциями, вызывает их через
+# queries/offload.py, чтобы не блокировать event loop.
+async def create_table_orm_async():
+    """Асинхронный вариант `create_table_orm`: DDL Base.metadata выполняется через run_sync."""
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def insert_table_orm_async(session: AsyncSession) -> list[WorkerOrm]:
+    """
+    Асинхронный вариант `insert_table_orm`. Вместо промежуточного commit работники
+    записываются через flush (id нужны резюме). Транзакцией управляет вызывающий код: нужен `session.commit()`.
+    """
+    workers = _demo_workers()
+    session.add_all(workers)
+    await session.flush()
+    session.add_all(_demo_resumes(workers))
+    await session.flush()
+    return workers
+
+
+async def select_workers_orm_async(session: AsyncSession) -> list[WorkerOrm]:
+    """Асинхронный вариант `select_workers_orm`."""
+    return (await session.execute(_workers_query())).scalars().all()
+
+
+async def select_resumes_avg_compensation_async(
+    session: AsyncSession, like_language: str = "Python", created_since: datetime | None = None
+) -> list:
+    """Асинхронный вариант `select_resumes_avg_compensation`: строки (workload, avg_compensation)."""
+    return (await session.execute(*avg_compensation_query_params(like_language, created_since))).all()
+
+
+async def select_workers_with_lazy_relationship_async(session: AsyncSession) -> list[WorkerOrm]:
+    """
+    Асинхронный вариант `select_workers_with_lazy_relationship`. Обращение к `resumes` первых
+    двух работников выполняется внутри `session.run_sync`, где ленивые запросы разрешены:
+    по-прежнему отдельный SELECT на каждого работника (N+1), но без блокировки event loop.
+    """
+    workers = (await session.execute(_workers_query())).scalars().all()
+    await session.run_sync(lambda _: [worker.resumes for worker in workers[:2]])
+    return workers
+
+
+async def select_workers_with_condition_relationship_async(session: AsyncSession) -> list[WorkerOrm]:
+    """Асинхронный вариант `select_workers_with_condition_relationship` (selectinload resumes_parttime)."""
+    return (await session.execute(_workers_resumes_parttime_query())).scalars().all()
+
+
+async def select_workers_with_condition_relationship_containseager_async(session: AsyncSession) -> list[WorkerOrm]:
+    """Асинхронный вариант `select_workers_with_condition_relationship_containseager`."""
+    return (await session.execute(_workers_parttime_contains_eager_query())).unique().scalars().all()
+
+
+async def select_workers_with_condition_relationship_containseager_limit_async(session: AsyncSession) -> list[WorkerOrm]:
+    """Асинхронный вариант `select_workers_with_condition_relationship_containseager_limit`."""
+    return (await session.execute(_workers_top_resumes_query())).unique().scalars().all()
+
+
+async def select_workers_with_joined_relationship_async(session: AsyncSession) -> list[WorkerOrm]:
+    """Асинхронный вариант `select_workers_with_joined_relationship`."""
+    return (await session.execute(_workers_joined_resumes_query())).unique().scalars().all()
+
+
+async def select_workers_with_selectin_relationship_async(session: AsyncSession) -> list[WorkerOrm]:
+    """Асинхронный вариант `select_workers_with_selectin_relationship`."""
+    return (await session.execute(_workers_selectin_resumes_query())).scalars().all()
+
+
+async def join_cte_subquery_window_func_async(session: AsyncSession) -> list:
+    """Вариант `join_cte_subquery_window_func` в сессии вызывающего кода, возвращающий строки."""
+    return (await session.execute(compensation_diff_query())).all()
+
+
+async def Pydantic_DTO_only_select_async(session: AsyncSession) -> list[WorkersDTO]:
+    """Асинхронный вариант `Pydantic_DTO_only_select`."""
+    result_orm = await select_workers_orm_async(session)
+    return [WorkersDTO.model_validate(row, from_attributes=True) for row in result_orm]
+
+
+async def Pydantic_DTO_relationship_async(session: AsyncSession) -> list[WorkersRelDTO]:
+    """Асинхронный вариант `Pydantic_DTO_relationship`: резюме уже загружены selectinload."""
+    result_orm = (await session.execute(_workers_selectin_resumes_query(2))).scalars().all()
+    return [WorkersRelDTO.model_validate(row, from_attributes=True) for row in result_orm]
+
+
+async def Pydantic_DTO_join_async(session: AsyncSession) -> list[WorkloadAvgCompensationDTO]:
+    """Асинхронный вариант `Pydantic_DTO_join`."""
+    result_orm = await select_resumes_avg_compensation_async(session, "Python")
+    return [WorkloadAvgCompensationDTO.model_validate(row, from_attributes=True) for row in result_orm]
+
+
+async def add_vacansies_and_replice_async(session: AsyncSession) -> int:
+    """
+    Асинхронный вариант `add_vacansies_and_replice`: вакансия и отклики резюме 1 и 2 на неё.
+    Возвращает число новых откликов. Транзакцией управляет вызывающий код: нужен `session.commit()`.
+    """
+    new_vacany = VacanciesOrm(title="Python Developer", compensation=100000)
+    session.add(new_vacany)
+    await session.flush() # id вакансии нужен для откликов.
+    return await add_replies_async(session, [new_vacany.id], [1, 2])
+
+
+async def select_resumes_with_all_relationships_async(session: AsyncSession) -> list[ResumesRelVacanciesReokiedDTO]:
+    """
+    Асинхронный вариант `select_resumes_with_all_relationships` - это `get_resumes_with_all_relationships`
+    из queries/repository.py, тот же запрос `_resumes_with_all_relationships_query`.
+    """
+    return await get_resumes_with_all_relationships(session)
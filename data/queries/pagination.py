@@ -0,0 +1,35 @@
+import base64
+import binascii
+import json
+
+# Курсоры для keyset-пагинации.
+# Клиент получает непрозрачную строку и передаёт её обратно, чтобы получить следующую страницу.
+# Внутри лежит id последней отданной записи: следующая страница - это `WHERE id > :last_id ORDER BY id LIMIT n`,
+# поэтому стоимость страницы не зависит от того, как далеко клиент пролистал (в отличие от OFFSET).
+
+
+# id - столбец integer (SERIAL), больший курсор упал бы в драйвере при подстановке параметра.
+MAX_ID = 2**31 - 1
+
+
+class InvalidCursorError(ValueError):
+    """Курсор повреждён или сформирован не этим API."""
+
+
+def encode_cursor(last_id: int) -> str:
+    """Упаковывает id последней записи страницы в url-safe base64 строку."""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Обратная операция к `encode_cursor`. Бросает `InvalidCursorError` на любой мусор."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError(f"Некорректный курсор: {cursor!r}") from e
+    # bool - подкласс int: {"id": true} тоже не курсор этого API.
+    if not isinstance(last_id, int) or isinstance(last_id, bool) or not 0 <= last_id <= MAX_ID:
+        raise InvalidCursorError(f"Некорректный курсор: {cursor!r}")
+    return last_id
@@ -0,0 +1,144 @@
+import re
+from datetime import date
+from sqlalchemy import Connection, String, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from cache import result_cache
+from database import get_sync_engine
+from matching import resume_index
+from snapshot import resume_snapshot
+from models import Workload, resumes_partition_by
+from queries.aggregates import rebuild_workload_stats
+
+# Обслуживание секций таблицы 'resumes' (RESUMES_PARTITION_BY, см. models.py).
+# Имена секций:
+# - по занятости: resumes_fulltime, resumes_parttime;
+# - по месяцам: <родитель>_y2026m10 (created_at в [2026-10-01, 2026-11-01)) и <родитель>_default
+#   для строк вне созданных месяцев; родитель - resumes или секция по занятости.
+# Секции на будущие месяцы нужно создавать заранее (create_partitions по расписанию): строки,
+# попавшие в default, при создании секции их месяца приходится переносить вручную.
+# Запросы с условием на workload или created_at (страницы с фильтром по занятости, выборки
+# за период) читают только подходящие секции - PostgreSQL отбрасывает остальные при планировании.
+
+_month_suffix = re.compile(r"_y(\d{4})m(\d{2})$")
+
+_partitions_query = text("""
+    SELECT parent.relname AS parent, child.relname AS child
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = ANY(:parents)
+    ORDER BY child.relname
+""").bindparams(bindparam("parents", type_=ARRAY(String)))
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _range_parents(partition_by: tuple[str, ...] | None = None) -> list[str]:
+    """Таблицы, которые делятся по месяцам created_at: сама resumes или её секции по занятости."""
+    if partition_by is None:
+        partition_by = resumes_partition_by()
+    if "created_at" not in partition_by:
+        return []
+    if "workload" in partition_by:
+        return [f"resumes_{workload.value}" for workload in Workload]
+    return ["resumes"]
+
+
+def partitions_ddl(start: date, months: int, partition_by: tuple[str, ...] | None = None) -> list[str]:
+    """
+    CREATE TABLE IF NOT EXISTS ... PARTITION OF для секций занятости и `months` месяцев начиная со `start`.
+    `partition_by` - столбцы секционирования, по умолчанию из настройки (resumes_partition_by()).
+    """
+    statements = []
+    if partition_by is None:
+        partition_by = resumes_partition_by()
+    if partition_by[:1] == ("workload",):
+        subpartition = " PARTITION BY RANGE (created_at)" if "created_at" in partition_by else ""
+        for workload in Workload:
+            statements.append(
+                f"CREATE TABLE IF NOT EXISTS resumes_{workload.value} PARTITION OF resumes "
+                f"FOR VALUES IN ('{workload.value}'){subpartition}"
+            )
+    first_month = start.replace(day=1)
+    for parent in _range_parents(partition_by):
+        statements.append(f"CREATE TABLE IF NOT EXISTS {parent}_default PARTITION OF {parent} DEFAULT")
+        for i in range(months):
+            lower = _add_months(first_month, i)
+            upper = _add_months(lower, 1)
+            statements.append(
+                f"CREATE TABLE IF NOT EXISTS {parent}_y{lower.year}m{lower.month:02d} PARTITION OF {parent} "
+                f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            )
+    return statements
+
+
+def create_partitions(
+    connection: Connection | None = None,
+    start: date | None = None,
+    months_ahead: int = 3,
+    partition_by: tuple[str, ...] | None = None,
+) -> int:
+    """
+    Создаёт недостающие секции: по занятости и помесячные с месяца `start` (по умолчанию текущего)
+    по текущий месяц + `months_ahead` включительно. Уже существующие секции не трогает.
+    `partition_by` - как в partitions_ddl. Возвращает число выполненных CREATE TABLE IF NOT EXISTS.
+    """
+    today = date.today()
+    start = start or today
+    months = (today.year - start.year) * 12 + today.month - start.month + months_ahead + 1
+    statements = partitions_ddl(start, max(months, 1), partition_by)
+    if connection is None:
+        with get_sync_engine().begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+    else:
+        for statement in statements:
+            connection.execute(text(statement))
+    return len(statements)
+
+
+def list_partitions() -> list[tuple[str, str]]:
+    """Пары (родитель, секция) для resumes и её секций по занятости."""
+    parents = ["resumes", *(f"resumes_{workload.value}" for workload in Workload)]
+    with get_sync_engine().connect() as conn:
+        return [tuple(row) for row in conn.execute(_partitions_query, {"parents": parents})]
+
+
+def detach_partitions(before: date, drop: bool = False) -> list[str]:
+    """
+    Отсоединяет помесячные секции, целиком лежащие раньше `before`, и возвращает их имена.
+    Отсоединённая секция остаётся обычной таблицей (архив, VACUUM/pg_dump отдельно от resumes),
+    `drop=True` удаляет её вместе с откликами на эти резюме.
+    Каждая секция отсоединяется в своей короткой транзакции: DETACH берёт эксклюзивную блокировку
+    родителя (DETACH ... CONCURRENTLY несовместим с секцией default).
+    Триггеры на отсоединение не срабатывают, поэтому после него агрегаты workload_compensation_stats
+    пересчитываются целиком, а кэш ответов сбрасывается.
+    """
+    parents = _range_parents()
+    if not parents:
+        return []
+    detached = []
+    with get_sync_engine().connect() as conn:
+        partitions = conn.execute(_partitions_query, {"parents": parents}).all()
+        conn.commit()
+        for parent, child in partitions:
+            match = _month_suffix.search(child)
+            if match is None or _add_months(date(int(match[1]), int(match[2]), 1), 1) > before:
+                continue
+            with conn.begin():
+                if drop:
+                    # Внешнего ключа на секционированную resumes нет - удаляем отклики сами.
+                    conn.execute(text(f"DELETE FROM vacancies_replice r USING {child} c WHERE r.resume_id = c.id"))
+                conn.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {child}"))
+                if drop:
+                    conn.execute(text(f"DROP TABLE {child}"))
+            detached.append(child)
+    if detached:
+        rebuild_workload_stats()
+        result_cache.invalidate(("resumes", "workers", "vacancies_replice"))
+        resume_index.invalidate() # Удалённые строки не видны по updated_at - индекс подбора загрузится заново.
+        resume_snapshot.invalidate() # И снимок для аналитики.
+    return detached
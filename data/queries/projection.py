@@ -0,0 +1,110 @@
+from collections import defaultdict
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import sync_session_factory
+from models import WorkerOrm, ResumesOrm, VacanciesOrm, VacanciesReplioceOrm
+from schemas import WorkersRelRow, ResumesRelVacanciesReokiedRow
+
+# Режим "проекции": быстрый путь сериализации без ORM-объектов.
+# Вместо select(ResumesOrm) + model_validate(row, from_attributes=True) выбираются только столбцы,
+# которые нужны DTO, как обычные Core-строки; вложенные worker/vacancies_replied собираются
+# группировкой в dict, а готовый список сразу превращается в JSON-байты через TypeAdapter.
+# Нет identity map, отслеживания изменений и повторной валидации - JSON тот же, что у DTO.
+
+_resumes_rel_adapter = TypeAdapter(list[ResumesRelVacanciesReokiedRow])
+_workers_rel_adapter = TypeAdapter(list[WorkersRelRow])
+
+_resume_columns = (
+    ResumesOrm.title,
+    ResumesOrm.compensation,
+    ResumesOrm.workload,
+    ResumesOrm.worker_id,
+    ResumesOrm.id,
+    ResumesOrm.created_at,
+    ResumesOrm.updated_at,
+)
+
+_resumes_with_worker_query = (
+    select(*_resume_columns, WorkerOrm.username)
+    .join(WorkerOrm, ResumesOrm.worker_id == WorkerOrm.id)
+    .order_by(ResumesOrm.id)
+)
+
+_replied_vacancies_query = (
+    select(VacanciesReplioceOrm.resume_id, VacanciesOrm.title, VacanciesOrm.compensation, VacanciesOrm.id)
+    .join(VacanciesOrm, VacanciesReplioceOrm.vacancy_id == VacanciesOrm.id)
+    .order_by(VacanciesReplioceOrm.resume_id, VacanciesOrm.id)
+)
+
+_workers_query = select(WorkerOrm.username, WorkerOrm.id).order_by(WorkerOrm.id)
+
+_resumes_query = select(*_resume_columns).order_by(ResumesOrm.worker_id, ResumesOrm.id)
+
+
+def _assemble_resumes(resume_rows, vacancy_rows) -> list[dict]:
+    vacancies = defaultdict(list)
+    for resume_id, title, compensation, vacancy_id in vacancy_rows:
+        vacancies[resume_id].append({"title": title, "compensation": compensation, "id": vacancy_id})
+    return [
+        {
+            "title": title,
+            "compensation": compensation,
+            "workload": workload,
+            "worker_id": worker_id,
+            "id": resume_id,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "worker": {"username": username, "id": worker_id},
+            "vacancies_replied": vacancies.get(resume_id, []),
+        }
+        for title, compensation, workload, worker_id, resume_id, created_at, updated_at, username in resume_rows
+    ]
+
+
+def _assemble_workers(worker_rows, resume_rows) -> list[dict]:
+    resumes = defaultdict(list)
+    for title, compensation, workload, worker_id, resume_id, created_at, updated_at in resume_rows:
+        resumes[worker_id].append({
+            "title": title,
+            "compensation": compensation,
+            "workload": workload,
+            "worker_id": worker_id,
+            "id": resume_id,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        })
+    return [
+        {"username": username, "id": worker_id, "resumes": resumes.get(worker_id, [])}
+        for username, worker_id in worker_rows
+    ]
+
+
+def select_resumes_projection_json() -> bytes:
+    """То же, что `select_resumes_with_all_relationships()`, но сразу JSON-байтами и без ORM."""
+    with sync_session_factory() as session:
+        resume_rows = session.execute(_resumes_with_worker_query).all()
+        vacancy_rows = session.execute(_replied_vacancies_query).all()
+    return _resumes_rel_adapter.dump_json(_assemble_resumes(resume_rows, vacancy_rows))
+
+
+def select_workers_projection_json() -> bytes:
+    """Работники с резюме (как WorkersRelDTO) JSON-байтами без ORM."""
+    with sync_session_factory() as session:
+        worker_rows = session.execute(_workers_query).all()
+        resume_rows = session.execute(_resumes_query).all()
+    return _workers_rel_adapter.dump_json(_assemble_workers(worker_rows, resume_rows))
+
+
+async def get_resumes_projection_json(session: AsyncSession) -> bytes:
+    """Асинхронный вариант `select_resumes_projection_json`."""
+    resume_rows = (await session.execute(_resumes_with_worker_query)).all()
+    vacancy_rows = (await session.execute(_replied_vacancies_query)).all()
+    return _resumes_rel_adapter.dump_json(_assemble_resumes(resume_rows, vacancy_rows))
+
+
+async def get_workers_projection_json(session: AsyncSession) -> bytes:
+    """Асинхронный вариант `select_workers_projection_json`."""
+    worker_rows = (await session.execute(_workers_query)).all()
+    resume_rows = (await session.execute(_resumes_query)).all()
+    return _workers_rel_adapter.dump_json(_assemble_workers(worker_rows, resume_rows))
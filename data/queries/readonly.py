@@ -0,0 +1,56 @@
+from collections import namedtuple
+from functools import cache
+from typing import Any, AsyncIterator
+from sqlalchemy import inspect, select, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database import Base
+
+# Режим "только чтение": строки моделей как неизменяемые именованные кортежи вместо ORM-объектов.
+# Тип записи строится по модели из models.py (WorkerOrm -> WorkerRecord с полями-столбцами в порядке
+# маппера, без отложенных столбцов вроде ResumesOrm.title_tsv). Запрос выбирает только эти столбцы,
+# поэтому у записи нет InstanceState, identity map и отслеживания изменений, а память на строку -
+# кортеж значений (см. benchmarks/bench_readonly.py). Записи подходят для
+# DTO.model_validate(record, from_attributes=True) так же, как ORM-объекты; отношений у них нет.
+# Типы и запросы строятся при первом вызове: inspect() настраивает мапперы.
+
+
+@cache
+def record_type(model: type[Base]) -> type[tuple]:
+    """Тип записи модели: namedtuple с неотложенными столбцами маппера."""
+    keys = [prop.key for prop in inspect(model).column_attrs if not prop.deferred]
+    return namedtuple(model.__name__.removesuffix("Orm") + "Record", keys)
+
+
+@cache
+def select_records(model: type[Base]) -> Select:
+    """SELECT столбцов записи модели (дальше к нему добавляются filter/order_by/limit)."""
+    return select(*(getattr(model, key) for key in record_type(model)._fields))
+
+
+def _to_records(model: type[Base], rows) -> list[tuple]:
+    make = record_type(model)._make
+    return [make(row) for row in rows]
+
+
+def get_records(session: Session, model: type[Base], query: Select, params: dict[str, Any] | None = None) -> list[tuple]:
+    """Записи модели по запросу, построенному от `select_records(model)`."""
+    return _to_records(model, session.execute(query, params).tuples())
+
+
+async def get_records_async(session: AsyncSession, model: type[Base], query: Select, params: dict[str, Any] | None = None) -> list[tuple]:
+    """Асинхронный вариант `get_records`."""
+    return _to_records(model, (await session.execute(query, params)).tuples())
+
+
+async def stream_records_async(
+    session: AsyncSession,
+    model: type[Base],
+    query: Select,
+    params: dict[str, Any] | None = None,
+    batch_size: int = 10_000,
+) -> AsyncIterator[list[tuple]]:
+    """Записи модели пачками по `batch_size` серверным курсором: в памяти только текущая пачка."""
+    result = await session.stream(query.execution_options(yield_per=batch_size), params)
+    async for partition in result.tuples().partitions():
+        yield _to_records(model, partition)
@@ -0,0 +1,154 @@
+from itertools import islice
+from typing import Iterable, Iterator
+from sqlalchemy import select, delete, bindparam, any_, true, Integer, String
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database import sync_session_factory
+from models import ResumesOrm, VacanciesOrm, VacanciesReplioceOrm
+
+# Массовые отклики резюме на вакансии (связь "многие ко многим" через vacancies_replice).
+# В add_vacansies_and_replice() каждое резюме читалось отдельным session.get, а затем
+# догружалась его коллекция vacancies_replied - два SELECT на резюме. Здесь пары
+# (резюме, вакансия) пишутся одним INSERT ... SELECT на пачку id, без ORM-объектов:
+# id передаются массивами (= ANY(:ids)), поэтому число параметров не растёт с размером пачки.
+# - несуществующие резюме и вакансии отбрасываются соединением с их таблицами, а не ошибкой FK;
+# - уже существующие отклики пропускаются через ON CONFLICT DO NOTHING (cover_letter не меняется).
+# Core-операторы не попадают в session.new/dirty, поэтому таблица vacancies_replice
+# отмечается для инвалидации кэша вручную - кэш сбросится при commit сессии (см. cache.py).
+
+REPLY_TABLES = ("vacancies_replice", "resumes", "vacancies") # Теги кэша, которые затрагивают отклики.
+
+_resume_ids = bindparam("resume_ids", type_=ARRAY(Integer))
+_vacancy_ids = bindparam("vacancy_ids", type_=ARRAY(Integer))
+
+_add_replies_query = (
+    pg_insert(VacanciesReplioceOrm)
+    .from_select(
+        ["resume_id", "vacancy_id", "cover_letter"],
+        select(ResumesOrm.id, VacanciesOrm.id, bindparam("cover_letter", type_=String))
+        .join(VacanciesOrm, true()) # Декартово произведение выбранных резюме и вакансий.
+        .filter(ResumesOrm.id == any_(_resume_ids), VacanciesOrm.id == any_(_vacancy_ids)),
+    )
+    .on_conflict_do_nothing(index_elements=["resume_id", "vacancy_id"])
+)
+
+# synchronize_session=False: объекты откликов в сессию не загружаются, синхронизировать нечего.
+_remove_replies_query = (
+    delete(VacanciesReplioceOrm)
+    .filter(VacanciesReplioceOrm.vacancy_id == any_(_vacancy_ids), VacanciesReplioceOrm.resume_id == any_(_resume_ids))
+    .execution_options(synchronize_session=False)
+)
+
+_remove_all_replies_query = (
+    delete(VacanciesReplioceOrm)
+    .filter(VacanciesReplioceOrm.vacancy_id == any_(_vacancy_ids))
+    .execution_options(synchronize_session=False)
+)
+
+
+def _batched_ids(ids: Iterable[int], size: int) -> Iterator[list[int]]:
+    it = iter(dict.fromkeys(ids)) # Без повторов, порядок сохраняется.
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def _mark_dirty(session: Session | AsyncSession):
+    session.info.setdefault("cache_dirty_tables", set()).update(REPLY_TABLES)
+
+
+def _add_replies_params(vacancy_ids, resume_ids, cover_letter, batch_size) -> Iterator[dict]:
+    vacancy_ids = list(dict.fromkeys(vacancy_ids))
+    for batch in _batched_ids(resume_ids, batch_size):
+        yield {"resume_ids": batch, "vacancy_ids": vacancy_ids, "cover_letter": cover_letter}
+
+
+def _remove_replies_params(vacancy_ids, resume_ids, batch_size) -> Iterator[tuple]:
+    vacancy_ids = list(dict.fromkeys(vacancy_ids))
+    if resume_ids is None:
+        yield _remove_all_replies_query, {"vacancy_ids": vacancy_ids}
+        return
+    for batch in _batched_ids(resume_ids, batch_size):
+        yield _remove_replies_query, {"resume_ids": batch, "vacancy_ids": vacancy_ids}
+
+
+def add_replies(
+    vacancy_ids: Iterable[int],
+    resume_ids: Iterable[int],
+    cover_letter: str | None = None,
+    batch_size: int = 10_000,
+) -> int:
+    """
+    Добавляет отклики каждого резюме из `resume_ids` на каждую вакансию из `vacancy_ids`
+    с общим `cover_letter` в одной транзакции, пачками по `batch_size` резюме.
+    Возвращает число новых откликов (существующие и с несуществующими id не считаются).
+    """
+    with sync_session_factory() as session:
+        inserted = add_replies_in_session(session, vacancy_ids, resume_ids, cover_letter, batch_size)
+        session.commit()
+    return inserted
+
+
+def add_replies_in_session(
+    session: Session,
+    vacancy_ids: Iterable[int],
+    resume_ids: Iterable[int],
+    cover_letter: str | None = None,
+    batch_size: int = 10_000,
+) -> int:
+    """
+    `add_replies` в транзакции переданной сессии - вместе с другими изменениями в ней.
+    Транзакцией управляет вызывающий код: нужен `session.commit()`.
+    """
+    inserted = 0
+    for params in _add_replies_params(vacancy_ids, resume_ids, cover_letter, batch_size):
+        inserted += session.execute(_add_replies_query, params).rowcount
+    _mark_dirty(session)
+    return inserted
+
+
+def remove_replies(
+    vacancy_ids: Iterable[int],
+    resume_ids: Iterable[int] | None = None,
+    batch_size: int = 10_000,
+) -> int:
+    """
+    Удаляет отклики резюме из `resume_ids` на вакансии из `vacancy_ids`;
+    `resume_ids=None` - все отклики на эти вакансии. Возвращает число удалённых откликов.
+    """
+    deleted = 0
+    with sync_session_factory() as session:
+        for query, params in _remove_replies_params(vacancy_ids, resume_ids, batch_size):
+            deleted += session.execute(query, params).rowcount
+        _mark_dirty(session)
+        session.commit()
+    return deleted
+
+
+async def add_replies_async(
+    session: AsyncSession,
+    vacancy_ids: Iterable[int],
+    resume_ids: Iterable[int],
+    cover_letter: str | None = None,
+    batch_size: int = 10_000,
+) -> int:
+    """Асинхронный вариант `add_replies`. Транзакцией управляет вызывающий код: нужен `session.commit()`."""
+    inserted = 0
+    for params in _add_replies_params(vacancy_ids, resume_ids, cover_letter, batch_size):
+        inserted += (await session.execute(_add_replies_query, params)).rowcount
+    _mark_dirty(session)
+    return inserted
+
+
+async def remove_replies_async(
+    session: AsyncSession,
+    vacancy_ids: Iterable[int],
+    resume_ids: Iterable[int] | None = None,
+    batch_size: int = 10_000,
+) -> int:
+    """Асинхронный вариант `remove_replies`. Транзакцией управляет вызывающий код: нужен `session.commit()`."""
+    deleted = 0
+    for query, params in _remove_replies_params(vacancy_ids, resume_ids, batch_size):
+        deleted += (await session.execute(query, params)).rowcount
+    _mark_dirty(session)
+    return deleted
@@ -0,0 +1,196 @@
+from functools import lru_cache
+from sqlalchemy import select, and_, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator
+from sqlalchemy.orm import joinedload, selectinload
+from models import WorkerOrm, ResumesOrm, Workload
+from schemas import WorkersRelDTO, ResumesRelVacanciesReokiedDTO, WorkersPageDTO, ResumesPageDTO
+from queries.pagination import encode_cursor, decode_cursor
+from database import async_session_factory
+
+# Асинхронный слой доступа к данным для FastAPI.
+# Функции не создают сессию сами, а принимают её аргументом: сессию открывает
+# зависимость `get_async_session` (см. database.py), по одной на каждый HTTP-запрос.
+# Весь ввод-вывод идёт через asyncpg, поэтому обработчики не блокируют event loop.
+# Запросы строятся один раз (на уровне модуля или один раз на набор фильтров через lru_cache)
+# с bindparam вместо значений: вызов только передаёт параметры, а SQLAlchemy сразу находит
+# скомпилированный SQL в кэше движка, не создавая select() и не вычисляя его ключ кэша заново.
+# lambda_stmt для ORM-запросов оказался медленнее (см. benchmarks/bench_statements.py).
+
+
+async def get_workers_with_resumes(session: AsyncSession, limit: int | None = None) -> list[WorkersRelDTO]:
+    """
+    Асинхронный аналог `Pydantic_DTO_relationship()`: работники вместе с резюме.
+    Резюме подгружаются через `selectinload` (один дополнительный запрос с IN),
+    ленивая загрузка в асинхронной сессии недоступна.
+    """
+    query = (
+        select(WorkerOrm)
+        .options(selectinload(WorkerOrm.resumes))
+        .order_by(WorkerOrm.id)
+        .limit(limit)
+    )
+    res = await session.execute(query)
+    result_orm = res.scalars().all()
+    return [WorkersRelDTO.model_validate(row, from_attributes=True) for row in result_orm]
+
+
+# Строится при первом вызове, а не при импорте: опции загрузки отношений запускают
+# configure_mappers(), который должен оставаться ленивым (см. database.warm_up).
+@lru_cache(maxsize=None)
+def _resumes_with_all_relationships_query():
+    return (
+        select(ResumesOrm)
+        .options(joinedload(ResumesOrm.worker)) # Many-to-One: работник приходит в том же JOIN.
+        .options(selectinload(ResumesOrm.vacancies_replied)) # Many-to-Many: отдельный запрос с IN.
+        .order_by(ResumesOrm.id)
+    )
+
+
+async def get_resumes_with_all_relationships(session: AsyncSession) -> list[ResumesRelVacanciesReokiedDTO]:
+    """
+    Асинхронный аналог `select_resumes_with_all_relationships()`, с тем же запросом.
+    `load_only(VacanciesOrm.title)` в нём нет: DTO нужны все поля вакансии, и недозагруженный
+    столбец вызвал бы ленивый запрос на каждый объект, что в асинхронной сессии запрещено.
+    """
+    res = await session.execute(_resumes_with_all_relationships_query())
+    result_orm = res.unique().scalars().all()
+    return [ResumesRelVacanciesReokiedDTO.model_validate(row, from_attributes=True) for row in result_orm]
+
+
+def _resume_filters(workload: Workload | None, min_compensation: int | None, max_compensation: int | None) -> list:
+    """Собирает необязательные условия по резюме в список для `.filter(*conditions)`."""
+    conditions = []
+    if workload is not None:
+        conditions.append(ResumesOrm.workload == workload)
+    if min_compensation is not None:
+        conditions.append(ResumesOrm.compensation >= min_compensation)
+    if max_compensation is not None:
+        conditions.append(ResumesOrm.compensation <= max_compensation)
+    return conditions
+
+
+def _resume_filter_params(workload: Workload | None, min_compensation: int | None, max_compensation: int | None) -> dict:
+    """Заданные фильтры как параметры запроса; по ключам видно, какие условия нужны в запросе."""
+    params = {"workload": workload, "min_compensation": min_compensation, "max_compensation": max_compensation}
+    return {key: value for key, value in params.items() if value is not None}
+
+
+def _resume_bind_filters(keys: frozenset) -> list:
+    """Те же условия, что в `_resume_filters`, но с bindparam вместо значений."""
+    conditions = []
+    if "workload" in keys:
+        conditions.append(ResumesOrm.workload == bindparam("workload"))
+    if "min_compensation" in keys:
+        conditions.append(ResumesOrm.compensation >= bindparam("min_compensation"))
+    if "max_compensation" in keys:
+        conditions.append(ResumesOrm.compensation <= bindparam("max_compensation"))
+    return conditions
+
+
+@lru_cache(maxsize=None) # Не больше 16 вариантов: курсор и три фильтра.
+def _workers_page_query(keys: frozenset):
+    query = (
+        select(WorkerOrm)
+        .options(selectinload(WorkerOrm.resumes))
+        .order_by(WorkerOrm.id)
+        .limit(bindparam("fetch"))
+    )
+    if "after_id" in keys:
+        query = query.filter(WorkerOrm.id > bindparam("after_id")) # Seek по первичному ключу вместо OFFSET.
+    conditions = _resume_bind_filters(keys)
+    if conditions:
+        query = query.filter(WorkerOrm.resumes.any(and_(*conditions)))
+    return query
+
+
+@lru_cache(maxsize=None)
+def _resumes_page_query(keys: frozenset):
+    query = (
+        select(ResumesOrm)
+        .options(joinedload(ResumesOrm.worker))
+        .options(selectinload(ResumesOrm.vacancies_replied))
+        .filter(*_resume_bind_filters(keys))
+        .order_by(ResumesOrm.id)
+        .limit(bindparam("fetch"))
+    )
+    if "after_id" in keys:
+        query = query.filter(ResumesOrm.id > bindparam("after_id"))
+    return query
+
+
+def _page_params(cursor: str | None, limit: int, workload, min_compensation, max_compensation) -> dict:
+    # Выбирается `limit + 1` строка: лишняя строка только сообщает, что есть следующая страница.
+    params = {"fetch": limit + 1, **_resume_filter_params(workload, min_compensation, max_compensation)}
+    if cursor is not None:
+        params["after_id"] = decode_cursor(cursor)
+    return params
+
+
+async def get_workers_page(
+    session: AsyncSession,
+    cursor: str | None = None,
+    limit: int = 50,
+    workload: Workload | None = None,
+    min_compensation: int | None = None,
+    max_compensation: int | None = None,
+) -> WorkersPageDTO:
+    """
+    Страница работников (с резюме) после курсора, отсортированная по `WorkerOrm.id`.
+    Фильтры по резюме оставляют работников, у которых есть хотя бы одно подходящее резюме (EXISTS).
+    """
+    params = _page_params(cursor, limit, workload, min_compensation, max_compensation)
+    res = await session.execute(_workers_page_query(frozenset(params)), params)
+    rows = res.scalars().all()
+    items = [WorkersRelDTO.model_validate(row, from_attributes=True) for row in rows[:limit]]
+    next_cursor = encode_cursor(items[-1].id) if len(rows) > limit else None
+    return WorkersPageDTO(items=items, next_cursor=next_cursor)
+
+
+async def get_resumes_page(
+    session: AsyncSession,
+    cursor: str | None = None,
+    limit: int = 50,
+    workload: Workload | None = None,
+    min_compensation: int | None = None,
+    max_compensation: int | None = None,
+) -> ResumesPageDTO:
+    """
+    Страница резюме (с работником и вакансиями) после курсора, отсортированная по `ResumesOrm.id`.
+    Фильтр по `workload` обслуживается индексом `resumes_workload_id_index` (workload, id).
+    """
+    params = _page_params(cursor, limit, workload, min_compensation, max_compensation)
+    res = await session.execute(_resumes_page_query(frozenset(params)), params)
+    rows = res.unique().scalars().all()
+    items = [ResumesRelVacanciesReokiedDTO.model_validate(row, from_attributes=True) for row in rows[:limit]]
+    next_cursor = encode_cursor(items[-1].id) if len(rows) > limit else None
+    return ResumesPageDTO(items=items, next_cursor=next_cursor)
+
+
+async def stream_resumes_ndjson(workload: Workload | None = None, batch_size: int = 1000) -> AsyncIterator[bytes]:
+    """
+    Выгрузка всех резюме в формате NDJSON (одна JSON-строка на резюме) с ограниченным расходом памяти.
+
+    `AsyncSession.stream()` с `yield_per` читает результат серверным курсором пачками по `batch_size`,
+    а `selectinload` догружает работников и вакансии одним запросом с IN на каждую пачку.
+    Первая пачка уходит клиенту сразу, не дожидаясь конца выборки. Identity map хранит объекты
+    по слабым ссылкам, поэтому обработанные пачки освобождаются сборщиком мусора.
+    Сессия открывается внутри генератора: зависимость `get_async_session` закрылась бы
+    раньше, чем StreamingResponse дочитает поток.
+    """
+    query = (
+        select(ResumesOrm)
+        .options(selectinload(ResumesOrm.worker))
+        .options(selectinload(ResumesOrm.vacancies_replied))
+        .filter(*_resume_filters(workload, None, None))
+        .order_by(ResumesOrm.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async with async_session_factory() as session:
+        result = await session.stream(query)
+        async for partition in result.scalars().partitions():
+            chunk = b"".join(
+                ResumesRelVacanciesReokiedDTO.model_validate(row, from_attributes=True).model_dump_json().encode() + b"\n"
+                for row in partition
+            )
+            yield chunk
@@ -0,0 +1,72 @@
+from sqlalchemy import select, func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import sync_session_factory
+from models import ResumesOrm, Workload
+from schemas import ResumesDTO, ResumeSearchDTO
+from queries.readonly import record_type, select_records
+
+# Поиск резюме по заголовку через индексы вместо `title.contains(...)` (LIKE '%...%' по всей таблице).
+# - Полнотекстовый режим: `title_tsv @@ websearch_to_tsquery('simple', q)` по GIN-индексу
+#   resumes_title_tsv_index, ранжирование через ts_rank. Понимает синтаксис "python -java", "a or b".
+# - Триграммный режим (trigram=True): ILIKE '%q%' по GIN-индексу pg_trgm resumes_title_trgm_index,
+#   ранжирование по similarity(). Находит подстроки внутри слов, например "Pyth".
+# Резюме читаются записями только для чтения (queries/readonly.py), а не ORM-объектами.
+
+
+def _search_query(query: str, workload: Workload | None, min_compensation: int | None, trigram: bool, limit: int):
+    if trigram:
+        rank = func.similarity(ResumesOrm.title, query)
+        condition = ResumesOrm.title.icontains(query, autoescape=True) # % и _ в запросе экранируются.
+    else:
+        tsquery = func.websearch_to_tsquery("simple", query)
+        rank = func.ts_rank(ResumesOrm.title_tsv, tsquery)
+        condition = ResumesOrm.title_tsv.op("@@")(tsquery)
+    stmt = (
+        select_records(ResumesOrm)
+        .add_columns(rank.label("rank"))
+        .filter(condition)
+        .order_by(desc("rank"), ResumesOrm.id)
+        .limit(limit)
+    )
+    if workload is not None:
+        stmt = stmt.filter(ResumesOrm.workload == workload)
+    if min_compensation is not None:
+        stmt = stmt.filter(ResumesOrm.compensation >= min_compensation)
+    return stmt
+
+
+def _to_dto(rows) -> list[ResumeSearchDTO]:
+    make = record_type(ResumesOrm)._make
+    return [
+        ResumeSearchDTO(**ResumesDTO.model_validate(make(row[:-1]), from_attributes=True).model_dump(), rank=row.rank)
+        for row in rows
+    ]
+
+
+def search_resumes(
+    query: str,
+    workload: Workload | None = None,
+    min_compensation: int | None = None,
+    trigram: bool = False,
+    limit: int = 50,
+) -> list[ResumeSearchDTO]:
+    """
+    Ищет резюме по заголовку и возвращает их по убыванию релевантности.
+    `workload` и `min_compensation` - необязательные дополнительные фильтры.
+    """
+    with sync_session_factory() as session:
+        res = session.execute(_search_query(query, workload, min_compensation, trigram, limit))
+        return _to_dto(res.all())
+
+
+async def search_resumes_async(
+    session: AsyncSession,
+    query: str,
+    workload: Workload | None = None,
+    min_compensation: int | None = None,
+    trigram: bool = False,
+    limit: int = 50,
+) -> list[ResumeSearchDTO]:
+    """Асинхронный вариант `search_resumes` для FastAPI."""
+    res = await session.execute(_search_query(query, workload, min_compensation, trigram, limit))
+    return _to_dto(res.all())
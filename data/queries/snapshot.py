@@ -0,0 +1,117 @@
+import asyncio
+from sqlalchemy import select, bindparam, any_, or_, DateTime, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from cdc import ChangeEvent, ChangeOp
+from database import get_async_engine
+from enums import Workload
+from models import ResumesOrm, WorkerOrm
+from schemas import CompensationStatsDTO
+from snapshot import resume_snapshot
+from queries.watermark import WatermarkRefresher, event_ids
+
+# Загрузка колоночного снимка резюме (snapshot.py) и аналитика по нему.
+# Снимок загружается целиком при первом обращении, раз в SNAPSHOT_RELOAD_SECONDS и после
+# resume_snapshot.invalidate(), а между ними не чаще раза в SNAPSHOT_REFRESH_SECONDS догружает
+# резюме по updated_at (queries/watermark.py, как индекс подбора в queries/matching.py).
+# Удаления резюме и смена имени работника не меняют updated_at резюме - они попадают в снимок
+# при полной загрузке. Аналитика не ходит в БД, кроме этих загрузок.
+# При включённом потоке изменений (cdc.py) apply_snapshot_changes применяет изменения резюме
+# (включая удаления) и имён работников сразу, не дожидаясь полной загрузки.
+
+_snapshot_columns = (
+    ResumesOrm.id, ResumesOrm.worker_id, ResumesOrm.title, ResumesOrm.compensation, ResumesOrm.workload,
+    WorkerOrm.username, ResumesOrm.updated_at,
+)
+_all_resumes_query = (
+    select(*_snapshot_columns)
+    .join(WorkerOrm, WorkerOrm.id == ResumesOrm.worker_id)
+    .order_by(ResumesOrm.id) # Снимок хранит строки по возрастанию id.
+    .execution_options(yield_per=10_000)
+)
+_changed_resumes_query = (
+    select(*_snapshot_columns)
+    .join(WorkerOrm, WorkerOrm.id == ResumesOrm.worker_id)
+    .filter(ResumesOrm.updated_at >= bindparam("since", type_=DateTime))
+)
+# Строки снимка для резюме из событий и для всех резюме работников, чьё имя могло измениться.
+_changed_by_ids_query = (
+    select(*_snapshot_columns)
+    .join(WorkerOrm, WorkerOrm.id == ResumesOrm.worker_id)
+    .filter(or_(
+        ResumesOrm.id == any_(bindparam("resume_ids", type_=ARRAY(Integer))),
+        ResumesOrm.worker_id == any_(bindparam("worker_ids", type_=ARRAY(Integer))),
+    ))
+)
+
+_refresher = WatermarkRefresher(
+    resume_snapshot, _all_resumes_query, _changed_resumes_query, resume_snapshot.upsert,
+    refresh_setting="SNAPSHOT_REFRESH_SECONDS", reload_setting="SNAPSHOT_RELOAD_SECONDS",
+)
+
+
+async def load_resume_snapshot(session: AsyncSession) -> int:
+    """Загружает снимок заново по всем резюме. Возвращает их число."""
+    return await _refresher.load(session)
+
+
+async def refresh_resume_snapshot(session: AsyncSession) -> int:
+    """Догружает в снимок резюме, изменённые с прошлой загрузки. Возвращает число прочитанных строк."""
+    return await _refresher.refresh(session)
+
+
+async def ensure_fresh_snapshot(session: AsyncSession) -> None:
+    """Загружает или догружает снимок, если он устарел (см. настройки SNAPSHOT_*)."""
+    await _refresher.ensure_fresh(session)
+
+
+async def _reread_snapshot_rows(events: list[ChangeEvent]) -> None:
+    resume_ids = event_ids(events, "resumes")
+    # Удаление работника удаляет и резюме - их события придут отдельно.
+    worker_ids = event_ids((event for event in events if event.op is ChangeOp.update), "workers")
+    if not resume_ids and not worker_ids:
+        return
+    async with get_async_engine().connect() as conn:
+        rows = (await conn.execute(_changed_by_ids_query, {"resume_ids": resume_ids, "worker_ids": worker_ids})).all()
+    resume_snapshot.upsert([row[:-1] for row in rows])
+    resume_snapshot.remove(set(resume_ids).difference(row.id for row in rows))
+
+
+async def apply_snapshot_changes(events: list[ChangeEvent]) -> None:
+    """
+    Подписчик change_feed на таблицы resumes и workers: затронутые резюме (и все резюме изменённых
+    работников) перечитываются с основного сервера - найденные обновляются в снимке, остальные
+    резюме из событий помечаются удалёнными. truncate и reset помечают снимок устаревшим.
+    """
+    await _refresher.apply_changes(events, _reread_snapshot_rows)
+
+
+async def get_compensation_stats(
+    session: AsyncSession,
+    workload: Workload | None = None,
+    bins: int = 10,
+    limit: int = 10,
+) -> CompensationStatsDTO:
+    """
+    Статистика компенсации по снимку: средняя по занятости, перцентили и гистограмма
+    (по всем резюме или по занятости `workload`) и `limit` резюме с наибольшим превышением
+    средней своей занятости (как join_cte_subquery_window_func).
+    """
+    await ensure_fresh_snapshot(session)
+    # Расчёты по миллиону строк - десятки миллисекунд CPU с NumPy и до секунды без него (snapshot.py), поэтому не в event loop.
+    avg_compensation, percentiles, (histogram_counts, histogram_edges), top_compensation_diff = await asyncio.to_thread(
+        lambda: (
+            resume_snapshot.avg_compensation_by_workload(),
+            resume_snapshot.compensation_percentiles(workload=workload),
+            resume_snapshot.compensation_histogram(bins, workload),
+            resume_snapshot.compensation_diff(limit),
+        )
+    )
+    return CompensationStatsDTO(
+        resumes=len(resume_snapshot),
+        avg_compensation=avg_compensation,
+        percentiles=percentiles,
+        histogram_counts=histogram_counts,
+        histogram_edges=histogram_edges,
+        top_compensation_diff=top_compensation_diff,
+    )
@@ -0,0 +1,100 @@
+from datetime import datetime
+from functools import lru_cache
+from sqlalchemy import select, func, cast, bindparam, Integer, String, and_
+from sqlalchemy.orm import aliased
+from models import WorkerOrm, ResumesOrm
+
+# Запросы, общие для демонстрационных функций queries/orm.py и обработчиков API (queries/dashboard.py).
+# Они здесь, а не в queries/orm.py, чтобы приложение не импортировало демонстрационный модуль при старте.
+
+# Запрос на выборку средней зарплаты из таблицы 'resumes' с фильтрацией и группировкой
+# (select_resumes_avg_compensation, Pydantic_DTO_join и их асинхронные варианты в queries/orm.py, дашборд).
+# Горячий запрос средней компенсации строится один раз при импорте модуля.
+# Значения фильтров - именованные bindparam, поэтому при каждом вызове не создаётся новый select(),
+# а скомпилированный SQL берётся из кэша движка (query_cache_size) по ключу этого же объекта.
+avg_compensation_by_language_query = (
+    select(
+        ResumesOrm.workload, # Получаем столбец 'workload' (тип занятости: fulltime/parttime).
+        cast(func.avg(ResumesOrm.compensation), Integer).label("avg_compensation"), # Вычисляем среднюю компенсацию и приводим к целому числу, даем псевдоним 'avg_compensation'.
+    )
+    .filter(
+        and_(
+            ResumesOrm.title.contains(bindparam("like_language", type_=String)), # Фильтруем резюме, где в заголовке встречается указанный язык (like_language). Оператор 'contains' эквивалентен SQL LIKE %value%.
+            ResumesOrm.compensation > bindparam("min_compensation") # Дополнительно фильтруем резюме с компенсацией больше min_compensation.
+        ) # 'and_' используется для объединения нескольких условий фильтрации с логическим "И".
+    ) # 'filter' применяет условия отбора к запросу.
+    .group_by(ResumesOrm.workload) # Группируем результаты по столбцу 'workload', чтобы вычислить среднюю зарплату для каждой группы (fulltime и parttime).
+    .having(cast(func.avg(ResumesOrm.compensation), Integer) > bindparam("min_avg_compensation")) # Оставляем только те группы, где средняя зарплата больше min_avg_compensation.
+)
+
+# Тот же запрос за период: при секционировании resumes по created_at (RESUMES_PARTITION_BY)
+# PostgreSQL читает только секции нужных месяцев.
+avg_compensation_by_language_since_query = avg_compensation_by_language_query.filter(
+    ResumesOrm.created_at >= bindparam("created_since")
+)
+
+
+def avg_compensation_query_params(like_language: str, created_since: datetime | None) -> tuple:
+    """Запрос средней компенсации и значения его параметров (с фильтром по created_at или без)."""
+    params = {"like_language": like_language, "min_compensation": 40000, "min_avg_compensation": 70000}
+    if created_since is None:
+        return avg_compensation_by_language_query, params
+    return avg_compensation_by_language_since_query, {**params, "created_since": created_since}
+
+
+# Запрос строится один раз при первом вызове (а не при импорте: aliased() настраивает мапперы)
+# и переиспользуется join_cte_subquery_window_func (queries/orm.py) и дашбордом (queries/dashboard.py).
+# `limited=True` - вариант с LIMIT :limit для первых строк по убыванию разницы.
+@lru_cache(maxsize=None)
+def compensation_diff_query(limited: bool = False):
+    # Создаем псевдонимы (временные другие имена) для наших таблиц "ResumesOrm" и "WorkerOrm".
+    # Это полезно, когда мы соединяем таблицу саму с собой или когда имена таблиц длинные.
+    r = aliased(ResumesOrm)
+    w = aliased(WorkerOrm)
+
+    # Создаем подзапрос с именем "helper1".
+    # Этот подзапрос выбирает данные из таблиц "ResumesOrm" (через псевдоним 'r') и "WorkerOrm" (через псевдоним 'w').
+    subq = (
+        select(
+            r,  # Выбираем все столбцы из таблицы "ResumesOrm" (под псевдонимом 'r').
+            w,  # Выбираем все столбцы из таблицы "WorkerOrm" (под псевдонимом 'w').
+            w.id.label("worler_id"), # Явно присваиваем псевдоним "worler_id" столбцу 'id' из таблицы 'WorkerOrm'.
+            # Используем оконную функцию AVG для вычисления средней компенсации.
+            # OVER (PARTITION BY r.workload) означает, что средняя компенсация вычисляется
+            # отдельно для каждого уникального значения в столбце "workload" таблицы "ResumesOrm".
+            func.avg(r.compensation)
+            .over(partition_by=r.workload)
+            .cast(Integer)  # Приводим результат средней компенсации к целому числу.
+            .label("avg_workload_compensation"),  # Даем этому вычисленному столбцу имя "avg_workload_compensation".
+        )
+        # Соединяем таблицы "ResumesOrm" ('r') и "WorkerOrm" ('w') по условию,
+        # что столбец "worker_id" в "ResumesOrm" равен столбцу "id" в "WorkerOrm".
+        .join(r, r.worker_id == w.id)
+        .subquery("helper1")  # Превращаем этот запрос в подзапрос и даем ему имя "helper1".
+    )
+
+    # Создаем CTE (Common Table Expression) с именем "helper2".
+    # CTE - это временный именованный результирующий набор, который можно использовать
+    # в одном запросе SELECT, INSERT, UPDATE или DELETE.
+    cte = (
+        select(
+            subq.c.worler_id,  # Выбираем столбец "worler_id" (псевдоним 'id' из 'WorkerOrm') из подзапроса "helper1" (доступ через атрибут 'c').
+            subq.c.username,  # Выбираем столбец "username" из подзапроса "helper1".
+            subq.c.compensation,  # Выбираем столбец "compensation" из подзапроса "helper1".
+            subq.c.workload,  # Выбираем столбец "workload" из подзапроса "helper1".
+            subq.c.avg_workload_compensation,  # Выбираем вычисленный столбец "avg_workload_compensation" из подзапроса "helper1".
+            # Вычисляем разницу между фактической компенсацией и средней компенсацией для данного уровня загрузки.
+            (subq.c.compensation - subq.c.avg_workload_compensation)
+            .label("compensation_diff")  # Даем этому вычисленному столбцу имя "compensation_diff".
+        )
+        .cte("helper2")  # Определяем этот SELECT как CTE с именем "helper2".
+    )
+
+    # Создаем основной запрос, который выбирает данные из нашего CTE "helper2".
+    query = (
+        select(cte)  # Выбираем все столбцы из CTE "helper2".
+        .order_by(cte.c.compensation_diff.desc())  # Сортируем результаты по столбцу "compensation_diff" в убывающем порядке (от большего к меньшему).
+    )
+    if limited:
+        query = query.limit(bindparam("limit", type_=Integer))
+    return query
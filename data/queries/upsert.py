@@ -0,0 +1,236 @@
+from typing import Iterable, Mapping
+from sqlalchemy import DateTime, Integer, String, any_, bindparam, cast, func, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+from database import get_async_engine, mark_primary_write
+from cache import result_cache
+from models import WorkerOrm, ResumesOrm, Workload, resumes_partition_by
+from queries.bulk import _batched, _compensation
+
+# Синхронизация работников и резюме из внешнего источника (HR-система) на асинхронном движке.
+# Раньше обновить можно было только update_workers_core(): одна строка по id, своё соединение
+# и commit на каждый вызов. Здесь:
+# - upsert_workers/upsert_resumes - INSERT ... ON CONFLICT (id) DO UPDATE пачками:
+#   строки с id вставляются или обновляются, строки без id вставляются с id из последовательности;
+#   пачка уходит одним многострочным INSERT ... VALUES, id возвращаются в порядке входных строк;
+# - update_compensations - массовое изменение компенсаций одним UPDATE ... FROM на пачку.
+# Все пачки одного вызова пишутся в одной транзакции: либо применяется всё, либо ничего.
+# У секционированной resumes (models.resumes_partition_by()) уникального индекса по одному id нет:
+# ON CONFLICT по (id, столбцы секционирования) при смене занятости или без created_at вставил бы
+# второе резюме с тем же id. Тогда строки с id сначала обновляются по id одним UPDATE ... FROM unnest(...)
+# (строку со сменившимся столбцом секционирования PostgreSQL сам переносит в другую секцию, отклики
+# на резюме остаются), вставляются только не найденные, а после записи проверяется уникальность id.
+
+WORKER_COLUMNS = ("username", "lastname", "phone_number")
+RESUME_COLUMNS = ("title", "compensation", "workload", "worker_id")
+
+
+class DuplicateResumeIdError(ValueError):
+    """После upsert в секционированной resumes нашлись резюме с одинаковым id; транзакция откатывается."""
+
+
+def _upsert_query(model, columns: tuple[str, ...], **extra_set):
+    table = model.__table__
+    query = pg_insert(table)
+    return query.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={name: query.excluded[name] for name in columns} | extra_set,
+    ).returning(table.c.id, sort_by_parameter_order=True)
+
+
+_upsert_workers_query = _upsert_query(WorkerOrm, WORKER_COLUMNS)
+# onupdate столбца updated_at при ON CONFLICT DO UPDATE не срабатывает - выставляем явно.
+_upsert_resumes_query = _upsert_query(ResumesOrm, RESUME_COLUMNS, updated_at=func.timezone("utc", func.now()))
+
+# Путь для секционированной resumes: обновление по id, вставка остальных и проверка уникальности.
+_resumes = ResumesOrm.__table__
+_insert_resumes_query = pg_insert(_resumes).returning(_resumes.c.id, sort_by_parameter_order=True)
+_resume_rows = (
+    func.unnest(
+        bindparam("ids", type_=ARRAY(Integer)),
+        bindparam("titles", type_=ARRAY(String)),
+        bindparam("compensations", type_=ARRAY(Integer)),
+        bindparam("workloads", type_=ARRAY(String)),
+        bindparam("worker_ids", type_=ARRAY(Integer)),
+        bindparam("created_ats", type_=ARRAY(DateTime)),
+    )
+    .table_valued("id", "title", "compensation", "workload", "worker_id", "created_at")
+    .render_derived(name="v")
+)
+_update_resumes_by_id_query = (
+    update(_resumes)
+    .where(_resumes.c.id == _resume_rows.c.id)
+    .values(
+        title=_resume_rows.c.title,
+        compensation=_resume_rows.c.compensation,
+        workload=cast(_resume_rows.c.workload, _resumes.c.workload.type),
+        worker_id=_resume_rows.c.worker_id,
+        created_at=func.coalesce(_resume_rows.c.created_at, _resumes.c.created_at), # Не передан - остаётся прежним.
+        updated_at=func.timezone("utc", func.now()),
+    )
+    .returning(_resumes.c.id)
+)
+_duplicate_resume_ids_query = (
+    select(_resumes.c.id)
+    .where(_resumes.c.id == any_(bindparam("ids", type_=ARRAY(Integer))))
+    .group_by(_resumes.c.id)
+    .having(func.count() > 1)
+)
+# Одновременные upsert с одинаковыми новыми id иначе вставили бы их оба: индекс этого не запрещает.
+_lock_resumes_upsert = text("SELECT pg_advisory_xact_lock(hashtext('queries.upsert.resumes'))")
+
+# Пары (id резюме, компенсация) передаются двумя массивами и разворачиваются unnest в таблицу
+# v(id, compensation): SQL и число параметров одинаковы для пачки любого размера.
+_compensations = (
+    func.unnest(bindparam("ids", type_=ARRAY(Integer)), bindparam("compensations", type_=ARRAY(Integer)))
+    .table_valued("id", "compensation")
+    .render_derived(name="v")
+)
+_update_compensations_query = (
+    update(ResumesOrm.__table__)
+    .where(ResumesOrm.__table__.c.id == _compensations.c.id)
+    .values(compensation=_compensations.c.compensation, updated_at=func.timezone("utc", func.now()))
+    .returning(ResumesOrm.__table__.c.id)
+)
+
+
+def _worker_params(row: Mapping) -> dict:
+    params = {"username": row["username"], "lastname": row["lastname"], "phone_number": int(row["phone_number"])}
+    if row.get("id") is not None:
+        params["id"] = int(row["id"])
+    return params
+
+
+def _resume_params(row: Mapping) -> dict:
+    if row.get("workload") in (None, ""):
+        # workload - столбец без значения по умолчанию и, при секционировании, ключ секции.
+        raise ValueError(f"резюме без workload: {dict(row)!r}")
+    params = {
+        "title": row["title"],
+        "compensation": _compensation(row),
+        "workload": Workload(row["workload"]),
+        "worker_id": int(row["worker_id"]),
+    }
+    if row.get("id") is not None:
+        params["id"] = int(row["id"])
+    if row.get("created_at") is not None:
+        params["created_at"] = row["created_at"]
+    return params
+
+
+async def _sync_sequence(conn: AsyncConnection, table: str):
+    # Строки с явным id не сдвигают последовательность: без этого следующая вставка без id
+    # получила бы id, который уже занят.
+    await conn.execute(
+        text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), greatest(max(id), 1)) FROM {table}")
+    )
+
+
+async def _insert_chunk(conn: AsyncConnection, query, chunk: list[dict], chunk_size: int) -> list[int]:
+    """Вставляет (или upsert-ит) пачку строк; id - в порядке строк пачки."""
+    # executemany с INSERT в одну строку не годится: строки с id и без id дают разный SQL.
+    # Группы по набору ключей, внутри группы - один многострочный INSERT на пачку.
+    # Повтор id в одном INSERT ... ON CONFLICT - ошибка PostgreSQL, поэтому из повторов
+    # остаётся последняя строка, а позиции всех повторов получают её id.
+    groups: dict[frozenset, dict] = {}
+    for position, row in enumerate(chunk):
+        group = groups.setdefault(frozenset(row), {})
+        group.setdefault(row.get("id", ("new", position)), []).append(position)
+    chunk_ids = [0] * len(chunk)
+    for group in groups.values():
+        res = await conn.execute(
+            query,
+            [chunk[positions[-1]] for positions in group.values()],
+            execution_options={"insertmanyvalues_page_size": chunk_size},
+        )
+        for positions, row_id in zip(group.values(), res.scalars().all()):
+            for position in positions:
+                chunk_ids[position] = row_id
+    return chunk_ids
+
+
+async def _upsert_partitioned_resumes_chunk(conn: AsyncConnection, chunk: list[dict], chunk_size: int) -> list[int]:
+    """Пачка резюме для секционированной resumes: UPDATE по id, INSERT не найденных, проверка уникальности id."""
+    latest = {row["id"]: row for row in chunk if "id" in row} # Из повторов id побеждает последняя строка.
+    updated = set()
+    if latest:
+        rows = latest.values()
+        params = {
+            "ids": list(latest),
+            "titles": [row["title"] for row in rows],
+            "compensations": [row["compensation"] for row in rows],
+            "workloads": [row["workload"].name for row in rows],
+            "worker_ids": [row["worker_id"] for row in rows],
+            "created_ats": [row.get("created_at") for row in rows],
+        }
+        updated = set((await conn.execute(_update_resumes_by_id_query, params)).scalars())
+    chunk_ids = [row["id"] if row.get("id") in updated else 0 for row in chunk]
+    positions = [position for position, row in enumerate(chunk) if row.get("id") not in updated]
+    if positions:
+        inserted = await _insert_chunk(conn, _insert_resumes_query, [chunk[position] for position in positions], chunk_size)
+        for position, row_id in zip(positions, inserted):
+            chunk_ids[position] = row_id
+    duplicates = (await conn.execute(_duplicate_resume_ids_query, {"ids": list(set(chunk_ids))})).scalars().all()
+    if duplicates:
+        raise DuplicateResumeIdError(f"id резюме повторяются в нескольких секциях: {duplicates[:10]}")
+    return chunk_ids
+
+
+async def _upsert(query, table: str, params: Iterable[dict], chunk_size: int, partitioned: bool = False) -> list[int]:
+    ids: list[int] = []
+    explicit_ids = False
+    async with get_async_engine().begin() as conn:
+        if partitioned:
+            await conn.execute(_lock_resumes_upsert)
+        for chunk in _batched(params, chunk_size):
+            explicit_ids = explicit_ids or any("id" in row for row in chunk)
+            if partitioned:
+                ids.extend(await _upsert_partitioned_resumes_chunk(conn, chunk, chunk_size))
+            else:
+                ids.extend(await _insert_chunk(conn, query, chunk, chunk_size))
+        if explicit_ids:
+            await _sync_sequence(conn, table)
+    # Core-запись не проходит через события Session: кэш и окно "чтения своих записей" обновляем сами.
+    result_cache.invalidate((table,))
+    mark_primary_write()
+    return ids
+
+
+async def upsert_workers(rows: Iterable[Mapping], chunk_size: int = 1_000) -> list[int]:
+    """
+    Вставляет или обновляет работников (поля username, lastname, phone_number и необязательный id)
+    пачками по `chunk_size` строк в одной транзакции. Строка с id существующего работника
+    обновляет его, строка без id создаёт нового. Возвращает id в порядке входных строк.
+    """
+    return await _upsert(_upsert_workers_query, "workers", map(_worker_params, rows), chunk_size)
+
+
+async def upsert_resumes(rows: Iterable[Mapping], chunk_size: int = 1_000) -> list[int]:
+    """
+    `upsert_workers` для резюме: поля title, compensation, workload, worker_id и необязательные
+    id и created_at (не передан - у нового резюме текущее время, у существующего прежнее).
+    Обновлённому резюме выставляется updated_at. Возвращает id в порядке входных строк.
+    ValueError - строка без workload; DuplicateResumeIdError - при секционировании нашлись повторы id.
+    """
+    partitioned = bool(resumes_partition_by())
+    return await _upsert(_upsert_resumes_query, "resumes", map(_resume_params, rows), chunk_size, partitioned)
+
+
+async def update_compensations(
+    compensations: Mapping[int, int | None] | Iterable[tuple[int, int | None]],
+    chunk_size: int = 10_000,
+) -> list[int]:
+    """
+    Меняет компенсацию резюме по парам (id резюме, новая компенсация) - словарём или итерируемым
+    пар - одним UPDATE на пачку из `chunk_size` пар в одной транзакции.
+    Возвращает id обновлённых резюме; несуществующие id пропускаются.
+    """
+    pairs = compensations.items() if isinstance(compensations, Mapping) else compensations
+    updated: list[int] = []
+    async with get_async_engine().begin() as conn:
+        for chunk in _batched(({"id": i, "compensation": c} for i, c in pairs), chunk_size):
+            params = {"ids": [p["id"] for p in chunk], "compensations": [p["compensation"] for p in chunk]}
+            updated.extend((await conn.execute(_update_compensations_query, params)).scalars().all())
+    result_cache.invalidate(("resumes",))
+    mark_primary_write()
+    return updated
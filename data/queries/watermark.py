@@ -0,0 +1,106 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Iterable, Protocol
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from cdc import ChangeEvent, ChangeOp
+from config import settings
+
+# Общая загрузка структур в памяти процесса (индекс подбора queries/matching.py, снимок аналитики
+# queries/snapshot.py) по водяному знаку updated_at. Структура загружается целиком при первом
+# обращении, после invalidate() и, если задана настройка reload_setting, раз в столько секунд,
+# а между загрузками не чаще раза в refresh_setting секунд догружает строки с updated_at не раньше
+# последнего виденного (по индексу resumes_updated_at_index). Окно REFRESH_OVERLAP покрывает
+# транзакции, которые закоммитились позже: updated_at = now() - время начала транзакции, а не коммита.
+# Изменения из потока изменений (cdc.py) применяются под той же блокировкой, что и загрузка.
+
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+class Reloadable(Protocol):
+    loaded: bool
+
+    def load(self, rows: list[tuple]) -> None: ...
+
+    def invalidate(self) -> None: ...
+
+
+class WatermarkRefresher:
+    """
+    Загрузка и догрузка структуры `target` запросами `all_query` (все строки) и `changed_query`
+    (строки с updated_at >= :since). Последний столбец строк обоих запросов - updated_at, в структуру
+    строки передаются без него: целиком - в target.load (в потоке), догруженные - в `upsert`.
+    """
+
+    def __init__(
+        self,
+        target: Reloadable,
+        all_query: Select,
+        changed_query: Select,
+        upsert: Callable[[list[tuple]], None],
+        refresh_setting: str,
+        reload_setting: str | None = None,
+    ):
+        self.target, self._all_query, self._changed_query, self._upsert = target, all_query, changed_query, upsert
+        self._refresh_setting, self._reload_setting = refresh_setting, reload_setting
+        self.watermark: datetime | None = None # Наибольший updated_at, попавший в структуру.
+        self.loaded_at = 0.0 # time.monotonic() последней полной загрузки.
+        self.refreshed_at = 0.0 # time.monotonic() последней загрузки или догрузки.
+        self.lock = asyncio.Lock()
+
+    def _advance(self, updated_at: datetime | None) -> None:
+        if updated_at is not None and (self.watermark is None or updated_at > self.watermark):
+            self.watermark = updated_at
+
+    async def load(self, session: AsyncSession) -> int:
+        """Загружает структуру заново по всем строкам. Возвращает их число."""
+        self.watermark = None
+        rows = []
+        result = await session.stream(self._all_query)
+        async for partition in result.partitions():
+            for *row, updated_at in partition:
+                rows.append(tuple(row))
+                self._advance(updated_at)
+        await asyncio.to_thread(self.target.load, rows) # На миллионе строк - секунды CPU, не в event loop.
+        self.loaded_at = self.refreshed_at = time.monotonic()
+        return len(rows)
+
+    async def refresh(self, session: AsyncSession) -> int:
+        """Догружает строки, изменённые с прошлой загрузки. Возвращает число прочитанных строк."""
+        since = self.watermark - REFRESH_OVERLAP if self.watermark is not None else datetime.min
+        rows = (await session.execute(self._changed_query, {"since": since})).all()
+        self._upsert([tuple(row[:-1]) for row in rows])
+        for row in rows:
+            self._advance(row[-1])
+        self.refreshed_at = time.monotonic()
+        return len(rows)
+
+    async def ensure_fresh(self, session: AsyncSession) -> None:
+        """Загружает или догружает структуру, если она устарела."""
+        async with self.lock: # Одновременные запросы не загружают структуру по нескольку раз.
+            now = time.monotonic()
+            reload_seconds = getattr(settings, self._reload_setting) if self._reload_setting else None
+            if not self.target.loaded or (reload_seconds is not None and now - self.loaded_at >= reload_seconds):
+                await self.load(session)
+            elif now - self.refreshed_at >= getattr(settings, self._refresh_setting):
+                await self.refresh(session)
+
+    async def apply_changes(self, events: list[ChangeEvent], reread: Callable[[list[ChangeEvent]], Awaitable[Any]]) -> None:
+        """
+        Применяет пачку событий change_feed: `reread` перечитывает затронутые строки и обновляет
+        структуру (под блокировкой загрузки). truncate и reset помечают структуру устаревшей,
+        а пока структура не загружена, события не нужны - первая загрузка прочитает всё сама.
+        """
+        if not self.target.loaded:
+            return
+        if any(event.op in (ChangeOp.truncate, ChangeOp.reset) for event in events):
+            self.target.invalidate()
+            return
+        async with self.lock: # Не смешивать с идущей загрузкой.
+            await reread(events)
+
+
+def event_ids(events: Iterable[ChangeEvent], table: str) -> list:
+    """Ключи строк таблицы `table` из событий, без повторов, в порядке событий."""
+    return list(dict.fromkeys(key for event in events if event.table == table for key in event.ids))
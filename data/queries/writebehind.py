@@ -0,0 +1,327 @@
+import asyncio
+import time
+from itertools import islice
+from typing import Any
+from sqlalchemy import Boolean, Integer, String, bindparam, case, func, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from cache import result_cache
+from config import settings
+from database import get_async_engine, mark_primary_write
+from instrumentation import COUNT_BUCKETS, DURATION_BUCKETS, Histogram, Metric, render_metric, render_stats
+from models import ResumesOrm
+
+# Отложенная запись правок резюме (write-behind) для частых изменений заголовка и компенсации.
+# Раньше каждая правка - своя транзакция (как update_workers_core: соединение и commit на вызов).
+# Здесь update() только кладёт правку в очередь в памяти и возвращается:
+# - правки одного резюме, пришедшие до записи, сливаются (побеждает последнее значение каждого поля);
+# - фоновая задача ждёт WRITE_BEHIND_DELAY_SECONDS после первой правки (или полную пачку
+#   WRITE_BEHIND_MAX_BATCH) и пишет накопленное одним UPDATE ... FROM unnest(...) на пачку
+#   в одной транзакции; updated_at выставляет сервер (now()), а не Python;
+# - правки одного резюме пишутся по порядку: следующая пачка - только после коммита предыдущей;
+# - ошибка записи возвращает пачку в начало очереди (с более новыми правками тех же резюме -
+#   побеждают новые значения), и она повторяется с экспоненциальной паузой до _RETRY_MAX_DELAY;
+#   правка задаёт значения полей, поэтому повтор после неясного исхода коммита безопасен;
+# - противодавление: при WRITE_BEHIND_MAX_PENDING резюме в очереди update() новых резюме ждёт записи;
+# - close() (в lifespan приложения) перестаёт принимать правки и дописывает всё накопленное,
+#   повторяя запись не дольше WRITE_BEHIND_CLOSE_TIMEOUT_SECONDS; оставшиеся правки -
+#   WriteBehindUnwrittenError с числом резюме (её же получают ждущие wait=True).
+# Правка теряется, если процесс упал до записи, - для данных, которые нельзя потерять, нужен wait=True.
+# Метрики очереди - stats() и render_prometheus() (добавляются к /metrics).
+
+_table = ResumesOrm.__table__
+
+# Правки пачки передаются массивами одинаковой длины и разворачиваются unnest в таблицу v:
+# SQL один для пачки любого размера. set_* - передано ли поле: компенсацию можно обнулить (NULL),
+# поэтому "не менять" нельзя выразить значением.
+_edits = (
+    func.unnest(
+        bindparam("ids", type_=ARRAY(Integer)),
+        bindparam("titles", type_=ARRAY(String)),
+        bindparam("set_titles", type_=ARRAY(Boolean)),
+        bindparam("compensations", type_=ARRAY(Integer)),
+        bindparam("set_compensations", type_=ARRAY(Boolean)),
+    )
+    .table_valued("id", "title", "set_title", "compensation", "set_compensation")
+    .render_derived(name="v")
+)
+_update_resumes_query = (
+    update(_table)
+    .where(_table.c.id == _edits.c.id)
+    .values(
+        title=case((_edits.c.set_title, _edits.c.title), else_=_table.c.title),
+        compensation=case((_edits.c.set_compensation, _edits.c.compensation), else_=_table.c.compensation),
+        updated_at=func.timezone("utc", func.now()),
+    )
+    .returning(_table.c.id)
+)
+
+_UNSET: Any = object() # Поле не передано в update().
+_TITLE_LENGTH = _table.c.title.type.length
+_RETRY_MIN_DELAY = 0.1
+_RETRY_MAX_DELAY = 10.0
+
+WRITE_BEHIND_METRICS = (
+    Metric("pending", "gauge", "Резюме с правками, ожидающими записи."),
+    Metric("edits", "counter", "Принятые правки резюме."),
+    Metric("coalesced", "counter", "Правки, слитые с ожидающей правкой того же резюме."),
+    Metric("written", "counter", "Резюме, обновлённые отложенной записью."),
+    Metric("missing", "counter", "Правки несуществующих резюме."),
+    Metric("failed", "counter", "Резюме в пачках, запись которых завершилась ошибкой (каждая попытка)."),
+    Metric("retries", "counter", "Пачки, вернувшиеся в очередь после ошибки записи."),
+    Metric("unwritten", "gauge", "Резюме, правки которых не записаны при остановке."),
+    Metric("backpressure_waits", "counter", "Правки, ждавшие места в заполненной очереди."),
+    Metric("backpressure_seconds", "counter", "Суммарное ожидание места в очереди."),
+)
+
+
+class WriteBehindClosedError(RuntimeError):
+    """Очередь закрыта (приложение завершается) и правки больше не принимает."""
+
+
+class WriteBehindUnwrittenError(RuntimeError):
+    """close() не успел записать правки `unwritten` резюме за WRITE_BEHIND_CLOSE_TIMEOUT_SECONDS."""
+
+    def __init__(self, unwritten: int, last_error: str | None):
+        super().__init__(f"не записаны правки {unwritten} резюме, последняя ошибка: {last_error}")
+        self.unwritten = unwritten
+
+
+def _batch_params(batch: dict[int, dict[str, Any]]) -> dict[str, list]:
+    return {
+        "ids": list(batch),
+        "titles": [edit.get("title") for edit in batch.values()],
+        "set_titles": ["title" in edit for edit in batch.values()],
+        "compensations": [edit.get("compensation") for edit in batch.values()],
+        "set_compensations": ["compensation" in edit for edit in batch.values()],
+    }
+
+
+class ResumeWriteBehind:
+    """
+    Очередь правок резюме с отложенной пакетной записью. Работает в одном event loop;
+    фоновая задача запускается при первой правке. Параметры по умолчанию - настройки WRITE_BEHIND_*.
+    """
+
+    def __init__(
+        self,
+        delay: float | None = None,
+        max_batch: int | None = None,
+        max_pending: int | None = None,
+        close_timeout: float | None = None,
+    ):
+        self._delay, self._max_batch, self._max_pending = delay, max_batch, max_pending
+        self._close_timeout = close_timeout
+        self._pending: dict[int, dict[str, Any]] = {} # id резюме -> {поле: значение}
+        self._waiters: dict[int, list[asyncio.Future]] = {} # Ждут записи своей правки (wait=True).
+        self._task: asyncio.Task | None = None
+        self._closed = False
+        # Метрики.
+        self.edits = 0 # Принятые правки.
+        self.coalesced = 0 # Правки, слитые с уже ожидающей правкой того же резюме.
+        self.written = 0 # Записанные резюме.
+        self.missing = 0 # Правки несуществующих резюме (UPDATE их не нашёл).
+        self.failed = 0 # Резюме в пачках, запись которых завершилась ошибкой (каждая попытка).
+        self.retries = 0 # Пачки, вернувшиеся в очередь после ошибки.
+        self.unwritten = 0 # Резюме, правки которых close() не успел записать.
+        self.last_error: str | None = None
+        self.backpressure_waits = 0
+        self.backpressure_seconds = 0.0
+        self.flush_durations = Histogram(DURATION_BUCKETS)
+        self.batch_sizes = Histogram(COUNT_BUCKETS)
+
+    def _start(self) -> None:
+        if self._task is None:
+            self._delay = settings.WRITE_BEHIND_DELAY_SECONDS if self._delay is None else self._delay
+            self._max_batch = settings.WRITE_BEHIND_MAX_BATCH if self._max_batch is None else self._max_batch
+            self._max_pending = settings.WRITE_BEHIND_MAX_PENDING if self._max_pending is None else self._max_pending
+            self._has_edits = asyncio.Event()
+            self._batch_full = asyncio.Event()
+            self._space = asyncio.Condition()
+            self._task = asyncio.create_task(self._run())
+
+    async def update(self, resume_id: int, *, title: str = _UNSET, compensation: int | None = _UNSET, wait: bool = False) -> bool | None:
+        """
+        Ставит в очередь правку заголовка и/или компенсации резюме `resume_id`.
+        Без `wait` возвращает None сразу (или после ожидания места в очереди); с `wait=True` -
+        после записи правки в БД: True - резюме обновлено, False - резюме нет.
+        ValueError - недопустимое значение (проверяется здесь, чтобы одна правка не сорвала всю пачку).
+        """
+        edit = {}
+        if title is not _UNSET:
+            if title is None or len(title) > _TITLE_LENGTH:
+                raise ValueError(f"title: ожидается строка не длиннее {_TITLE_LENGTH} символов")
+            edit["title"] = title
+        if compensation is not _UNSET:
+            if compensation is not None and compensation <= 0:
+                raise ValueError("compensation: ожидается положительное число или None")
+            edit["compensation"] = compensation
+        if not edit:
+            raise ValueError("нужно передать title и/или compensation")
+        if self._closed:
+            raise WriteBehindClosedError("очередь записи резюме закрыта")
+        self._start()
+        if resume_id not in self._pending and len(self._pending) >= self._max_pending:
+            self.backpressure_waits += 1
+            started = time.perf_counter()
+            async with self._space:
+                await self._space.wait_for(lambda: len(self._pending) < self._max_pending or self._closed)
+            self.backpressure_seconds += time.perf_counter() - started
+            if self._closed:
+                raise WriteBehindClosedError("очередь записи резюме закрыта")
+        self.edits += 1
+        if resume_id in self._pending:
+            self.coalesced += 1
+            self._pending[resume_id].update(edit)
+        else:
+            self._pending[resume_id] = edit
+        self._has_edits.set()
+        if len(self._pending) >= self._max_batch:
+            self._batch_full.set()
+        if not wait:
+            return None
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(resume_id, []).append(waiter)
+        return await waiter
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_edits.wait()
+            if not self._closed:
+                # Окно накопления: правки, пришедшие за это время, уйдут той же пачкой.
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self._delay)
+                except TimeoutError:
+                    pass
+            self._has_edits.clear()
+            self._batch_full.clear()
+            delay = 0.0
+            while self._pending:
+                if await self._flush_batch():
+                    delay = 0.0
+                    continue
+                delay = min(max(delay * 2, _RETRY_MIN_DELAY), _RETRY_MAX_DELAY)
+                await asyncio.sleep(delay) # Пауза перед повтором пачки, вернувшейся в очередь.
+            if self._closed:
+                return
+
+    def _requeue(self, batch: dict[int, dict[str, Any]], waiters: dict[int, list[asyncio.Future]]) -> None:
+        """Возвращает пачку в начало очереди; правки, пришедшие за время записи, поверх её значений."""
+        newer = self._pending
+        self._pending = {resume_id: edit | newer.pop(resume_id, {}) for resume_id, edit in batch.items()}
+        self._pending.update(newer)
+        for resume_id, futures in waiters.items():
+            self._waiters[resume_id] = futures + self._waiters.get(resume_id, [])
+
+    async def _flush_batch(self) -> bool:
+        """Пишет первую пачку очереди. False - ошибка, пачка возвращена в очередь."""
+        batch = dict(islice(self._pending.items(), self._max_batch))
+        for resume_id in batch:
+            del self._pending[resume_id]
+        waiters = {resume_id: self._waiters.pop(resume_id) for resume_id in batch if resume_id in self._waiters}
+        started = time.perf_counter()
+        try:
+            async with self._space:
+                self._space.notify_all() # Место в очереди освободилось.
+            async with get_async_engine().begin() as conn:
+                updated = set((await conn.execute(_update_resumes_query, _batch_params(batch))).scalars())
+        except asyncio.CancelledError:
+            self._requeue(batch, waiters) # close() прервал запись по истечении срока: правки учитываются как незаписанные.
+            raise
+        except Exception as e:
+            self.failed += len(batch)
+            self.retries += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            self._requeue(batch, waiters)
+            return False
+        finally:
+            self.flush_durations.observe(time.perf_counter() - started)
+            self.batch_sizes.observe(len(batch))
+        self.written += len(updated)
+        self.missing += len(batch) - len(updated)
+        result_cache.invalidate(("resumes",))
+        mark_primary_write()
+        for resume_id, futures in waiters.items():
+            for waiter in futures:
+                if not waiter.done():
+                    waiter.set_result(resume_id in updated)
+        return True
+
+    async def flush(self) -> None:
+        """Записывает все правки, принятые до вызова, не дожидаясь окна накопления."""
+        if not self._pending:
+            return
+        # Пачки пишутся по порядку постановки резюме в очередь (пачка после ошибки возвращается
+        # в начало): когда записано последнее из ожидающих сейчас, записаны и все остальные.
+        # При недоступной БД ждёт, пока запись не удастся или close() не сдастся.
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(next(reversed(self._pending)), []).append(waiter)
+        self._batch_full.set()
+        try:
+            await waiter
+        except Exception:
+            pass # Незаписанные при close() правки учтены в метриках и переданы ждущим правкам (wait=True).
+
+    async def close(self) -> None:
+        """
+        Перестаёт принимать правки и дописывает накопленные, повторяя запись при ошибках не дольше
+        WRITE_BEHIND_CLOSE_TIMEOUT_SECONDS. Вызывается при остановке приложения.
+        WriteBehindUnwrittenError - часть правок так и не записана (они остаются в очереди).
+        """
+        self._closed = True
+        if self._task is not None:
+            self._has_edits.set()
+            self._batch_full.set() # Не ждать окна накопления.
+            async with self._space:
+                self._space.notify_all()
+            timeout = settings.WRITE_BEHIND_CLOSE_TIMEOUT_SECONDS if self._close_timeout is None else self._close_timeout
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            except TimeoutError:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+            self._task = None
+        if self._pending:
+            self.unwritten = len(self._pending)
+            error = WriteBehindUnwrittenError(self.unwritten, self.last_error)
+            for futures in self._waiters.values():
+                for waiter in futures:
+                    if not waiter.done():
+                        waiter.set_exception(error)
+            self._waiters.clear()
+            raise error
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "edits": self.edits,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "missing": self.missing,
+            "failed": self.failed,
+            "retries": self.retries,
+            "unwritten": self.unwritten,
+            "last_error": self.last_error,
+            "batches": self.batch_sizes.count,
+            "flush_seconds": self.flush_durations.sum,
+            "backpressure_waits": self.backpressure_waits,
+            "backpressure_seconds": self.backpressure_seconds,
+        }
+
+    def render_prometheus(self) -> str:
+        """Метрики очереди в текстовом формате Prometheus (дополняют instrumentation.render_prometheus)."""
+        lines = render_stats("sqlstart_writebehind", WRITE_BEHIND_METRICS, self.stats())
+        lines += render_metric(
+            "sqlstart_writebehind_flush_duration_seconds", "histogram", "Время записи одной пачки.",
+            {'queue="resumes"': self.flush_durations},
+        )
+        lines += render_metric(
+            "sqlstart_writebehind_batch_size", "histogram", "Резюме в одной пачке.",
+            {'queue="resumes"': self.batch_sizes},
+        )
+        return "\n".join(lines) + "\n"
+
+
+resume_writes = ResumeWriteBehind()
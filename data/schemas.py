@@ -1,8 +1,8 @@
 from datetime import datetime
-from typing import Optional
+from typing import Optional, TypedDict
 from pydantic import BaseModel, ConfigDict
 
-from models import Workload
+from enums import Workload
 
 class WorkersAddDTO(BaseModel):
     username: str
@@ -41,4 +41,90 @@ class VacanciesDTO(VacanciesAddDTO):
 
 class ResumesRelVacanciesReokiedDTO(ResumesDTO):
     worker: "WorkersDTO"
-    vacancies_replied: list["VacanciesDTO"]
\ No newline at end of file
+    vacancies_replied: list["VacanciesDTO"]
+
+# Страницы для keyset-пагинации: next_cursor = None означает, что страниц больше нет
+class WorkersPageDTO(BaseModel):
+    items: list["WorkersRelDTO"]
+    next_cursor: str | None
+
+class ResumesPageDTO(BaseModel):
+    items: list["ResumesRelVacanciesReokiedDTO"]
+    next_cursor: str | None
+
+class ResumeSearchDTO(ResumesDTO):
+    rank: float
+
+# Подбор резюме под вакансию (queries/matching.py): оценка и её составляющие от 0 до 1.
+class ResumeMatchDTO(ResumesDTO):
+    score: float
+    title_score: float
+    compensation_score: float
+
+# Правка резюме через отложенную запись (queries/writebehind.py): меняются только переданные поля,
+# compensation: null обнуляет компенсацию.
+class ResumeEditDTO(BaseModel):
+    title: str | None = None
+    compensation: int | None = None
+
+# Массовые отклики резюме на вакансию (queries/replies.py)
+class RepliesAddDTO(BaseModel):
+    resume_ids: list[int]
+    cover_letter: str | None = None
+
+class RepliesCountDTO(BaseModel):
+    count: int
+
+# Дашборд (queries/dashboard.py): части собираются параллельными запросами. Часть, запрос которой
+# не уложился в тайм-аут, равна None, а причина попадает в errors под тем же именем.
+class CompensationDiffDTO(BaseModel):
+    worker_id: int
+    username: str
+    compensation: int | None
+    workload: Workload
+    avg_workload_compensation: int | None
+    compensation_diff: int | None
+
+class DashboardDTO(BaseModel):
+    avg_compensation: list["WorkloadAvgCompensationDTO"] | None
+    top_compensation_diff: list["CompensationDiffDTO"] | None
+    resume_counts: dict[Workload, int] | None
+    errors: dict[str, str]
+
+# Статистика компенсации по колоночному снимку резюме в памяти (queries/snapshot.py).
+# percentiles - перцентиль -> значение; histogram_edges - границы интервалов (на одну больше, чем counts).
+class CompensationStatsDTO(BaseModel):
+    resumes: int
+    avg_compensation: dict[Workload, float]
+    percentiles: dict[float, float]
+    histogram_counts: list[int]
+    histogram_edges: list[float]
+    top_compensation_diff: list["CompensationDiffDTO"]
+
+
+# Строки для режима "проекции" (queries/projection.py): те же поля и в том же порядке,
+# что и у DTO выше, но это обычные dict - их сериализует TypeAdapter без создания моделей.
+class WorkerRow(TypedDict):
+    username: str
+    id: int
+
+class ResumeRow(TypedDict):
+    title: str
+    compensation: int | None
+    workload: Workload
+    worker_id: int
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+class VacancyRow(TypedDict):
+    title: str
+    compensation: int | None
+    id: int
+
+class WorkersRelRow(WorkerRow):
+    resumes: list[ResumeRow]
+
+class ResumesRelVacanciesReokiedRow(ResumeRow):
+    worker: WorkerRow
+    vacancies_replied: list[VacancyRow]
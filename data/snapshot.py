@@ -0,0 +1,288 @@
+import heapq
+import math
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from functools import cache
+from typing import Iterable
+from enums import Workload
+from schemas import CompensationDiffDTO
+
+# Колоночный снимок резюме (вместе с именем работника) в памяти процесса для аналитики:
+# средние по занятости, перцентили, гистограммы и разница с средней занятости
+# (как join_cte_subquery_window_func) считаются без запроса к PostgreSQL.
+# Каждый столбец - плотный массив array без объекта Python на значение:
+# id и worker_id - int32, компенсация - int64, занятость - код uint8 (индекс в WORKLOADS),
+# заголовок и имя работника - int32-коды в словари строк (одинаковые строки хранятся один раз).
+# Строки упорядочены по id, поиск строки по id - двоичный. Удалённые резюме помечаются в alive
+# и исчезают при следующей полной загрузке. Загрузка и обновление по updated_at - queries/snapshot.py.
+# Быстрый путь - с NumPy (необязательная зависимость, poetry install -E analytics или pip install numpy):
+# аналитика векторизована поверх тех же буферов без копирования, на миллионе резюме - десятки
+# миллисекунд на расчёт. Без NumPy те же результаты считаются циклами Python в 10-50 раз медленнее
+# (0.2-1 с на расчёт, см. benchmarks/bench_snapshot.py, режим печатается).
+
+WORKLOADS = tuple(Workload)
+NO_COMPENSATION = -1 # Компенсация не указана (в БД NULL; CHECK compensation > 0 не даёт ей быть -1).
+
+_workload_codes = {workload: code for code, workload in enumerate(WORKLOADS)}
+
+
+@cache
+def _numpy():
+    try:
+        import numpy # Необязательная зависимость: импортируется при первом расчёте, а не при импорте модуля.
+    except ImportError:
+        return None
+    return numpy
+
+
+def _percentile(values: list[int], q: float) -> float:
+    """Перцентиль по отсортированным значениям с линейной интерполяцией (как numpy.percentile)."""
+    position = (len(values) - 1) * q / 100
+    low, high = math.floor(position), math.ceil(position)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+class _StringDictionary:
+    """Словарь строк: строка -> int-код, каждая строка хранится один раз."""
+
+    def __init__(self):
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self.values) + sys.getsizeof(self._codes) + sum(sys.getsizeof(value) for value in self.values)
+
+
+class _Columns:
+    __slots__ = ("ids", "worker_ids", "compensations", "workloads", "title_codes", "username_codes", "alive", "titles", "usernames")
+
+    def __init__(self):
+        self.ids = array("i")
+        self.worker_ids = array("i")
+        self.compensations = array("q")
+        self.workloads = array("B")
+        self.title_codes = array("i")
+        self.username_codes = array("i")
+        self.alive = array("B")
+        self.titles = _StringDictionary()
+        self.usernames = _StringDictionary()
+
+    def arrays(self) -> tuple[array, ...]:
+        return (self.ids, self.worker_ids, self.compensations, self.workloads, self.title_codes, self.username_codes, self.alive)
+
+    def values(self, resume_id, worker_id, title, compensation, workload, username) -> tuple[int, ...]:
+        return (
+            resume_id,
+            worker_id,
+            NO_COMPENSATION if compensation is None else compensation,
+            _workload_codes[Workload(workload)],
+            self.titles.code(title),
+            self.usernames.code(username),
+            1,
+        )
+
+
+class ResumeSnapshot:
+    """
+    Снимок строк (id, worker_id, title, compensation, workload, username) для аналитики.
+    Потокобезопасен: расчёты и обновления не пересекаются.
+    """
+
+    def __init__(self):
+        self._columns = _Columns()
+        self._lock = threading.Lock()
+        self.loaded = False # False - снимок нужно (пере)загрузить из БД целиком.
+
+    def __len__(self) -> int:
+        return sum(self._columns.alive)
+
+    def load(self, rows: Iterable[tuple]) -> None:
+        """Заменяет снимок строками, упорядоченными по id. Расчёты идут по старому снимку до замены."""
+        columns = _Columns()
+        values = [columns.values(*row) for row in rows]
+        for position, column in enumerate(columns.arrays()): # Столбец целиком за раз, а не по значению.
+            column.extend([row[position] for row in values])
+        del values
+        with self._lock:
+            self._columns = columns
+            self.loaded = True
+
+    def upsert(self, rows: Iterable[tuple]) -> None:
+        """Обновляет или добавляет строки (в любом порядке)."""
+        with self._lock:
+            columns = self._columns
+            arrays = columns.arrays()
+            for row in rows:
+                values = columns.values(*row)
+                position = bisect_left(columns.ids, row[0])
+                if position < len(columns.ids) and columns.ids[position] == row[0]:
+                    for column, value in zip(arrays, values):
+                        column[position] = value
+                else:
+                    for column, value in zip(arrays, values): # Новые id обычно больше всех - вставка в конец.
+                        column.insert(position, value)
+
+    def remove(self, resume_ids: Iterable[int]) -> None:
+        with self._lock:
+            ids, alive = self._columns.ids, self._columns.alive
+            for resume_id in resume_ids:
+                position = bisect_left(ids, resume_id)
+                if position < len(ids) and ids[position] == resume_id:
+                    alive[position] = 0
+
+    def invalidate(self) -> None:
+        """Помечает снимок устаревшим: при следующем обращении он перезагрузится из БД."""
+        self.loaded = False
+
+    def memory_bytes(self) -> int:
+        """Память снимка: буферы столбцов и словари строк."""
+        columns = self._columns
+        return (
+            sum(column.buffer_info()[1] * column.itemsize for column in columns.arrays())
+            + columns.titles.memory_bytes()
+            + columns.usernames.memory_bytes()
+        )
+
+    # Аналитика. Учитываются живые резюме с указанной компенсацией (как avg() в SQL пропускает NULL).
+
+    def _np_columns(self, workload: Workload | None = None):
+        """Массивы NumPy поверх буферов и маска учитываемых строк. Только под self._lock."""
+        np = _numpy()
+        columns = self._columns
+        compensations = np.frombuffer(columns.compensations, dtype=np.int64)
+        workloads = np.frombuffer(columns.workloads, dtype=np.uint8)
+        mask = (np.frombuffer(columns.alive, dtype=np.uint8) == 1) & (compensations != NO_COMPENSATION)
+        if workload is not None:
+            mask &= workloads == _workload_codes[workload]
+        return compensations, workloads, mask
+
+    def _positions(self, workload: Workload | None = None) -> list[int]:
+        columns = self._columns
+        code = None if workload is None else _workload_codes[workload]
+        return [
+            position
+            for position, (alive, compensation, workload_code) in enumerate(zip(columns.alive, columns.compensations, columns.workloads))
+            if alive and compensation != NO_COMPENSATION and (code is None or workload_code == code)
+        ]
+
+    def _averages(self) -> list[float | None]:
+        """Средняя компенсация по коду занятости (None - резюме этой занятости нет)."""
+        np = _numpy()
+        if np is not None:
+            compensations, workloads, mask = self._np_columns()
+            sums = np.bincount(workloads[mask], weights=compensations[mask], minlength=len(WORKLOADS))
+            counts = np.bincount(workloads[mask], minlength=len(WORKLOADS))
+            return [float(s / c) if c else None for s, c in zip(sums.tolist(), counts.tolist())]
+        sums, counts = [0] * len(WORKLOADS), [0] * len(WORKLOADS)
+        columns = self._columns
+        for alive, compensation, code in zip(columns.alive, columns.compensations, columns.workloads):
+            if alive and compensation != NO_COMPENSATION:
+                sums[code] += compensation
+                counts[code] += 1
+        return [s / c if c else None for s, c in zip(sums, counts)]
+
+    def avg_compensation_by_workload(self) -> dict[Workload, float]:
+        """Средняя компенсация по занятости."""
+        with self._lock:
+            averages = self._averages()
+        return {workload: average for workload, average in zip(WORKLOADS, averages) if average is not None}
+
+    def compensation_percentiles(self, percentiles: Iterable[float] = (50, 90, 99), workload: Workload | None = None) -> dict[float, float]:
+        """Перцентили компенсации (линейная интерполяция), по всем резюме или по одной занятости."""
+        percentiles = tuple(percentiles)
+        np = _numpy()
+        with self._lock:
+            if np is not None:
+                compensations, _, mask = self._np_columns(workload)
+                values = compensations[mask]
+                if not len(values):
+                    return {}
+                return dict(zip(percentiles, np.percentile(values, percentiles).tolist()))
+            values = sorted(self._columns.compensations[position] for position in self._positions(workload))
+        if not values:
+            return {}
+        return {q: float(_percentile(values, q)) for q in percentiles}
+
+    def compensation_histogram(self, bins: int = 10, workload: Workload | None = None) -> tuple[list[int], list[float]]:
+        """Гистограмма компенсации: число резюме в каждом из `bins` равных интервалов и границы интервалов."""
+        np = _numpy()
+        with self._lock:
+            if np is not None:
+                compensations, _, mask = self._np_columns(workload)
+                values = compensations[mask]
+                if not len(values):
+                    return [], []
+                counts, edges = np.histogram(values, bins=bins)
+                return counts.tolist(), edges.tolist()
+            values = [self._columns.compensations[position] for position in self._positions(workload)]
+        if not values:
+            return [], []
+        low, high = min(values), max(values)
+        if low == high: # Как numpy: один интервал шириной 1 вокруг значения.
+            low, high = low - 0.5, high + 0.5
+        width = (high - low) / bins
+        counts = [0] * bins
+        for value in values:
+            counts[min(int((value - low) / width), bins - 1)] += 1 # Правая граница последнего интервала включена.
+        return counts, [low + width * i for i in range(bins + 1)]
+
+    def compensation_diff(self, limit: int | None = None) -> list[CompensationDiffDTO]:
+        """
+        Резюме с наибольшим превышением средней компенсации своей занятости, как в
+        join_cte_subquery_window_func (средняя округляется до целого, как cast(... Integer) в PostgreSQL).
+        Резюме без компенсации пропускаются.
+        """
+        np = _numpy()
+        with self._lock:
+            columns = self._columns
+            averages = [None if average is None else math.floor(average + 0.5) for average in self._averages()]
+            if np is not None:
+                compensations, workloads, mask = self._np_columns()
+                positions = np.flatnonzero(mask)
+                diffs = compensations[positions] - np.array([a or 0 for a in averages], dtype=np.int64)[workloads[positions]]
+                if limit is not None and 0 < limit < len(diffs):
+                    # Полная сортировка не нужна: кандидаты - не меньше limit-й по величине разницы.
+                    threshold = np.partition(diffs, len(diffs) - limit)[len(diffs) - limit]
+                    candidates = np.flatnonzero(diffs >= threshold)
+                    order = candidates[np.argsort(-diffs[candidates], kind="stable")][:limit]
+                else:
+                    order = np.argsort(-diffs, kind="stable")[:limit]
+                selected = positions[order].tolist()
+            else:
+                compensations, workloads = columns.compensations, columns.workloads
+                diffs = ((compensations[p] - averages[workloads[p]], -p) for p in self._positions())
+                # При равной разнице - по возрастанию позиции, как устойчивая сортировка выше.
+                ranked = heapq.nlargest(limit, diffs) if limit is not None else sorted(diffs, reverse=True)
+                selected = [-p for _, p in ranked]
+            return [
+                CompensationDiffDTO(
+                    worker_id=columns.worker_ids[p],
+                    username=columns.usernames.values[columns.username_codes[p]],
+                    compensation=columns.compensations[p],
+                    workload=WORKLOADS[columns.workloads[p]],
+                    avg_workload_compensation=averages[columns.workloads[p]],
+                    compensation_diff=columns.compensations[p] - averages[columns.workloads[p]],
+                )
+                for p in selected
+            ]
+
+    def title(self, resume_id: int) -> str | None:
+        """Заголовок резюме из словаря заголовков (None - резюме нет в снимке)."""
+        with self._lock:
+            columns = self._columns
+            position = bisect_left(columns.ids, resume_id)
+            if position < len(columns.ids) and columns.ids[position] == resume_id and columns.alive[position]:
+                return columns.titles.values[columns.title_codes[position]]
+        return None
+
+
+resume_snapshot = ResumeSnapshot()
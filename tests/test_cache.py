@@ -0,0 +1,41 @@
+import asyncio
+from pydantic import BaseModel
+from cache import LRUCache, ResultCache
+
+
+class Answer(BaseModel):
+    value: int
+
+
+def test_get_or_set_caches_until_invalidated():
+    cache = ResultCache(LRUCache())
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        return Answer(value=len(calls))
+
+    async def run():
+        first = await cache.get_or_set("workers?", ("workers",), produce)
+        second = await cache.get_or_set("workers?", ("workers",), produce)
+        cache.invalidate(("resumes",))
+        third = await cache.get_or_set("workers?", ("workers",), produce)
+        cache.invalidate(("workers",))
+        fourth = await cache.get_or_set("workers?", ("workers",), produce)
+        return first, second, third, fourth
+
+    assert asyncio.run(run()) == (b'{"value":1}', b'{"value":1}', b'{"value":1}', b'{"value":2}')
+
+
+def test_answer_computed_during_invalidation_is_not_cached():
+    cache = ResultCache(LRUCache())
+
+    async def produce():
+        cache.invalidate(("workers",)) # Таблица изменилась, пока считался ответ.
+        return Answer(value=1)
+
+    async def run():
+        await cache.get_or_set("workers?", ("workers",), produce)
+        return await cache.backend.get("workers?")
+
+    assert asyncio.run(run()) is None
@@ -0,0 +1,41 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+# Выполняется в чистом процессе после импорта модуля (как benchmarks/bench_import.py): что из
+# тяжёлого успело создаться. Каталог процесса - временный, без .env: чтение настроек при импорте
+# упало бы и без проверки счётчика.
+_probe = """
+import json, sys
+import {module}
+import config, database
+print(json.dumps({{
+    "engines": sum(f.cache_info().currsize for f in (
+        database.get_sync_engine, database.get_async_engine,
+        database.get_sync_replica_engines, database.get_async_replica_engines)),
+    "settings": config.get_settings.cache_info().currsize,
+    "mappers": sum(m.configured for m in database.Base.registry.mappers),
+    "drivers": [name for name in ("psycopg", "asyncpg") if name in sys.modules],
+    "demo": [name for name in ("queries.orm", "queries.core") if name in sys.modules],
+}}))
+"""
+
+
+@pytest.mark.parametrize("module", ["main", "schemas", "models", "database", "config"])
+def test_import_is_lazy(module, tmp_path):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _probe.format(module=module)],
+        cwd=tmp_path,
+        env={"PYTHONPATH": str(DATA_DIR), "PATH": ""},
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    assert "import time:" in proc.stderr # -X importtime сработал: импорт шёл в чистом процессе.
+    state = json.loads(proc.stdout.splitlines()[-1])
+    assert state == {"engines": 0, "settings": 0, "mappers": 0, "drivers": [], "demo": []}
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+import instrumentation
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+def test_failed_statement_leaves_no_start_time(engine):
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(exc.OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.info["query_start_time"] == {}
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+        assert conn.info["query_start_time"] == {}
+
+
+def test_statement_duration_is_observed(engine):
+    with instrumentation.track_queries("test") as stats, engine.connect() as conn:
+        conn.execute(text("SELECT 2"))
+    assert stats.statements == 1
+    assert instrumentation._statement_durations["SELECT 2"].count >= 1
+
+
+def test_render_stats_names_and_values():
+    metrics = (
+        instrumentation.Metric("connected", "gauge", "Соединение."),
+        instrumentation.Metric("events", "counter", "События."),
+        instrumentation.Metric("lag", "gauge", "Задержка.", "seconds"),
+    )
+    lines = instrumentation.render_stats("app", metrics, {"connected": True, "events": 3, "lag": 0.5})
+    assert [line for line in lines if not line.startswith("#")] == ["app_connected 1", "app_events_total 3", "app_lag_seconds 0.5"]
+    assert "# TYPE app_events_total counter" in lines
+
+
+def test_render_metric_histogram_with_labels():
+    histogram = instrumentation.Histogram((1, 2))
+    histogram.observe(2)
+    lines = instrumentation.render_metric("app_size", "histogram", "Размер.", {'queue="q"': histogram})
+    assert lines[:2] == ["# HELP app_size Размер.", "# TYPE app_size histogram"]
+    assert 'app_size_bucket{queue="q",le="2"} 1' in lines
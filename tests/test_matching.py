@@ -0,0 +1,36 @@
+import pytest
+from matching import ResumeIndex
+
+
+@pytest.fixture
+def index() -> ResumeIndex:
+    index = ResumeIndex()
+    index.load([(1, "Python developer", 100_000), (2, "C", 200_000), (3, "Go developer", None)])
+    return index
+
+
+def test_load_skips_titles_without_words(index):
+    assert len(index) == 2
+    assert [match.resume_id for match in index.match("Python developer", 100_000)] == [1, 3]
+
+
+@pytest.mark.parametrize("title", ["!", "C", ""])
+def test_upsert_title_without_words_is_not_indexed(index, title):
+    index.upsert(4, title, 5)
+    assert len(index) == 2
+
+
+def test_upsert_title_without_words_drops_old_entry(index):
+    index.upsert(1, "R", 100_000)
+    assert len(index) == 1
+    assert [match.resume_id for match in index.match("Python developer", 100_000)] == [3]
+    index.upsert(1, "Python developer", 100_000) # Индекс после удаления остаётся согласованным.
+    assert [match.resume_id for match in index.match("Python", 100_000)] == [1]
+
+
+def test_match_orders_by_title_and_compensation(index):
+    index.upsert(4, "Python developer", 300_000)
+    matches = index.match("Python developer", 100_000, k=3)
+    assert [match.resume_id for match in matches] == [1, 4, 3]
+    assert matches[0].compensation_score == 1.0
+    assert matches[0].score >= matches[1].score >= matches[2].score
@@ -0,0 +1,45 @@
+import io
+from pathlib import Path
+import pytest
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from models import parse_resumes_partition_by
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def config(monkeypatch) -> Config:
+    monkeypatch.chdir(ROOT) # env.py читает настройки из .env в корне, как при запуске alembic.
+    return Config(str(ROOT / "alembic.ini"), output_buffer=io.StringIO())
+
+
+def test_revisions_form_one_chain(config):
+    script = ScriptDirectory.from_config(config)
+    assert len(script.get_heads()) == 1
+    chain = [revision.revision for revision in script.walk_revisions("base", "heads")][::-1]
+    assert chain[:3] == ["373a13cb824d", "1e4b7c9d2f58", "5b1f0c7e2a94"]
+
+
+def test_empty_database_gets_schema_before_first_change(config):
+    # Offline-режим (--sql): SQL ревизий без подключения к базе.
+    command.upgrade(config, "5b1f0c7e2a94", sql=True)
+    sql = config.output_buffer.getvalue()
+    assert "DROP TABLE IF EXISTS resumes" in sql
+    assert sql.index("CREATE TABLE resumes") < sql.index("CREATE INDEX resumes_workload_id_index")
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("", ()),
+    ("workload", ("workload",)),
+    (" workload , created_at ", ("workload", "created_at")),
+])
+def test_parse_resumes_partition_by(value, expected):
+    assert parse_resumes_partition_by(value) == expected
+
+
+@pytest.mark.parametrize("value", ["id", "created_at,workload"])
+def test_parse_resumes_partition_by_rejects_unknown_layout(value):
+    with pytest.raises(ValueError):
+        parse_resumes_partition_by(value)
@@ -0,0 +1,65 @@
+import asyncio
+import contextvars
+import threading
+import time
+import pytest
+from benchmarks.bench_event_loop import _call, measure
+from queries.offload import offload, run_in_threadpool, shutdown_threadpool
+
+# Те же замеры, что в benchmarks/bench_event_loop.py, но без PostgreSQL: запрос заменяет
+# синхронная функция, которая держит поток QUERY_SECONDS, а асинхронный вариант - asyncio.sleep.
+
+QUERY_SECONDS = 0.1
+TICK_SECONDS = 0.01
+CONCURRENCY = 4
+REPEAT = 2
+MAX_LAG_MS = 50
+
+
+def blocking_query() -> str:
+    time.sleep(QUERY_SECONDS)
+    return threading.current_thread().name
+
+
+async def async_query() -> None:
+    await asyncio.sleep(QUERY_SECONDS)
+
+
+@pytest.fixture(autouse=True)
+def threadpool():
+    yield
+    shutdown_threadpool()
+
+
+def _max_lag(mode: str) -> float:
+    async def run():
+        _, lags = await measure(_call(mode, blocking_query, async_query), CONCURRENCY, REPEAT, TICK_SECONDS)
+        return max(lags)
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("mode", ["offload", "async"])
+def test_event_loop_lag_is_bounded(mode):
+    assert _max_lag(mode) < MAX_LAG_MS
+
+
+def test_blocking_call_stalls_event_loop():
+    # Проверка самого замера: синхронный вызов в корутине задерживает тики на время запроса.
+    assert _max_lag("blocking") >= QUERY_SECONDS * 1000 * 0.8
+
+
+def test_offload_runs_in_threadpool_with_context():
+    var = contextvars.ContextVar("var")
+
+    @offload
+    def query(arg, *, kwarg):
+        return arg, kwarg, var.get(), threading.current_thread().name
+
+    async def run():
+        var.set("request")
+        return await query(1, kwarg=2), await run_in_threadpool(blocking_query)
+
+    (arg, kwarg, value, thread), thread_name = asyncio.run(run())
+    assert (arg, kwarg, value) == (1, 2, "request")
+    assert thread.startswith("db-offload") and thread_name.startswith("db-offload")
+    assert query.__name__ == "query"
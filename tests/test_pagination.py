@@ -0,0 +1,31 @@
+import base64
+import json
+import pytest
+from queries.pagination import MAX_ID, InvalidCursorError, decode_cursor, encode_cursor
+
+
+def _cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("last_id", [0, 1, 12345, MAX_ID])
+def test_roundtrip(last_id):
+    assert decode_cursor(encode_cursor(last_id)) == last_id
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not base64!",
+    _cursor([1]),
+    _cursor({"last": 1}),
+    _cursor({"id": "1"}),
+    _cursor({"id": 1.5}),
+    _cursor({"id": True}),
+    _cursor({"id": False}),
+    _cursor({"id": -1}),
+    _cursor({"id": MAX_ID + 1}),
+    _cursor({"id": 10**30}),
+])
+def test_rejects_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)